@@ -0,0 +1,325 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+SRC_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC_DIRECTORY)
+
+from synthetic_data import FILTER_GROUPS, write_benchmark_inputs  # noqa: E402
+
+from data_filtering import apply_filters, build_filter_index  # noqa: E402
+from data_processing import create_edge_color_map, load_data, preprocess_data  # noqa: E402
+from file_utils import to_ris_data  # noqa: E402
+from network_analysis import build_network, network_tabular  # noqa: E402
+
+ROW_GRID = [10_000, 100_000, 1_000_000]
+LABEL_GRID = [20, 200, 1000]
+QUICK_ROW_GRID = [10_000]
+QUICK_LABEL_GRID = [20]
+
+# Reruns of the upload page timed after the app's first run
+STARTUP_RERUNS = 10
+
+# Run in a fresh interpreter, so the app's imports are timed from a cold start.
+# The app logs the duration of every run of its script as a JSON line on stderr.
+STARTUP_SCRIPT = """
+import sys, time
+
+start = time.perf_counter()
+import app
+print(time.perf_counter() - start)
+
+from streamlit.testing.v1 import AppTest
+
+at = AppTest.from_file(sys.argv[1], default_timeout=60)
+for _ in range(int(sys.argv[2]) + 1):
+    at.run()
+"""
+
+COLS_AR = [
+    "entity_1",
+    "entity_2",
+    "entity_1_count",
+    "entity_2_count",
+    "co-occurrence_count",
+    "support",
+    "lift",
+    "leverage",
+    "pmi",
+]
+
+
+def measure(func, repeat=1):
+    """
+    Time a function and measure its peak Python memory allocation.
+
+    The function is timed repeat times without tracing, then run once more under
+    tracemalloc, which slows it down, to measure peak memory.
+
+    Args:
+        func (callable): Called with no arguments.
+        repeat (int, optional): Number of timed runs.
+
+    Returns:
+        tuple: The function's result and a dictionary with 'seconds' (the fastest
+        timed run), 'all_seconds' and 'peak_bytes'.
+    """
+    seconds = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = func()
+        seconds.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return result, {
+        "seconds": min(seconds),
+        "all_seconds": seconds,
+        "peak_bytes": peak_bytes,
+    }
+
+
+def benchmark_stages(paths, repeat=1):
+    """
+    Benchmark each stage of the LitConnector pipeline on one set of inputs.
+
+    Args:
+        paths (dict): Input file paths, as returned by write_benchmark_inputs.
+        repeat (int, optional): Number of timed runs per stage.
+
+    Returns:
+        list: One dictionary per stage with its name, timings, peak memory and the
+        shape of its input.
+    """
+    results = []
+
+    def run(stage, func, shape=None):
+        result, stats = measure(func, repeat)
+        # Stages without an input frame report the shape of their output
+        rows, columns = shape or getattr(result, "shape", (None, None))
+        results.append({"stage": stage, "rows": rows, "columns": columns, **stats})
+        return result
+
+    df_raw = run("load_data", lambda: load_data(paths["distiller_input_file"]))
+
+    df_prep = run("preprocess_data", lambda: preprocess_data(df_raw), df_raw.shape)
+
+    nodes = pd.read_csv(paths["network_config_file"])["columns_in_network"].tolist()
+    nodes = [node for node in dict.fromkeys(nodes) if node in df_prep.columns]
+    selected_filters = [
+        levels[0] for levels in FILTER_GROUPS.values() if levels[0] in df_prep.columns
+    ]
+
+    filter_index = build_filter_index(df_prep)
+    positions = run(
+        "apply_filters",
+        lambda: apply_filters(
+            df_prep,
+            selected_filters=selected_filters,
+            index=filter_index,
+            return_positions=True,
+        ),
+        df_prep.shape,
+    )
+    df_filter = df_prep.iloc[positions]
+
+    run(
+        "create_edge_color_map",
+        lambda: create_edge_color_map(paths["network_edge_view_options"]),
+    )
+    edge_color_map = create_edge_color_map(paths["network_edge_view_options"])
+
+    run(
+        "create_network",
+        lambda: build_network(df_filter[nodes], edge_color_map),
+        (df_filter.shape[0], len(nodes)),
+    )
+    run(
+        "network_tabular",
+        lambda: network_tabular(df_filter[nodes], COLS_AR),
+        (df_filter.shape[0], len(nodes)),
+    )
+
+    df_tiab = df_filter[["Refid", "Title", "Abstract"]]
+    run("to_ris_data", lambda: to_ris_data(df_tiab), df_tiab.shape)
+
+    return results
+
+
+def benchmark_startup(repeat=1, reruns=STARTUP_RERUNS):
+    """
+    Benchmark the app's cold start and the latency of reruns of its upload page.
+
+    Each repeat starts a fresh interpreter in the source directory, times importing
+    the app's modules, then runs the app script headless with Streamlit's AppTest:
+    once from cold caches, then reruns times. Runs are timed by the app's own run
+    log, so they exclude the overhead of AppTest.
+
+    Args:
+        repeat (int, optional): Number of fresh interpreters started.
+        reruns (int, optional): Number of reruns timed in each interpreter.
+
+    Returns:
+        dict: 'import_seconds' and 'first_run_seconds' (the fastest of the
+        repeats), 'rerun_seconds' (the median rerun), and the timings of every
+        repeat under 'all_runs'.
+    """
+    runs = []
+    for _ in range(repeat):
+        process = subprocess.run(
+            [sys.executable, "-c", STARTUP_SCRIPT, "app.py", str(reruns)],
+            cwd=SRC_DIRECTORY,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        run_seconds = []
+        for line in process.stderr.splitlines():
+            if line.startswith("{"):
+                record = json.loads(line)
+                if record.get("event") == "rerun":
+                    run_seconds.append(record["seconds"])
+        runs.append(
+            {
+                "import_seconds": float(process.stdout.strip().splitlines()[-1]),
+                "first_run_seconds": run_seconds[0],
+                "rerun_seconds": run_seconds[1:],
+            }
+        )
+
+    return {
+        "import_seconds": min(run["import_seconds"] for run in runs),
+        "first_run_seconds": min(run["first_run_seconds"] for run in runs),
+        "rerun_seconds": float(
+            np.median([seconds for run in runs for seconds in run["rerun_seconds"]])
+        ),
+        "reruns": reruns,
+        "all_runs": runs,
+    }
+
+
+def run_benchmarks(row_grid, label_grid, data_dir, repeat=1, seed=0, startup=True):
+    """
+    Benchmark the pipeline over a grid of input sizes.
+
+    Args:
+        row_grid (list): Numbers of rows in the synthetic exports.
+        label_grid (list): Numbers of network label columns.
+        data_dir (str): Directory for the generated input files.
+        repeat (int, optional): Number of timed runs per stage.
+        seed (int, optional): Seed of the synthetic data generator.
+        startup (bool, optional): Whether to also benchmark the app's startup, see
+            benchmark_startup.
+
+    Returns:
+        dict: The environment the benchmarks ran in, one result per stage and
+        input size, and the startup timings under 'startup'.
+    """
+    report_startup = None
+    if startup:
+        report_startup = benchmark_startup(repeat=repeat)
+        print(
+            f"startup  import {report_startup['import_seconds']:.3f} s  "
+            f"first run {report_startup['first_run_seconds']:.3f} s  "
+            f"rerun {report_startup['rerun_seconds']:.3f} s",
+            flush=True,
+        )
+
+    results = []
+    for n_rows in row_grid:
+        for n_labels in label_grid:
+            paths = write_benchmark_inputs(data_dir, n_rows, n_labels, seed=seed)
+            for result in benchmark_stages(paths, repeat=repeat):
+                result = {"n_rows": n_rows, "n_labels": n_labels, **result}
+                results.append(result)
+                print(
+                    f"{n_rows:>9} rows {n_labels:>5} labels  {result['stage']:<22}"
+                    f"{result['seconds']:>9.3f} s {result['peak_bytes'] / 2**20:>9.1f} MiB",
+                    flush=True,
+                )
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "cpu_count": os.cpu_count(),
+        "seed": seed,
+        "repeat": repeat,
+        "startup": report_startup,
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Time and memory-profile the LitConnector pipeline stages."
+    )
+    parser.add_argument(
+        "--rows",
+        type=int,
+        nargs="+",
+        help=f"Row counts to benchmark (default: {ROW_GRID}).",
+    )
+    parser.add_argument(
+        "--labels",
+        type=int,
+        nargs="+",
+        help=f"Label counts to benchmark (default: {LABEL_GRID}).",
+    )
+    parser.add_argument(
+        "--quick",
+        action="store_true",
+        help=f"Only benchmark {QUICK_ROW_GRID} rows and {QUICK_LABEL_GRID} labels.",
+    )
+    parser.add_argument(
+        "--no-startup",
+        action="store_true",
+        help="Skip timing the app's cold start and reruns.",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default="benchmarks/data")
+    parser.add_argument(
+        "--output",
+        default="benchmarks/results.json",
+        help="JSON file the results are written to.",
+    )
+    args = parser.parse_args(argv)
+
+    row_grid = args.rows or (QUICK_ROW_GRID if args.quick else ROW_GRID)
+    label_grid = args.labels or (QUICK_LABEL_GRID if args.quick else LABEL_GRID)
+    report = run_benchmarks(
+        row_grid,
+        label_grid,
+        args.data_dir,
+        repeat=args.repeat,
+        seed=args.seed,
+        startup=not args.no_startup,
+    )
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(report['results'])} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
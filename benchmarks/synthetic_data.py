@@ -0,0 +1,154 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+LIFE_STAGES = ["Adult", "Juvenile", "Pregnant", "Fetal", "Neonate", "Multiple"]
+CHEMICALS = [f"Chemical {n:03d}" for n in range(200)]
+REFERENCE_TYPES = ["Journal Article", "Report", "Thesis", "Conference Paper"]
+FILTER_GROUPS = {
+    "Study Design": ["In Vitro", "Ex Vivo", "In Vivo", "In Silico"],
+    "Species": ["Human", "Rat", "Mouse", "Fish", "Amphibian"],
+}
+EDGE_VIEWS = [("red", "Adjacent"), ("blue", "Upstream"), ("green", "Downstream")]
+WORDS = np.array(
+    [
+        "thyroid", "hormone", "exposure", "serum", "level", "receptor", "gene",
+        "expression", "developmental", "effect", "dose", "response", "study", "rat",
+        "human", "fish", "tissue", "liver", "brain", "protein", "binding", "transport",
+        "activity", "concentration", "chemical", "toxicity", "model", "analysis",
+    ]
+)
+
+
+def generate_distiller_data(n_rows, n_labels, seed=0, rows_per_reference=1.5):
+    """
+    Generate a synthetic DistillerSR title & abstract export.
+
+    Each reference appears on several rows, as in a real export with one row per
+    reviewer. Label columns hold the label name where it applies and are empty
+    otherwise; label frequencies follow a Zipf-like skew, so a few labels are
+    common and most are rare.
+
+    Args:
+        n_rows (int): Number of rows to generate.
+        n_labels (int): Number of network label columns.
+        seed (int, optional): Seed of the random number generator.
+        rows_per_reference (float, optional): Average number of rows per Refid.
+
+    Returns:
+        tuple: The export as a pandas DataFrame and the list of network label
+        column names.
+    """
+    rng = np.random.default_rng(seed)
+    n_references = max(1, int(n_rows / rows_per_reference))
+    refid = np.sort(rng.integers(1, n_references + 1, n_rows))
+
+    data = {
+        "Refid": refid,
+        "Title": _random_text(rng, refid, 8, 16),
+        "Abstract": _random_text(rng, refid, 80, 200),
+    }
+
+    labels = [f"Label {n:04d}" for n in range(n_labels)]
+    filter_labels = [level for levels in FILTER_GROUPS.values() for level in levels]
+    label_frequency = 0.25 / (np.arange(n_labels + len(filter_labels)) + 1) ** 0.8
+    label_frequency[: len(filter_labels)] = rng.uniform(0.05, 0.4, len(filter_labels))
+
+    for col, frequency in zip(filter_labels + labels, label_frequency):
+        data[col] = np.where(rng.random(n_rows) < frequency, col, None)
+
+    data["LifeStage"] = rng.choice(LIFE_STAGES, n_rows)
+    data["Chemical"] = rng.choice(CHEMICALS, n_rows)
+    data["Reference Type"] = rng.choice(REFERENCE_TYPES, n_rows)
+
+    return pd.DataFrame(data), labels
+
+
+def write_benchmark_inputs(directory, n_rows, n_labels, seed=0):
+    """
+    Write a synthetic export with matching network config, filter group and edge
+    view options files.
+
+    Existing files are reused, so the same inputs are only generated once.
+
+    Args:
+        directory (str): Directory to write the input files to.
+        n_rows (int): Number of rows in the export.
+        n_labels (int): Number of network label columns.
+        seed (int, optional): Seed of the random number generator.
+
+    Returns:
+        dict: Paths of the 'distiller_input_file', 'network_config_file',
+        'filter_group_file' and 'network_edge_view_options' files.
+    """
+    name = f"rows{n_rows}_labels{n_labels}_seed{seed}"
+    paths = {
+        "distiller_input_file": os.path.join(directory, f"{name}_distiller.csv"),
+        "network_config_file": os.path.join(directory, f"{name}_network_config.csv"),
+        "filter_group_file": os.path.join(directory, f"{name}_filter_groups.csv"),
+        "network_edge_view_options": os.path.join(directory, f"{name}_edge_views.csv"),
+    }
+    if all(os.path.isfile(path) for path in paths.values()):
+        return paths
+
+    os.makedirs(directory, exist_ok=True)
+    df, labels = generate_distiller_data(n_rows, n_labels, seed=seed)
+    df.to_csv(paths["distiller_input_file"], index=False)
+
+    pd.DataFrame({"columns_in_network": labels}).to_csv(
+        paths["network_config_file"], index=False
+    )
+    pd.DataFrame(
+        [(group, level) for group, levels in FILTER_GROUPS.items() for level in levels],
+        columns=["filter_group_name", "columns_in_group"],
+    ).to_csv(paths["filter_group_file"], index=False)
+
+    rng = np.random.default_rng(seed)
+    n_edges = min(len(labels) * 2, len(labels) * (len(labels) - 1) // 2)
+    entity_1 = rng.choice(labels, n_edges)
+    entity_2 = rng.choice(labels, n_edges)
+    views = rng.integers(0, len(EDGE_VIEWS), n_edges)
+    pd.DataFrame(
+        {
+            "entity_1": entity_1,
+            "entity_2": entity_2,
+            "edge_color": [EDGE_VIEWS[n][0] for n in views],
+            "edge_label": [EDGE_VIEWS[n][1] for n in views],
+        }
+    ).to_csv(paths["network_edge_view_options"], index=False)
+
+    return paths
+
+
+def _random_text(rng, refid, min_words, max_words):
+    # Text is generated per reference, so duplicated rows share their text
+    references, inverse = np.unique(refid, return_inverse=True)
+    lengths = rng.integers(min_words, max_words + 1, len(references))
+    words = WORDS[rng.integers(0, len(WORDS), lengths.sum())]
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    text = np.array(
+        [" ".join(words[start:end]) for start, end in zip(offsets[:-1], offsets[1:])],
+        dtype=object,
+    )
+    return text[inverse]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Generate synthetic DistillerSR inputs for LitConnector."
+    )
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--labels", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output-dir", default="benchmarks/data")
+    args = parser.parse_args(argv)
+
+    paths = write_benchmark_inputs(args.output_dir, args.rows, args.labels, args.seed)
+    for path in paths.values():
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
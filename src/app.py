@@ -1,36 +1,328 @@
 import io
 import os
+import uuid
 import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import partial
 
+import numpy as np
 import pandas as pd
 import streamlit as st
-
-from data_processing import apply_filters, load_data, preprocess_data
-from file_utils import load_default_files, to_csv_data, to_ris_data, write_temp_file
-from network_analysis import create_network, network_tabular
+from packaging.version import Version
+
+from backbone import EDGE_METRICS, select_edges
+from bootstrap import add_bootstrap_intervals
+from cooccurrence import (
+    as_binary_matrix,
+    build_pair_index,
+    compare_pair_metrics,
+    cooccurrence_counts_for_groups,
+    cooccurrence_counts_for_rows,
+)
+from data_filtering import (
+    apply_filters,
+    build_filter_index,
+    filter_positions,
+    pair_positions,
+)
+from data_processing import (
+    TEXT_COLUMNS,
+    load_and_preprocess_chunked,
+    load_data,
+    preprocess_data,
+)
+from dataset_store import (
+    TextSpill,
+    TextStore,
+    dataset_columns,
+    dataset_exists,
+    dataset_key,
+    load_dataset,
+    save_dataset,
+)
+from file_utils import (
+    build_export,
+    evict_uploads,
+    hash_file,
+    load_default_files,
+    read_csv_columns,
+    store_upload,
+)
+from instrumentation import (
+    finish_run,
+    late_stages,
+    memory_traced,
+    record_shape,
+    stage,
+    start_run,
+)
+from jobs import JobGroup
+from layout import network_layout
+from network_analysis import build_network, network_tabular, render_network
+from result_cache import ResultCache, make_cache_key
+from text_index import (
+    build_text_index,
+    load_text_index,
+    save_text_index,
+    search_text,
+    text_index_exists,
+)
 
 SAMPLE_FILE_DIRECTORY = "src/sample_input"
 
+# Shared cache of computed networks and edge tables. Set
+# LITCONNECTOR_RESULT_CACHE_DIR to also keep results on disk across restarts.
+RESULT_CACHE_MAX_BYTES = 512 * 2**20
+RESULT_CACHE_DIR = os.environ.get("LITCONNECTOR_RESULT_CACHE_DIR")
+RESULT_CACHE_DISK_MAX_BYTES = 4 * 2**30
+
+# Preprocessed datasets are stored here by content hash and reused across restarts
+DATASET_STORE_DIRECTORY = os.environ.get(
+    "LITCONNECTOR_DATASET_STORE_DIR", ".litconnector/datasets"
+)
+
+# Preprocessed datasets held in memory at once, shared read-only by every
+# session analysing them
+SHARED_DATASETS = 4
+
+# Uploads are stored per session by content hash, and removed once they are a day
+# old or the store outgrows its budget
+UPLOAD_DIRECTORY = os.environ.get(
+    "LITCONNECTOR_UPLOAD_DIR", ".litconnector/uploads"
+)
+UPLOAD_MAX_BYTES = 4 * 2**30
+UPLOAD_MAX_AGE_SECONDS = 24 * 60 * 60
+
+# Input files at least this large are read in chunks, keeping only the columns
+# used by the network config and filter group files
+STREAMING_INGEST_MIN_BYTES = 256 * 2**20
+STREAMING_INGEST_CHUNKSIZE = 100_000
+
+# Worker processes used to preprocess uploaded datasets
+PREPROCESS_WORKERS = int(os.environ.get("LITCONNECTOR_PREPROCESS_WORKERS", "1"))
+
+# Papers shown per page of the paper table
+PAPER_PAGE_SIZE = 50
+
+# Set LITCONNECTOR_TRACE_MEMORY=1 to record the peak memory of the stages of every
+# rerun; otherwise only reruns with the diagnostics panel open are traced
+TRACE_MEMORY = os.environ.get("LITCONNECTOR_TRACE_MEMORY") == "1"
+
+# Reruns of a session whose background job stages are shown in the diagnostics
+DIAGNOSTICS_RUNS = 10
+
+# Edges sent to the browser, whatever the edge reduction, so large networks stay
+# responsive
+MAX_NETWORK_EDGES = 2000
+EDGE_REDUCTIONS = ["None", "Top-k per node", "Minimum threshold", "Disparity filter"]
+
+# Subgroups compared side by side, and networks shown per row
+MAX_COMPARED_GROUPS = 6
+COMPARISON_COLUMNS = 3
+
+# Bootstrap confidence intervals of the edge metrics are resampled with a fixed
+# seed, across this many worker processes
+BOOTSTRAP_SEED = 0
+BOOTSTRAP_WORKERS = int(
+    os.environ.get("LITCONNECTOR_BOOTSTRAP_WORKERS", str(min(4, os.cpu_count() or 1)))
+)
+
+# Counting, layout, edge metrics and confidence intervals run on this many
+# background threads shared by all sessions (0 runs them in the script), and
+# the page checks for finished jobs this often
+JOB_WORKERS = int(
+    os.environ.get("LITCONNECTOR_JOB_WORKERS", str(min(4, os.cpu_count() or 1)))
+)
+JOB_POLL_SECONDS = 0.5
+
+# Streamlit 1.52 and later only build download data when the button is clicked
+DEFERRED_DOWNLOADS = Version(st.__version__) >= Version("1.52.0")
+
 
 @st.cache_data
-def load_and_preprocess_data(file_path):
-    df = load_data(file_path)
-    return preprocess_data(df)
+def load_and_preprocess_data(content_hash, _file_path, label_columns=None):
+    # Cached by content hash, so identical files uploaded in different sessions
+    # share one result
+    dataset_dir = os.path.join(
+        DATASET_STORE_DIRECTORY, dataset_key(content_hash, columns=label_columns)
+    )
+    if not dataset_exists(dataset_dir):
+        if label_columns is None:
+            df_prep = preprocess_data(
+                load_data(_file_path), n_workers=PREPROCESS_WORKERS
+            )
+            save_dataset(df_prep, dataset_dir)
+        else:
+            # Text of large files goes straight to disk rather than into memory
+            with TextSpill(DATASET_STORE_DIRECTORY) as text_spill:
+                df_prep = load_and_preprocess_chunked(
+                    _file_path,
+                    label_columns,
+                    chunksize=STREAMING_INGEST_CHUNKSIZE,
+                    text_spill=text_spill,
+                )
+                save_dataset(df_prep, dataset_dir, text_spill=text_spill)
+    if not text_index_exists(dataset_dir):
+        # Also covers datasets stored before they were indexed
+        save_text_index(build_text_index(TextStore(dataset_dir)), dataset_dir)
+    return dataset_dir
+
+
+@st.cache_resource(max_entries=SHARED_DATASETS)
+def get_shared_dataset(dataset_dir):
+    # One copy per process, which sessions select rows from by position and
+    # must not modify. Text stays in the memory-mapped text store.
+    columns, text_columns = dataset_columns(dataset_dir)
+    with stage("load_dataset") as record:
+        df_labels = load_dataset(
+            dataset_dir, columns=[col for col in columns if col not in text_columns]
+        )
+        record_shape(record, df_labels)
+    with stage("build_filter_index"):
+        filter_index = build_filter_index(df_labels)
+    for bits in filter_index["labels"].values():
+        bits.flags.writeable = False
+    return {"labels": df_labels, "filter_index": filter_index}
+
+
+@st.cache_resource(max_entries=SHARED_DATASETS)
+def get_label_matrix(dataset_dir, nodes):
+    label_matrix, _ = as_binary_matrix(
+        get_shared_dataset(dataset_dir)["labels"][list(nodes)]
+    )
+    if hasattr(label_matrix, "flags"):
+        label_matrix.flags.writeable = False
+    return label_matrix
+
+
+@st.cache_resource(max_entries=SHARED_DATASETS)
+def get_pair_index(table_key, _df_pairs):  # noqa: ARG001 - table_key is the cache key
+    # Keyed by the edge table's cache key, which identifies its content
+    return build_pair_index(_df_pairs)
+
+
+@st.cache_resource
+def get_text_store(dataset_dir):
+    return TextStore(dataset_dir)
+
+
+@st.cache_resource
+def get_text_index(dataset_dir):
+    return load_text_index(dataset_dir, get_text_store(dataset_dir).n_rows)
+
+
+def load_input_config(selected_files):
+    """
+    Parse the network config, filter group and edge view options files.
+
+    The files are parsed once when a dataset is loaded, and the parsed config is
+    reused on every rerun.
+
+    Args:
+        selected_files (dict): The selected input file paths by file type.
+
+    Returns:
+        dict: A dictionary with 'nodes' (the unique network node columns),
+        'filter_groups' (filter group names mapped to their columns, or None
+        without a filter group file), 'edge_color_map' and 'edge_view_key' (the
+        content hash of the edge view options file).
+    """
+    nodes = pd.read_csv(selected_files["network_config_file"])[
+        "columns_in_network"
+    ].tolist()
+
+    filter_groups = None
+    if selected_files.get("filter_group_file"):
+        df_groups = pd.read_csv(selected_files["filter_group_file"])
+        filter_groups = {
+            group_name: group["columns_in_group"].tolist()
+            for group_name, group in df_groups.groupby(
+                "filter_group_name", sort=False
+            )
+        }
+
+    edge_view_file = selected_files["network_edge_view_options"]
+    return {
+        "nodes": list(dict.fromkeys(nodes)),
+        "filter_groups": filter_groups,
+        "edge_color_map": create_edge_color_map(edge_view_file),
+        "edge_view_key": hash_file(edge_view_file),
+    }
+
+
+def get_label_columns(input_config):
+    """
+    Get the label columns used by the network config and filter group files.
+
+    Args:
+        input_config (dict): The parsed input config, from load_input_config.
+
+    Returns:
+        list: The network node columns followed by the filter group columns.
+    """
+    label_columns = list(input_config["nodes"])
+    for columns_in_group in (input_config["filter_groups"] or {}).values():
+        label_columns += columns_in_group
+    return list(dict.fromkeys(label_columns))
+
+
+@st.cache_resource
+def get_job_executor():
+    if JOB_WORKERS == 0:
+        return None
+    return ThreadPoolExecutor(
+        max_workers=JOB_WORKERS, thread_name_prefix="litconnector-job"
+    )
+
+
+@st.cache_resource
+def get_result_cache():
+    return ResultCache(
+        RESULT_CACHE_MAX_BYTES,
+        disk_dir=RESULT_CACHE_DIR,
+        disk_max_bytes=RESULT_CACHE_DISK_MAX_BYTES,
+    )
 
 
 def main():
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    if "recent_runs" not in st.session_state:
+        st.session_state.recent_runs = deque(maxlen=DIAGNOSTICS_RUNS)
+
+    # Stage timings of each rerun are logged as one JSON line
+    run = start_run(
+        "rerun",
+        trace_memory=TRACE_MEMORY or st.session_state.get("show_diagnostics", False),
+        session=st.session_state.session_id,
+    )
+    try:
+        run_app()
+        show_diagnostics(run, st.session_state.recent_runs)
+    finally:
+        finish_run(run)
+        st.session_state.recent_runs.append(run)
+
+
+def run_app():
     if "selected_files" not in st.session_state:
         st.session_state.selected_files = {}
 
-    if "df_prep" not in st.session_state:
-        st.session_state.df_prep = None
+    if "dataset_dir" not in st.session_state:
+        st.session_state.dataset_dir = None
 
     if "selected_filters" not in st.session_state:
         st.session_state.selected_filters = []
+    if "text_query" not in st.session_state:
+        st.session_state.text_query = ""
+
+    if "filtered_positions" not in st.session_state:
+        st.session_state.filtered_positions = None
 
-    if "filtered_df" not in st.session_state:
-        st.session_state.filtered_df = None
+    if "file_hashes" not in st.session_state:
+        st.session_state.file_hashes = {}
 
     st.set_page_config(page_title="LitConnector", page_icon="📚", layout="wide")
 
@@ -51,11 +343,31 @@ def main():
             st.session_state.open_network_view = True
 
     if st.session_state.get("open_network_view", False):
-        if st.session_state.df_prep is None:
+        if st.session_state.dataset_dir is None:
             with st.spinner("Creating network..."):
-                st.session_state.df_prep = load_and_preprocess_data(
-                    st.session_state.selected_files["distiller_input_file"]
+                distiller_file = st.session_state.selected_files["distiller_input_file"]
+                with stage("read_config"):
+                    st.session_state.input_config = load_input_config(
+                        st.session_state.selected_files
+                    )
+                label_columns = None
+                if os.path.getsize(distiller_file) >= STREAMING_INGEST_MIN_BYTES:
+                    label_columns = get_label_columns(st.session_state.input_config)
+                content_hash = st.session_state.file_hashes.get("distiller_input_file")
+                if content_hash is None:
+                    with stage("hash_dataset"):
+                        content_hash = hash_file(distiller_file)
+                # Results are keyed by the preprocessed dataset, so they are not
+                # reused once the preprocessing or the label columns change
+                st.session_state.dataset_key = dataset_key(
+                    content_hash, columns=label_columns
                 )
+                with stage("load_and_preprocess"):
+                    st.session_state.dataset_dir = load_and_preprocess_data(
+                        content_hash, distiller_file, label_columns
+                    )
+                st.session_state.filtered_positions = None
+                st.session_state.cooccurrence_counts = None
         create_application()
 
 
@@ -65,24 +377,9 @@ def handle_file_upload():
         "Upload custom files for analysis. Example files available for download below."
     )
 
-    # Create a BytesIO object to store the zip file
-    zip_io = io.BytesIO()
-
-    # Create a ZipFile object
-    with zipfile.ZipFile(
-        zip_io, mode="w", compression=zipfile.ZIP_DEFLATED
-    ) as zip_file:
-        # Add each file in the SAMPLE_FILE_DIRECTORY to the zip
-        for file in os.listdir(SAMPLE_FILE_DIRECTORY):
-            file_path = os.path.join(SAMPLE_FILE_DIRECTORY, file)
-            if os.path.isfile(file_path):
-                zip_file.write(file_path, file)
-
-    zip_io.seek(0)
-
     st.download_button(
         label="Download Example Files",
-        data=zip_io,
+        data=example_files_zip(SAMPLE_FILE_DIRECTORY),
         file_name="example_litconnector_input.zip",
         mime="application/zip",
     )
@@ -110,50 +407,90 @@ def handle_file_upload():
         ),
     }
 
-    # Validate uploaded files
+    # Validate uploaded files from their header row
     for file_type, uploaded_file in uploaded_files.items():
         if uploaded_file is not None:
             try:
-                df = pd.read_csv(uploaded_file)
-                validate_file(file_type, df)
+                with stage("validate_upload", file_type=file_type):
+                    validate_file(file_type, read_csv_columns(uploaded_file))
             except Exception as e:
                 st.error(f"Error validating {file_type}: {e!s}")
 
     if st.button("Create Network"):
         required_files = ["distiller_input_file", "network_config_file"]
         if all(uploaded_files[file_type] for file_type in required_files):
+            selected_files = {}
+            file_hashes = {}
             for file_type, uploaded_file in uploaded_files.items():
-                uploaded_files[file_type] = write_temp_file(uploaded_file, file_type)
+                if uploaded_file is None:
+                    continue
+                selected_files[file_type], file_hashes[file_type] = store_upload(
+                    uploaded_file, UPLOAD_DIRECTORY, st.session_state.session_id
+                )
+            if "network_edge_view_options" not in selected_files:
+                selected_files["network_edge_view_options"] = load_default_files(
+                    SAMPLE_FILE_DIRECTORY
+                )["network_edge_view_options"]
+            evict_uploads(
+                UPLOAD_DIRECTORY,
+                UPLOAD_MAX_BYTES,
+                UPLOAD_MAX_AGE_SECONDS,
+                keep=os.path.join(UPLOAD_DIRECTORY, st.session_state.session_id),
+            )
 
-            st.session_state.selected_files = uploaded_files
+            st.session_state.selected_files = selected_files
+            st.session_state.file_hashes = file_hashes
             st.session_state.files_loaded = True
-            st.session_state.df_prep = None  # Reset the preprocessed data
+            st.session_state.dataset_dir = None  # Reset the preprocessed data
             st.success("Files uploaded successfully")
         else:
             st.error("Please upload all required files.")
 
 
+@st.cache_resource
+def example_files_zip(directory):
+    """
+    Zip the example input files once per server process.
+
+    Args:
+        directory (str): The directory of the example files.
+
+    Returns:
+        bytes: A deflate-compressed zip of every file in the directory.
+    """
+    zip_io = io.BytesIO()
+    with zipfile.ZipFile(
+        zip_io, mode="w", compression=zipfile.ZIP_DEFLATED
+    ) as zip_file:
+        for file in sorted(os.listdir(directory)):
+            file_path = os.path.join(directory, file)
+            if os.path.isfile(file_path):
+                zip_file.write(file_path, file)
+    return zip_io.getvalue()
+
+
 def handle_demo_data():
     st.subheader("Try Demo Data")
     st.write("Get started quickly with pre-loaded example files.")
 
     if st.button("Create Network"):
         st.session_state.selected_files = load_default_files(SAMPLE_FILE_DIRECTORY)
+        st.session_state.file_hashes = {}
         st.session_state.files_loaded = True
-        st.session_state.df_prep = None  # Reset the preprocessed data
+        st.session_state.dataset_dir = None  # Reset the preprocessed data
         st.success("Files loaded successfully")
 
 
-def validate_file(file_type, df):
+def validate_file(file_type, columns):
     """
     Validate an uploaded file by checking for required columns based on the file type.
 
     Args:
         file_type (str): The type of file being validated.
-        df (pandas.DataFrame): The DataFrame containing the file data.
+        columns (list): The column names in the file's header row.
 
     This function checks if the required columns for each file type are present in the
-    DataFrame. It displays an error message if any required columns are missing,
+    file. It displays an error message if any required columns are missing,
     and a success message if all required columns are present.
     """
 
@@ -169,7 +506,7 @@ def validate_file(file_type, df):
         st.error(f"Unknown file type: {file_type}")
         return
 
-    missing_columns = [col for col in required_columns if col not in df.columns]
+    missing_columns = [col for col in required_columns if col not in columns]
     if missing_columns:
         st.error(
             f"Error in {file_type}: Missing required columns: {', '.join(missing_columns)}"
@@ -228,15 +565,465 @@ def get_edge_color(edge_color_map, node1, node2):
     return "lightgrey"
 
 
-def create_application():
-    edge_color_map = create_edge_color_map(
-        st.session_state.selected_files["network_edge_view_options"]
+@st.cache_data
+def edge_legend_markdown(edge_view_key, _edge_color_map):  # noqa: ARG001 - cache key
+    """
+    Build the markdown of the edge legend, once per edge view options file.
+
+    Args:
+        edge_view_key (str): The content hash of the edge view options file.
+        _edge_color_map (dict): The edge color map built from that file.
+
+    Returns:
+        str: A markdown list of the edge colors and the labels of their edges.
+    """
+    color_to_labels = {}
+    for targets in _edge_color_map.values():
+        for edge_view in targets.values():
+            labels = color_to_labels.setdefault(edge_view["color"], set())
+            labels.add(edge_view["label"])
+
+    edge_legend_md = "**Edge Legend:**\n"
+    for color in sorted(color_to_labels):
+        labels_str = ", ".join(sorted(color_to_labels[color]))
+        edge_legend_md += f"- :{color}[**{color.capitalize()}**] = {labels_str}\n"
+    return edge_legend_md
+
+
+def export_download_button(label, export_key, build, file_name, mime, key):
+    """
+    Show a download button whose data is only built when it is requested.
+
+    Exports are kept in the result cache, so repeated downloads of the same
+    selection are served without rebuilding them. On Streamlit versions that
+    cannot defer building the download data, a button to prepare the export is
+    shown first.
+
+    Args:
+        label (str): The button label.
+        export_key (str): The result cache key of the export.
+        build (callable): Called with no arguments to build the export bytes.
+        file_name (str): The name of the downloaded file.
+        mime (str): The MIME type of the downloaded file.
+        key (str): The widget key of the download button.
+    """
+    result_cache = get_result_cache()
+
+    def export_data():
+        with stage("export", file_name=file_name) as record:
+            data = result_cache.get_or_compute(export_key, build)
+            record["bytes"] = len(data)
+        return data
+
+    if DEFERRED_DOWNLOADS:
+        st.download_button(label, export_data, file_name, mime, key=key)
+        return
+
+    prepared = st.session_state.setdefault("prepared_exports", set())
+    if export_key not in prepared and st.button(
+        label.replace("Download as", "Prepare"), key=f"prepare-{key}"
+    ):
+        prepared.add(export_key)
+    if export_key in prepared:
+        st.download_button(label, export_data(), file_name, mime, key=key)
+
+
+def get_network_layout(result_cache, counts, edges, previous=None):
+    """
+    Get the node positions of a network, computing them once per node and edge set.
+
+    Args:
+        result_cache (ResultCache): The shared result cache.
+        counts (dict): The output of cooccurrence_counts the network was built from.
+        edges (dict): The drawn edges, as returned by select_edges.
+        previous (dict, optional): The positions last shown in the session. New
+            layouts are warm-started from them, so nodes stay roughly in place
+            when the filters change.
+
+    Returns:
+        dict: The (x, y) position of every drawn node, by node label.
+    """
+    layout_key = make_cache_key(
+        "layout",
+        tuple(counts["labels"]),
+        tuple(np.flatnonzero(counts["node_counts"] > 0).tolist()),
+        tuple(edges["source"].tolist()),
+        tuple(edges["target"].tolist()),
+    )
+    return result_cache.get_or_compute(
+        layout_key, lambda: network_layout(counts, edges, previous=previous)
     )
 
-    nodes_s6 = pd.read_csv(st.session_state.selected_files["network_config_file"])[
-        "columns_in_network"
-    ].tolist()
-    nodes_unique = list(set(nodes_s6))
+
+def compute_counts(label_matrix, nodes, positions, previous=None):
+    """
+    Count co-occurrences over the filtered rows. Runs as a background job.
+
+    Args:
+        label_matrix (numpy.ndarray or scipy.sparse matrix): The shared binary
+            label matrix of the nodes.
+        nodes (list): The node names.
+        positions (numpy.ndarray): The filtered row positions.
+        previous (dict, optional): The session's previous counts, updated
+            incrementally when possible.
+
+    Returns:
+        dict: The output of cooccurrence_counts_for_rows.
+    """
+    with stage("cooccurrence_counts") as record:
+        counts = cooccurrence_counts_for_rows(
+            label_matrix, nodes, positions, previous=previous
+        )
+        record.update(
+            rows=counts["rows"], columns=len(nodes), incremental=counts["incremental"]
+        )
+    return counts
+
+
+def compute_network(
+    result_cache,
+    network_key,
+    label_matrix,
+    nodes,
+    positions,
+    counts,
+    edge_reduction,
+    edge_color_map,
+    previous_layout=None,
+):
+    """
+    Select, lay out and build the network to draw, and store it in the result
+    cache. Runs as a background job.
+
+    Args:
+        result_cache (ResultCache): The shared result cache.
+        network_key (str): The cache key of the network.
+        label_matrix (numpy.ndarray or scipy.sparse matrix): The shared binary
+            label matrix of the nodes.
+        nodes (list): The node names.
+        positions (numpy.ndarray): The row positions of the network's papers.
+        counts (dict, optional): Co-occurrence counts over positions. Counted
+            from label_matrix if not given.
+        edge_reduction (dict): Keyword arguments of select_edges.
+        edge_color_map (dict): A dictionary mapping edge pairs to their colors.
+        previous_layout (dict, optional): The node positions last shown in the
+            session.
+
+    Returns:
+        tuple: The network (nodes, edges and the number of dropped edges) and
+        the node positions by label.
+    """
+    with stage("select_edges"):
+        if counts is None:
+            counts = cooccurrence_counts_for_rows(label_matrix, nodes, positions)
+        net_edges = select_edges(counts, **edge_reduction)
+    with stage("network_layout"):
+        layout = get_network_layout(
+            result_cache, counts, net_edges, previous=previous_layout
+        )
+    with stage("build_network") as record:
+        graph_nodes, graph_edges = build_network(
+            None,
+            edge_color_map,
+            counts=counts,
+            edges=net_edges,
+            positions=layout,
+        )
+        record.update(
+            nodes=len(graph_nodes),
+            edges=len(graph_edges),
+            dropped=net_edges["dropped"],
+        )
+    network = (graph_nodes, graph_edges, net_edges["dropped"])
+    result_cache.put(network_key, network)
+    return network, layout
+
+
+def compute_edge_table(result_cache, table_key, counts, cols_ar):
+    """
+    Compute the edge metrics table and store it in the result cache. Runs as a
+    background job.
+
+    Args:
+        result_cache (ResultCache): The shared result cache.
+        table_key (str): The cache key of the table.
+        counts (dict): Co-occurrence counts over the filtered rows.
+        cols_ar (list): The columns of the table.
+
+    Returns:
+        pandas.DataFrame: The output of network_tabular.
+    """
+    with stage("network_tabular") as record:
+        fim = network_tabular(None, cols_ar, counts=counts)
+        record_shape(record, fim)
+    result_cache.put(table_key, fim)
+    return fim
+
+
+def compute_intervals(
+    result_cache, ci_key, fim, df_labels, nodes, positions, n_resamples
+):
+    """
+    Add bootstrap confidence intervals to the edge table and store it in the
+    result cache. Runs as a background job.
+
+    Args:
+        result_cache (ResultCache): The shared result cache.
+        ci_key (str): The cache key of the table with intervals.
+        fim (pandas.DataFrame): The edge metrics table.
+        df_labels (pandas.DataFrame): The shared label frame.
+        nodes (list): The node names.
+        positions (numpy.ndarray): The filtered row positions.
+        n_resamples (int): Number of bootstrap resamples.
+
+    Returns:
+        pandas.DataFrame: The edge table with confidence interval columns.
+    """
+    with stage("bootstrap_intervals", resamples=n_resamples):
+        fim_ci = add_bootstrap_intervals(
+            fim,
+            df_labels.iloc[positions, df_labels.columns.get_indexer(nodes)],
+            n_resamples=n_resamples,
+            seed=BOOTSTRAP_SEED,
+            n_workers=BOOTSTRAP_WORKERS,
+        )
+    result_cache.put(ci_key, fim_ci)
+    return fim_ci
+
+
+def compute_comparison(
+    result_cache,
+    comparison_key,
+    label_matrix,
+    nodes,
+    filter_index,
+    positions,
+    names,
+    edge_reduction,
+    edge_color_map,
+    previous_layout=None,
+):
+    """
+    Build the networks of several subgroups and the table of their edge metric
+    differences, and store them in the result cache. Runs as a background job.
+
+    The counts of all subgroups are computed in one pass over their rows, and
+    the networks share one layout of the union of their edges, so every node
+    is drawn in the same place in each network.
+
+    Args:
+        result_cache (ResultCache): The shared result cache.
+        comparison_key (str): The cache key of the comparison.
+        label_matrix (numpy.ndarray or scipy.sparse matrix): The shared binary
+            label matrix of the nodes.
+        nodes (list): The node names.
+        filter_index (dict): The filter index of the dataset.
+        positions (numpy.ndarray): The filtered row positions.
+        names (list): The filter levels defining the subgroups. The first one is
+            the reference of the comparison.
+        edge_reduction (dict): Keyword arguments of select_edges.
+        edge_color_map (dict): A dictionary mapping edge pairs to their colors.
+        previous_layout (dict, optional): The node positions last shown in the
+            session.
+
+    Returns:
+        tuple: The network of each subgroup (nodes, edges and the number of
+        dropped edges), the number of papers in each subgroup, and the output of
+        compare_pair_metrics.
+    """
+    groups = [
+        np.intersect1d(
+            filter_positions(filter_index, multilabel=[[name]]),
+            positions,
+            assume_unique=True,
+        )
+        for name in names
+    ]
+    with stage("cooccurrence_counts_for_groups", groups=len(groups)):
+        group_counts = cooccurrence_counts_for_groups(label_matrix, nodes, groups)
+    with stage("select_edges"):
+        group_edges = [select_edges(counts, **edge_reduction) for counts in group_counts]
+
+    with stage("network_layout"):
+        n_nodes = len(nodes)
+        union_counts = {
+            "labels": list(nodes),
+            "rows": sum(counts["rows"] for counts in group_counts),
+            "node_counts": sum(counts["node_counts"] for counts in group_counts),
+            "pair_counts": sum(counts["pair_counts"] for counts in group_counts),
+        }
+        union_pairs = np.unique(
+            np.concatenate(
+                [edges["source"] * n_nodes + edges["target"] for edges in group_edges]
+            )
+        )
+        union_edges = {"source": union_pairs // n_nodes, "target": union_pairs % n_nodes}
+        layout = get_network_layout(
+            result_cache, union_counts, union_edges, previous=previous_layout
+        )
+
+    with stage("build_network"):
+        networks = []
+        for counts, edges in zip(group_counts, group_edges):
+            graph_nodes, graph_edges = build_network(
+                None, edge_color_map, counts=counts, edges=edges, positions=layout
+            )
+            networks.append((graph_nodes, graph_edges, edges["dropped"]))
+    with stage("compare_pair_metrics") as record:
+        df_compare = compare_pair_metrics(group_counts, names)
+        record_shape(record, df_compare)
+
+    comparison = (networks, [counts["rows"] for counts in group_counts], df_compare)
+    result_cache.put(comparison_key, comparison)
+    return comparison
+
+
+def poll_jobs(jobs):
+    """
+    Rerun the app whenever a current background job has finished, so results
+    are shown as they become available.
+
+    Args:
+        jobs (JobGroup): The session's background jobs.
+    """
+
+    @st.fragment(run_every=JOB_POLL_SECONDS)
+    def check_jobs():
+        if jobs.ready():
+            st.rerun()
+
+    check_jobs()
+
+
+def paper_frame(text_store, refids, positions):
+    """
+    Gather the Refid, Title and Abstract of some papers.
+
+    Args:
+        text_store (TextStore): The text store of the dataset.
+        refids (numpy.ndarray): The Refid of every row of the dataset.
+        positions (numpy.ndarray): The row positions of the papers.
+
+    Returns:
+        pandas.DataFrame: A DataFrame with 'Refid', 'Title' and 'Abstract' columns.
+    """
+    df_papers = text_store.frame(positions, TEXT_COLUMNS)
+    df_papers.insert(0, "Refid", refids[positions])
+    return df_papers
+
+
+def build_paper_export(text_store, refids, positions, export_format):
+    """
+    Build a CSV or RIS export of some papers, decoding their text in chunks.
+
+    Args:
+        text_store (TextStore): The text store of the dataset.
+        refids (numpy.ndarray): The Refid of every row of the dataset.
+        positions (numpy.ndarray): The row positions of the papers.
+        export_format (str): Either 'csv' or 'ris'.
+
+    Returns:
+        bytes: The exported data, encoded as UTF-8.
+    """
+    return build_export(
+        pd.DataFrame({"Refid": refids}), export_format, positions, text_store=text_store
+    )
+
+
+def show_paper_page(positions):
+    """
+    Show the paper table's page controls and select the rows of the current page.
+
+    Args:
+        positions (numpy.ndarray): The row positions of all papers in the table.
+
+    Returns:
+        numpy.ndarray: The row positions of the papers on the current page.
+    """
+    n_pages = max(1, -(-len(positions) // PAPER_PAGE_SIZE))
+    page = 1
+    if n_pages > 1:
+        page = int(st.number_input(f"Page (of {n_pages})", 1, n_pages, 1))
+
+    start = (page - 1) * PAPER_PAGE_SIZE
+    page_positions = positions[start : start + PAPER_PAGE_SIZE]
+    if len(positions):
+        st.caption(
+            f"Papers {start + 1}-{start + len(page_positions)} of {len(positions)}"
+        )
+    return page_positions
+
+
+def show_diagnostics(run, recent_runs=()):
+    """
+    Show the stage timings and peak memory of the current rerun in the sidebar.
+
+    Reruns are traced while the panel is open, so peak memory is shown from the
+    next rerun on. Background jobs usually finish after the rerun that started
+    them, so their stages are shown separately for the recent reruns.
+
+    Args:
+        run (dict): The run record of the current rerun, from start_run.
+        recent_runs (iterable, optional): The run records of the session's
+            earlier reruns, oldest first.
+    """
+    with st.sidebar:
+        if not st.checkbox("Show diagnostics", key="show_diagnostics"):
+            return
+
+        st.header("Diagnostics")
+        if not memory_traced(run):
+            st.caption(
+                "Peak memory is recorded from the next rerun on, while no other "
+                "session's rerun is being traced."
+            )
+
+        df_stages = show_stage_table(run["stages"])
+        st.caption(f"Total of stages: {df_stages['seconds'].sum():.3f} s")
+
+        background = [
+            record for earlier in reversed(recent_runs) for record in late_stages(earlier)
+        ]
+        if background:
+            st.subheader("Background jobs")
+            show_stage_table(background)
+            st.caption(
+                f"Stages finished after their rerun, over the last {DIAGNOSTICS_RUNS} "
+                "reruns, newest first."
+            )
+
+
+def show_stage_table(stages):
+    """
+    Show a table of stage records.
+
+    Args:
+        stages (list): Stage records, as recorded by stage.
+
+    Returns:
+        pandas.DataFrame: The table shown.
+    """
+    df_stages = pd.DataFrame(
+        stages, columns=["stage", "rows", "columns", "seconds", "peak_bytes"]
+    )
+    df_stages["peak_mib"] = df_stages.pop("peak_bytes") / 2**20
+    st.dataframe(
+        df_stages.style.format(
+            {"seconds": "{:.3f}", "peak_mib": "{:.1f}"}, na_rep="", precision=0
+        ),
+        hide_index=True,
+    )
+    return df_stages
+
+
+def create_application():
+    input_config = st.session_state.input_config
+    dataset_dir = st.session_state.dataset_dir
+    dataset = get_shared_dataset(dataset_dir)
+    df_prep = dataset["labels"]
+    filter_index = dataset["filter_index"]
+    edge_color_map = input_config["edge_color_map"]
+    nodes_unique = input_config["nodes"]
 
     cols_ar = [
         "entity_1",
@@ -254,88 +1041,254 @@ def create_application():
     with st.sidebar:
         st.header("Filters")
 
-        if "filter_group_file" in st.session_state.selected_files:
-            filter_groups = pd.read_csv(
-                st.session_state.selected_files["filter_group_file"]
-            )
+        if input_config["filter_groups"] is not None:
             filters = {}
 
-            for group_name in filter_groups["filter_group_name"].unique():
-                columns_in_group = filter_groups[
-                    filter_groups["filter_group_name"] == group_name
-                ]["columns_in_group"].tolist()
+            for group_name, columns_in_group in input_config["filter_groups"].items():
                 filters[group_name] = st.multiselect(group_name, columns_in_group)
 
             selected_filters = [
                 item for sublist in filters.values() for item in sublist
             ]
+            filter_levels = [
+                item
+                for columns_in_group in input_config["filter_groups"].values()
+                for item in columns_in_group
+            ]
         else:
             all_columns = [
                 col
-                for col in st.session_state.df_prep.columns
+                for col in df_prep.columns
                 if col not in ["Refid", "Title", "Abstract"]
             ]
             selected_filters = st.multiselect("Select filters", all_columns)
+            filter_levels = all_columns
+
+        text_query = st.text_input(
+            "Search titles and abstracts",
+            help='Papers must contain every word. Use "quotes" for phrases and '
+            "a trailing * to match word prefixes, e.g. thyro*.",
+        ).strip()
+
+        st.header("Network")
+        edge_reduction = {"max_edges": MAX_NETWORK_EDGES}
+        reduction_mode = st.selectbox(
+            "Edge reduction",
+            EDGE_REDUCTIONS,
+            help="Reduce dense networks to their strongest edges before drawing. "
+            f"At most {MAX_NETWORK_EDGES} edges are drawn.",
+        )
+        if reduction_mode == "Disparity filter":
+            edge_reduction["alpha"] = st.number_input(
+                "Significance level", 0.001, 1.0, 0.05, step=0.01, format="%.3f"
+            )
+        elif reduction_mode != "None":
+            edge_reduction["metric"] = st.selectbox("Edge metric", EDGE_METRICS)
+            if reduction_mode == "Top-k per node":
+                edge_reduction["top_k"] = int(
+                    st.number_input("Edges per node", 1, 100, 5)
+                )
+            else:
+                edge_reduction["min_value"] = st.number_input(
+                    f"Minimum {edge_reduction['metric']}",
+                    value=2.0 if edge_reduction["metric"] == "count" else 0.0,
+                )
+
+        n_resamples = None
+        if st.checkbox(
+            "Confidence intervals",
+            help="Add 95% bootstrap confidence intervals for lift, leverage and "
+            "PMI to the edge table, by resampling papers.",
+        ):
+            n_resamples = int(
+                st.number_input("Bootstrap resamples", 100, 10000, 200, step=100)
+            )
+
+        st.header("Compare")
+        compare_groups = st.multiselect(
+            "Subgroups",
+            [level for level in filter_levels if level in filter_index["labels"]],
+            max_selections=MAX_COMPARED_GROUPS,
+            help="Show the networks of several filter levels side by side, within "
+            "the current filters and search, with a table of their edge metric "
+            "differences from the first one.",
+        )
 
     # Apply filters
     if (
-        st.session_state.filtered_df is None
+        st.session_state.filtered_positions is None
         or selected_filters != st.session_state.selected_filters
+        or text_query != st.session_state.text_query
     ):
-        st.session_state.filtered_df = apply_filters(
-            st.session_state.df_prep, selected_filters=selected_filters
-        )
+        text_positions = None
+        if text_query:
+            with stage("search_text") as record:
+                text_positions = search_text(
+                    get_text_index(dataset_dir),
+                    text_query,
+                    get_text_store(dataset_dir),
+                )
+                if text_positions is not None:
+                    record_shape(record, text_positions)
+        with stage("apply_filters") as record:
+            st.session_state.filtered_positions = apply_filters(
+                df_prep,
+                selected_filters=selected_filters,
+                index=filter_index,
+                return_positions=True,
+                text_positions=text_positions,
+            )
+            record_shape(record, st.session_state.filtered_positions)
         st.session_state.selected_filters = selected_filters
+        st.session_state.text_query = text_query
 
-    df_filter = st.session_state.filtered_df
+    filtered_positions = st.session_state.filtered_positions
 
     # Node filters
     col_n1, col_n2 = st.columns([2, 2])
     node1 = col_n1.selectbox("Node 1", ["", *nodes_unique])
     node2 = col_n2.selectbox("Node 2", ["", *nodes_unique])
 
-    if node1 == "" or node2 == "":
-        df_filter_net = df_filter
+    # The session keeps row positions only; data is gathered from the shared
+    # dataset when a stage needs it
+    node_pair = node1 != "" and node2 != ""
+    if not node_pair:
+        net_positions = filtered_positions
+    elif node1 in filter_index["labels"] and node2 in filter_index["labels"]:
+        net_positions = pair_positions(filter_index, node1, node2, filtered_positions)
     else:
-        df_filter_net = df_filter[(df_filter[node1] == 1) & (df_filter[node2] == 1)]
+        df_pair = df_prep[[node1, node2]].iloc[filtered_positions]
+        both_nodes = (df_pair[node1] == 1) & (df_pair[node2] == 1)
+        net_positions = filtered_positions[both_nodes.to_numpy()]
 
     # Network details
     col1, col2 = st.columns([3, 1])
 
+    # Cached results are keyed by preprocessed dataset, filters, search and node set
+    result_cache = get_result_cache()
+    cache_key_base = (
+        st.session_state.dataset_key,
+        tuple(sorted(selected_filters)),
+        text_query,
+        tuple(sorted(nodes_unique)),
+    )
+    table_key = make_cache_key("edge_table", *cache_key_base, tuple(cols_ar))
+    network_key = make_cache_key(
+        "network",
+        *cache_key_base,
+        input_config["edge_view_key"],
+        tuple(sorted(edge_reduction.items())),
+        node1,
+        node2,
+    )
+    export_key_base = (
+        "export",
+        st.session_state.dataset_key,
+        tuple(sorted(selected_filters)),
+        text_query,
+        node1,
+        node2,
+    )
+
+    # Heavy stages run as background jobs; results are shown as they finish
+    if "jobs" not in st.session_state:
+        st.session_state.jobs = JobGroup(get_job_executor())
+    jobs = st.session_state.jobs
+    ci_key = None
+    if n_resamples is not None:
+        ci_key = make_cache_key("edge_table_ci", table_key, n_resamples, BOOTSTRAP_SEED)
+    comparison_key = None
+    if len(compare_groups) > 1:
+        comparison_key = make_cache_key(
+            "comparison",
+            *cache_key_base,
+            input_config["edge_view_key"],
+            tuple(sorted(edge_reduction.items())),
+            tuple(compare_groups),
+        )
+    jobs.begin((table_key, network_key, ci_key, comparison_key))
+
     # Network
     with col1:
-        df_net = df_filter_net[nodes_unique]
-        create_network(df_net, edge_color_map)
-
-        fim = network_tabular(df_filter[nodes_unique], cols_ar)
-        fim_filter = fim.loc[(fim["entity_1"] == node1) & (fim["entity_2"] == node2)]
-        if fim_filter.shape[0] != 1:
-            fim_filter = fim.loc[
-                (fim["entity_1"] == node2) & (fim["entity_2"] == node1)
-            ]
+        fim = result_cache.get(table_key)
+        network = result_cache.get(network_key)
+
+        counts = None
+        label_matrix = get_label_matrix(dataset_dir, tuple(nodes_unique))
+        if fim is None or (network is None and not node_pair):
+            # Counts are updated incrementally from the previous filter selection
+            counts = jobs.result(
+                "counts",
+                make_cache_key("counts", *cache_key_base),
+                compute_counts,
+                label_matrix,
+                nodes_unique,
+                filtered_positions,
+                previous=st.session_state.cooccurrence_counts,
+            )
+            if counts is not None:
+                st.session_state.cooccurrence_counts = counts
+
+        if network is None and (node_pair or counts is not None):
+            job_result = jobs.result(
+                "network",
+                network_key,
+                compute_network,
+                result_cache,
+                network_key,
+                label_matrix,
+                nodes_unique,
+                net_positions,
+                None if node_pair else counts,
+                edge_reduction,
+                edge_color_map,
+                previous_layout=st.session_state.get("layout_positions"),
+            )
+            if job_result is not None:
+                network, layout = job_result
+                st.session_state.layout_positions = {
+                    **(st.session_state.get("layout_positions") or {}),
+                    **layout,
+                }
+
+        if network is not None:
+            nodes, edges, dropped_edges = network
+            with stage("render_network"):
+                render_network(nodes, edges, physics=False)
+            if dropped_edges:
+                st.caption(
+                    f"Showing {len(edges)} of {len(edges) + dropped_edges} edges "
+                    f"({dropped_edges} dropped by edge reduction)"
+                )
+        elif counts is not None and not node_pair:
+            n_nodes = int((counts["node_counts"] > 0).sum())
+            st.info(f"Drawing the network of {n_nodes} nodes...")
+        else:
+            st.info("Counting co-occurrences...")
+
+        if fim is None and counts is not None:
+            fim = jobs.result(
+                "edge_table",
+                table_key,
+                compute_edge_table,
+                result_cache,
+                table_key,
+                counts,
+                cols_ar,
+            )
+
+        # Edge metrics are looked up by node pair instead of scanning the table
+        fim_filter = None
+        if fim is not None:
+            pair_row = get_pair_index(table_key, fim).get((node1, node2))
+            fim_filter = fim.iloc[[] if pair_row is None else [pair_row]]
 
     # Metrics
-    col2.metric("Number of papers", df_filter_net.shape[0])
+    col2.metric("Number of papers", len(net_positions))
 
     ## Table & FIM Metrics
 
-    # Generate markdown string for edge legend
-    edge_legend_md = "**Edge Legend:**\n"
-    unique_colors = set()
-    color_to_labels = {}
-
-    for node1 in edge_color_map:
-        for node2 in edge_color_map[node1]:
-            color = edge_color_map[node1][node2]["color"]
-            label = edge_color_map[node1][node2]["label"]
-            unique_colors.add(color)
-            if color not in color_to_labels:
-                color_to_labels[color] = set()
-            color_to_labels[color].add(label)
-
-    for color in unique_colors:
-        labels_str = ", ".join(sorted(color_to_labels[color]))
-        edge_legend_md += f"- :{color}[**{color.capitalize()}**] = {labels_str}\n"
+    edge_legend_md = edge_legend_markdown(input_config["edge_view_key"], edge_color_map)
 
     if node1 == "" or node2 == "":
         show_net_details = True
@@ -344,19 +1297,21 @@ def create_application():
         col2.metric("Leverage", "N/A")
         col2.markdown(edge_legend_md)
 
+    elif fim_filter is None:
+        show_net_details = False
+        col2.metric("PMI", "...")
+        col2.metric("Lift", "...")
+        col2.metric("Leverage", "...")
+        col2.markdown(edge_legend_md)
+
     elif (node1 == node2) or (fim_filter.empty):
         show_net_details = True
-        df_tiab = df_filter_net[["Refid", "Title", "Abstract"]]
-        csv = to_csv_data(df_tiab)
         col2.metric("PMI", "N/A")
         col2.metric("Lift", "N/A")
         col2.metric("Leverage", "N/A")
         col2.markdown(edge_legend_md)
     else:
         show_net_details = False
-        tiab_cols = ["Refid", "Title", "Abstract"]
-        df_tiab = df_filter_net[tiab_cols]
-        csv = to_csv_data(df_tiab)
         col2.metric("PMI", round(fim_filter["pmi"].iloc[0], 3))
         col2.metric("Lift", round(fim_filter["lift"].iloc[0], 3))
         col2.metric("Leverage", round(fim_filter["leverage"].iloc[0], 3))
@@ -365,33 +1320,114 @@ def create_application():
     if show_net_details:
         with st.expander("Network Details"):
             st.subheader("Edges")
-            st.write(fim)
+            if fim is None:
+                st.caption("Computing edge metrics...")
+            else:
+                if ci_key is not None:
+                    fim_ci = result_cache.get(ci_key)
+                    if fim_ci is None:
+                        fim_ci = jobs.result(
+                            "bootstrap_intervals",
+                            ci_key,
+                            compute_intervals,
+                            result_cache,
+                            ci_key,
+                            fim,
+                            df_prep,
+                            nodes_unique,
+                            filtered_positions,
+                            n_resamples,
+                        )
+                    if fim_ci is None:
+                        st.caption("Computing confidence intervals...")
+                    else:
+                        fim = fim_ci
+                st.write(fim)
+
+    if comparison_key is not None:
+        st.subheader("Subgroup comparison")
+        comparison = result_cache.get(comparison_key)
+        if comparison is None:
+            comparison = jobs.result(
+                "comparison",
+                comparison_key,
+                compute_comparison,
+                result_cache,
+                comparison_key,
+                label_matrix,
+                nodes_unique,
+                filter_index,
+                filtered_positions,
+                compare_groups,
+                edge_reduction,
+                edge_color_map,
+                previous_layout=st.session_state.get("layout_positions"),
+            )
+
+        if comparison is None:
+            st.info(f"Comparing {len(compare_groups)} subgroups...")
+        else:
+            networks, group_rows, df_compare = comparison
+            for start in range(0, len(networks), COMPARISON_COLUMNS):
+                stop = start + COMPARISON_COLUMNS
+                for col, name, rows, (nodes, edges, dropped_edges) in zip(
+                    st.columns(COMPARISON_COLUMNS),
+                    compare_groups[start:stop],
+                    group_rows[start:stop],
+                    networks[start:stop],
+                ):
+                    with col:
+                        st.markdown(f"**{name}** ({rows} papers)")
+                        if nodes:
+                            render_network(
+                                nodes, edges, physics=False, width=400, height=400
+                            )
+                        if dropped_edges:
+                            st.caption(
+                                f"Showing {len(edges)} of "
+                                f"{len(edges) + dropped_edges} edges"
+                            )
+            st.caption(f"Deltas are relative to {compare_groups[0]}.")
+            st.write(df_compare)
 
     st.subheader("Papers")
 
-    df_tiab = df_tiab.style.format({"Refid": lambda x: "{:.0f}".format(x)})
-    st.dataframe(df_tiab)
+    text_store = get_text_store(dataset_dir)
+    refids = df_prep["Refid"].to_numpy()
+    with stage("paper_table") as record:
+        page_positions = show_paper_page(net_positions)
+        record_shape(record, page_positions)
+        df_tiab = paper_frame(text_store, refids, page_positions)
+        df_tiab = df_tiab.style.format({"Refid": lambda x: "{:.0f}".format(x)})
+        st.dataframe(df_tiab)
 
     current_time = datetime.now().strftime("%m%d%y%H%M%S")
     csv_filename = f"litconnector_export_{current_time}.csv"
     ris_filename = f"litconnector_export_{current_time}.ris"
 
-    st.download_button(
+    export_download_button(
         "Download as .CSV",
-        csv,
+        make_cache_key(*export_key_base, "csv"),
+        partial(build_paper_export, text_store, refids, net_positions, "csv"),
         csv_filename,
         "text/csv",
         key="download-csv-network",
     )
-    ris_data = to_ris_data(df_filter_net[["Refid", "Title", "Abstract"]])
-    st.download_button(
+    export_download_button(
         "Download as .RIS",
-        ris_data,
+        make_cache_key(*export_key_base, "ris"),
+        partial(build_paper_export, text_store, refids, net_positions, "ris"),
         ris_filename,
         "application/x-research-info-systems",
         key="download-ris-network",
     )
 
+    # Jobs for earlier selections are dropped; the page reruns once the
+    # current ones have finished
+    jobs.discard_stale()
+    if jobs.pending():
+        poll_jobs(jobs)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,163 @@
+import numpy as np
+
+EDGE_METRICS = ["count", "lift", "pmi"]
+
+
+def edge_scores(counts, source, target, metric="count"):
+    """
+    Score node pairs by an association metric.
+
+    Args:
+        counts (dict): The output of cooccurrence_counts.
+        source (numpy.ndarray): The first node index of each pair.
+        target (numpy.ndarray): The second node index of each pair.
+        metric (str, optional): 'count' (co-occurrence count), 'lift' or 'pmi'.
+
+    Returns:
+        numpy.ndarray: The score of each pair, as float64.
+    """
+    co_counts = counts["pair_counts"][source, target].astype(np.float64)
+    if metric == "count":
+        return co_counts
+    if metric not in EDGE_METRICS:
+        raise ValueError(f"Unknown edge metric: {metric}")
+
+    node_counts = counts["node_counts"]
+    rows = max(counts["rows"], 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        lift = co_counts * rows / (node_counts[source] * node_counts[target])
+        return lift if metric == "lift" else np.log(lift)
+
+
+def disparity_significance(source, target, weights, n_nodes):
+    """
+    Compute the disparity filter significance of each edge.
+
+    For an edge incident to a node of degree k and strength s, the probability of
+    the edge weight w under a uniform random split of s over k edges is
+    (1 - w / s) ** (k - 1) (Serrano, Boguna & Vespignani, 2009). The edge keeps the
+    smaller of its two endpoint probabilities; edges of degree-one nodes are always
+    significant.
+
+    Args:
+        source (numpy.ndarray): The first node index of each edge.
+        target (numpy.ndarray): The second node index of each edge.
+        weights (numpy.ndarray): The edge weights.
+        n_nodes (int): The number of nodes.
+
+    Returns:
+        numpy.ndarray: The significance level (p-value) of each edge.
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    degree = np.bincount(source, minlength=n_nodes) + np.bincount(
+        target, minlength=n_nodes
+    )
+    strength = np.bincount(source, weights, minlength=n_nodes) + np.bincount(
+        target, weights, minlength=n_nodes
+    )
+
+    def endpoint_alpha(node):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            alpha = (1 - weights / strength[node]) ** (degree[node] - 1)
+        return np.where(degree[node] > 1, alpha, 0.0)
+
+    return np.minimum(endpoint_alpha(source), endpoint_alpha(target))
+
+
+def top_k_per_node(source, target, scores, n_nodes, k):
+    """
+    Select the k highest scoring edges of every node.
+
+    Args:
+        source (numpy.ndarray): The first node index of each edge.
+        target (numpy.ndarray): The second node index of each edge.
+        scores (numpy.ndarray): The edge scores.
+        n_nodes (int): The number of nodes.
+        k (int): Number of edges kept per node.
+
+    Returns:
+        numpy.ndarray: A boolean mask of the edges among the top k of at least
+        one of their endpoints.
+    """
+    n_edges = len(scores)
+    node = np.concatenate([source, target])
+    edge = np.concatenate([np.arange(n_edges), np.arange(n_edges)])
+    score = np.concatenate([scores, scores])
+
+    # Sort by node, then by descending score, keeping ties in edge order
+    order = np.lexsort((edge, -score, node))
+    node = node[order]
+    first = np.searchsorted(node, np.arange(n_nodes))
+    rank = np.arange(len(node)) - first[node]
+
+    keep = np.zeros(n_edges, dtype=bool)
+    keep[edge[order][rank < k]] = True
+    return keep
+
+
+def select_edges(
+    counts,
+    metric="count",
+    top_k=None,
+    min_value=None,
+    alpha=None,
+    max_edges=None,
+    min_count=2,
+):
+    """
+    Select the network edges to draw, reducing dense graphs to their backbone.
+
+    Candidate edges are the node pairs co-occurring at least min_count times.
+    The reductions are applied in order: the global metric threshold, the
+    disparity filter on co-occurrence counts, the top-k edges per node by the
+    metric, and finally a cap on the total number of edges, keeping the highest
+    scoring ones.
+
+    Args:
+        counts (dict): The output of cooccurrence_counts.
+        metric (str, optional): The metric used to rank and threshold edges:
+            'count', 'lift' or 'pmi'.
+        top_k (int, optional): Keep only the top_k edges of every node.
+        min_value (float, optional): Keep only edges whose metric is at least
+            min_value.
+        alpha (float, optional): Keep only edges that are significant at level
+            alpha under the disparity filter.
+        max_edges (int, optional): The maximum number of edges kept.
+        min_count (int, optional): The minimum co-occurrence count of an edge.
+
+    Returns:
+        dict: A dictionary with 'source' and 'target' (node indices of the kept
+        edges, ordered as in the upper triangle of the pair count matrix),
+        'candidates' (the number of candidate edges) and 'dropped' (the number of
+        candidate edges removed by the reductions).
+    """
+    n_nodes = len(counts["labels"])
+    source, target = np.nonzero(np.triu(counts["pair_counts"] >= min_count, k=1))
+    candidates = len(source)
+
+    scores = edge_scores(counts, source, target, metric)
+    keep = ~np.isnan(scores)
+    if min_value is not None:
+        keep &= scores >= min_value
+    if alpha is not None:
+        co_counts = counts["pair_counts"][source[keep], target[keep]]
+        keep[keep] = (
+            disparity_significance(source[keep], target[keep], co_counts, n_nodes)
+            < alpha
+        )
+    if top_k is not None:
+        keep[keep] = top_k_per_node(
+            source[keep], target[keep], scores[keep], n_nodes, top_k
+        )
+    if max_edges is not None and keep.sum() > max_edges:
+        kept = np.flatnonzero(keep)
+        strongest = kept[np.argsort(-scores[kept], kind="stable")[:max_edges]]
+        keep[:] = False
+        keep[strongest] = True
+
+    return {
+        "source": source[keep],
+        "target": target[keep],
+        "candidates": candidates,
+        "dropped": candidates - int(keep.sum()),
+    }
@@ -0,0 +1,238 @@
+import argparse
+import itertools
+import os
+
+import pandas as pd
+
+from cooccurrence import as_binary_matrix, cooccurrence_counts_for_rows
+from data_filtering import build_filter_index, filter_all
+from data_processing import create_edge_color_map, load_data, preprocess_data
+from jobs import process_pool
+from network_analysis import network_tabular
+
+COLS_AR = [
+    "entity_1",
+    "entity_2",
+    "entity_1_count",
+    "entity_2_count",
+    "co-occurrence_count",
+    "support",
+    "lift",
+    "leverage",
+    "pmi",
+]
+
+# Read-only data shared with the worker processes
+_shared = {}
+
+
+def enumerate_selections(filter_groups, mode, selection_file=None):
+    """
+    Enumerate the filter selections to compute edge tables for.
+
+    Args:
+        filter_groups (pandas.DataFrame): The filter group file contents, with
+            'filter_group_name' and 'columns_in_group' columns.
+        mode (str): 'singles' for every level on its own, 'pairs' for every pair
+            of levels from two different groups, or 'list' for the selections in
+            selection_file.
+        selection_file (str, optional): A CSV file with 'selection_name' and
+            'columns_in_selection' columns, one row per level in a selection.
+            Required for the 'list' mode.
+
+    Returns:
+        list: A list of (selection name, list of level groups) tuples. Papers must
+        have at least one level of every group, so a pair selects the papers with
+        both levels, and a listed selection those with any of its levels, as in
+        the app's sidebar.
+    """
+    if mode == "singles":
+        return [(level, [[level]]) for level in filter_groups["columns_in_group"]]
+
+    if mode == "pairs":
+        groups = {
+            name: group["columns_in_group"].tolist()
+            for name, group in filter_groups.groupby("filter_group_name", sort=False)
+        }
+        return [
+            (f"{level_1} + {level_2}", [[level_1], [level_2]])
+            for group_1, group_2 in itertools.combinations(groups, 2)
+            for level_1 in groups[group_1]
+            for level_2 in groups[group_2]
+        ]
+
+    if mode == "list":
+        if selection_file is None:
+            raise ValueError("A selection file is required for the 'list' mode")
+        selections = pd.read_csv(selection_file)
+        return [
+            (name, [group["columns_in_selection"].tolist()])
+            for name, group in selections.groupby("selection_name", sort=False)
+        ]
+
+    raise ValueError(f"Unknown selection mode: {mode}")
+
+
+def compute_edge_table(selection):
+    """
+    Compute the edge table of one filter selection from the shared data.
+
+    Args:
+        selection (tuple): A (selection name, list of level groups) tuple.
+
+    Returns:
+        pandas.DataFrame: The edge table, with the selection name and number of
+        papers prepended.
+    """
+    name, level_groups = selection
+    positions = filter_all(
+        _shared["df_labels"],
+        multilabel=level_groups,
+        index=_shared["filter_index"],
+        return_positions=True,
+    )
+    counts = cooccurrence_counts_for_rows(
+        _shared["label_matrix"], _shared["nodes"], positions
+    )
+    fim = network_tabular(None, COLS_AR, counts=counts)
+    fim.insert(0, "selection", name)
+    fim.insert(1, "n_papers", len(positions))
+    return fim
+
+
+def _init_worker(shared):
+    _shared.update(shared)
+
+
+def run_batch(
+    distiller_input_file,
+    network_config_file,
+    filter_group_file,
+    selections,
+    network_edge_view_options=None,
+    n_workers=1,
+):
+    """
+    Compute the edge tables of many filter selections across a process pool.
+
+    Each selection is applied with filter_all, with the levels of a group ORed
+    and the groups ANDed.
+
+    Args:
+        distiller_input_file (str): Path to the labelled title & abstract file.
+        network_config_file (str): Path to the network config file.
+        filter_group_file (str): Path to the filter group file.
+        selections (list): A list of (selection name, list of level groups)
+            tuples, e.g. from enumerate_selections.
+        network_edge_view_options (str, optional): Path to the edge view options
+            file. When given, the edge colors and labels are added to the output.
+        n_workers (int, optional): Number of worker processes.
+
+    Returns:
+        pandas.DataFrame: The edge tables of all selections, concatenated.
+    """
+    df_prep = preprocess_data(load_data(distiller_input_file), n_workers=n_workers)
+    nodes = list(
+        dict.fromkeys(pd.read_csv(network_config_file)["columns_in_network"])
+    )
+    filter_columns = pd.read_csv(filter_group_file)["columns_in_group"].tolist()
+    missing_columns = [
+        col
+        for col in dict.fromkeys(
+            nodes
+            + [
+                level
+                for _, level_groups in selections
+                for levels in level_groups
+                for level in levels
+            ]
+        )
+        if col not in df_prep.columns
+    ]
+    if missing_columns:
+        raise ValueError(
+            f"Columns not found in {distiller_input_file}: {', '.join(missing_columns)}"
+        )
+
+    df_labels = df_prep[
+        [col for col in dict.fromkeys(nodes + filter_columns) if col in df_prep.columns]
+    ]
+    label_matrix, _ = as_binary_matrix(df_labels[nodes])
+    shared = {
+        "df_labels": df_labels,
+        "filter_index": build_filter_index(df_labels, category_columns=[]),
+        "label_matrix": label_matrix,
+        "nodes": nodes,
+    }
+
+    if n_workers > 1:
+        with process_pool(
+            n_workers, initializer=_init_worker, initargs=(shared,)
+        ) as executor:
+            tables = list(executor.map(compute_edge_table, selections))
+    else:
+        _init_worker(shared)
+        tables = [compute_edge_table(selection) for selection in selections]
+
+    if tables:
+        df_batch = pd.concat(tables, ignore_index=True)
+    else:
+        df_batch = pd.DataFrame(columns=["selection", "n_papers", *COLS_AR])
+
+    if network_edge_view_options is not None:
+        edge_color_map = create_edge_color_map(network_edge_view_options)
+        edge_views = [
+            edge_color_map.get(entity_1, {}).get(entity_2, {})
+            for entity_1, entity_2 in zip(df_batch["entity_1"], df_batch["entity_2"])
+        ]
+        df_batch["edge_color"] = [view.get("color", "lightgrey") for view in edge_views]
+        df_batch["edge_label"] = [view.get("label") for view in edge_views]
+
+    return df_batch
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compute LitConnector edge tables for many filter selections."
+    )
+    parser.add_argument("--distiller-input-file", required=True)
+    parser.add_argument("--network-config-file", required=True)
+    parser.add_argument("--filter-group-file", required=True)
+    parser.add_argument("--network-edge-view-options")
+    parser.add_argument(
+        "--mode",
+        choices=["singles", "pairs", "list"],
+        default="singles",
+        help="Filter selections to compute: every single level, every pair of "
+        "levels across groups, or the selections in --selection-file.",
+    )
+    parser.add_argument(
+        "--selection-file",
+        help="CSV file with 'selection_name' and 'columns_in_selection' columns.",
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        "--output", default="litconnector_batch.parquet", help="Output Parquet file."
+    )
+    args = parser.parse_args(argv)
+
+    selections = enumerate_selections(
+        pd.read_csv(args.filter_group_file), args.mode, args.selection_file
+    )
+    df_batch = run_batch(
+        args.distiller_input_file,
+        args.network_config_file,
+        args.filter_group_file,
+        selections,
+        network_edge_view_options=args.network_edge_view_options,
+        n_workers=args.workers,
+    )
+    df_batch.to_parquet(args.output, index=False)
+    print(
+        f"Wrote {df_batch.shape[0]} edges for {len(selections)} selections "
+        f"to {args.output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import numpy as np
+
+from cooccurrence import as_binary_matrix
+from jobs import process_pool
+
+BOOTSTRAP_BATCH = 50
+PAIR_CHUNK_CELLS = 2**24
+INTERVAL_METRICS = ["lift", "leverage", "pmi"]
+
+# Read-only patterns shared with the worker processes
+_shared = {}
+
+
+def bootstrap_pair_counts(X, pairs, n_resamples=200, seed=0, n_workers=1):
+    """
+    Count node and pair occurrences in bootstrap resamples of the rows.
+
+    Rows with the same label pattern are collapsed first, so a resample is a
+    multinomial draw of pattern weights, and the counts of a batch of resamples
+    are one weighted matrix product. Resamples are drawn in fixed-size batches,
+    each from its own child of the seed, so the result does not depend on the
+    number of workers. Workers receive the patterns once, when they start.
+
+    Args:
+        X (pandas.DataFrame, numpy.ndarray or scipy.sparse matrix): The label matrix,
+            one row per reference and one column per node.
+        pairs (tuple): The (first node index, second node index) arrays of the
+            pairs to count.
+        n_resamples (int, optional): Number of bootstrap resamples.
+        seed (int, optional): Seed of the resampling.
+        n_workers (int, optional): Number of worker processes.
+
+    Returns:
+        tuple: The node counts (n_resamples x nodes) and pair counts
+        (n_resamples x pairs) of every resample, as int64 arrays.
+    """
+    B, _ = as_binary_matrix(X)
+    if hasattr(B, "toarray"):
+        B = B.toarray()
+    B = np.asarray(B, dtype=bool)
+    rows = B.shape[0]
+
+    # Collapse identical rows into weighted patterns
+    packed = np.ascontiguousarray(np.packbits(B, axis=1))
+    keys = packed.view(np.dtype((np.void, packed.shape[1]))).ravel()
+    _, first, multiplicity = np.unique(keys, return_index=True, return_counts=True)
+    patterns = B[first].astype(np.float32)
+
+    batches = [
+        min(BOOTSTRAP_BATCH, n_resamples - start)
+        for start in range(0, n_resamples, BOOTSTRAP_BATCH)
+    ]
+    seeds = np.random.SeedSequence(seed).spawn(len(batches))
+    shared = {
+        "patterns": patterns,
+        "multiplicity": multiplicity,
+        "rows": rows,
+        "pairs": pairs,
+    }
+
+    if n_workers > 1 and len(batches) > 1:
+        with process_pool(
+            n_workers, initializer=_init_worker, initargs=(shared,)
+        ) as executor:
+            results = list(executor.map(_count_shared_batch, batches, seeds))
+    else:
+        results = [
+            _count_batch(**shared, size=size, seed=batch_seed)
+            for size, batch_seed in zip(batches, seeds)
+        ]
+
+    if not results:
+        return (
+            np.zeros((0, B.shape[1]), dtype=np.int64),
+            np.zeros((0, len(pairs[0])), dtype=np.int64),
+        )
+    node_counts = np.concatenate([result[0] for result in results])
+    pair_counts = np.concatenate([result[1] for result in results])
+    return node_counts, pair_counts
+
+
+def _init_worker(shared):
+    _shared.update(shared)
+
+
+def _count_shared_batch(size, seed):
+    return _count_batch(**_shared, size=size, seed=seed)
+
+
+def _count_batch(patterns, multiplicity, rows, pairs, size, seed):
+    rng = np.random.default_rng(seed)
+    weights = rng.multinomial(rows, multiplicity / rows, size=size).astype(np.float32)
+
+    # float32 products of 0/1 patterns and integer weights are exact below 2**24 rows
+    node_counts = np.rint(weights @ patterns).astype(np.int64)
+
+    first, second = pairs
+    pair_counts = np.zeros((size, len(first)), dtype=np.int64)
+    chunk = max(1, PAIR_CHUNK_CELLS // max(len(patterns), 1))
+    for start in range(0, len(first), chunk):
+        stop = start + chunk
+        both = patterns[:, first[start:stop]] * patterns[:, second[start:stop]]
+        pair_counts[:, start:stop] = np.rint(weights @ both)
+    return node_counts, pair_counts
+
+
+def add_bootstrap_intervals(
+    df_pairs, X, n_resamples=200, confidence=0.95, seed=0, n_workers=1
+):
+    """
+    Add bootstrap confidence intervals for lift, leverage and PMI to a pair table.
+
+    Args:
+        df_pairs (pandas.DataFrame): A pair metrics table with 'entity_1' and
+            'entity_2' columns, such as the output of pair_metrics or
+            network_tabular, computed from X.
+        X (pandas.DataFrame): The label matrix the metrics were computed from, with
+            one column per node.
+        n_resamples (int, optional): Number of bootstrap resamples of the rows.
+        confidence (float, optional): The confidence level of the intervals.
+        seed (int, optional): Seed of the resampling.
+        n_workers (int, optional): Number of worker processes.
+
+    Returns:
+        pandas.DataFrame: A copy of df_pairs with '<metric>_ci_low' and
+        '<metric>_ci_high' columns after each of 'lift', 'leverage' and 'pmi'
+        present in the table. Bounds are percentile intervals over the resamples.
+    """
+    column_index = {col: n for n, col in enumerate(X.columns)}
+    first = np.array([column_index[e] for e in df_pairs["entity_1"]], dtype=np.int64)
+    second = np.array([column_index[e] for e in df_pairs["entity_2"]], dtype=np.int64)
+
+    node_counts, pair_counts = bootstrap_pair_counts(
+        X, (first, second), n_resamples=n_resamples, seed=seed, n_workers=n_workers
+    )
+
+    rows = max(X.shape[0], 1)
+    support_1 = node_counts[:, first] / rows
+    support_2 = node_counts[:, second] / rows
+    support = pair_counts / rows
+    with np.errstate(divide="ignore", invalid="ignore"):
+        lift = support / (support_1 * support_2)
+        samples = {
+            "lift": lift,
+            "leverage": support - support_1 * support_2,
+            "pmi": np.log(lift),
+        }
+
+    # The lower and higher order statistics avoid interpolating with -inf
+    tail = (1 - confidence) / 2
+    df_ci = df_pairs.copy()
+    for metric in INTERVAL_METRICS:
+        if metric not in df_ci.columns:
+            continue
+        values = samples[metric]
+        if values.shape[0]:
+            low = np.nanquantile(values, tail, axis=0, method="lower")
+            high = np.nanquantile(values, 1 - tail, axis=0, method="higher")
+        else:
+            low = high = np.full(len(df_ci), np.nan)
+        position = df_ci.columns.get_loc(metric) + 1
+        df_ci.insert(position, f"{metric}_ci_low", low)
+        df_ci.insert(position + 1, f"{metric}_ci_high", high)
+    return df_ci
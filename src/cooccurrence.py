@@ -0,0 +1,345 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+CHUNK_ROWS = 65536
+
+
+def as_binary_matrix(X):
+    """
+    Normalise a label matrix to 0/1 values.
+
+    Args:
+        X (pandas.DataFrame, numpy.ndarray or scipy.sparse matrix): The label matrix,
+            one row per reference and one column per node. Any non-zero, non-missing
+            value counts as presence.
+
+    Returns:
+        tuple: The binary matrix (a boolean numpy array, or a sparse matrix with
+        0/1 integer data) and the list of column labels.
+    """
+    if isinstance(X, pd.DataFrame):
+        labels = list(X.columns)
+        if labels and all(isinstance(dtype, pd.SparseDtype) for dtype in X.dtypes):
+            X = X.sparse.to_coo()
+        else:
+            return _dense_binary(X.to_numpy()), labels
+    else:
+        labels = list(range(X.shape[1]))
+
+    if hasattr(X, "tocsc"):
+        X = X.tocsc(copy=True)
+        X.data = _dense_binary(X.data)
+        X.eliminate_zeros()
+        return X.astype(np.int64), labels
+
+    return _dense_binary(np.asarray(X)), labels
+
+
+def _dense_binary(values):
+    if values.dtype == bool:
+        return values
+    if values.dtype.kind not in "iuf":
+        values = pd.DataFrame(values).fillna(0).to_numpy(dtype=float)
+    if values.dtype.kind == "f":
+        return (values != 0) & ~np.isnan(values)
+    return values != 0
+
+
+def cooccurrence_counts(X, chunk_rows=CHUNK_ROWS):
+    """
+    Count node occurrences and pairwise co-occurrences in a single pass.
+
+    The pair counts are the label matrix product X^T X. Dense input is multiplied in
+    row chunks small enough for float32 to stay exact, and accumulated as int64.
+
+    Args:
+        X (pandas.DataFrame, numpy.ndarray or scipy.sparse matrix): The label matrix,
+            one row per reference and one column per node.
+        chunk_rows (int, optional): Number of rows multiplied at a time for dense
+            input. Must not exceed 2**24 for the float32 products to be exact.
+
+    Returns:
+        dict: A dictionary with 'labels' (list of node names), 'rows' (int),
+        'node_counts' (int64 array of per-node counts) and 'pair_counts'
+        (symmetric int64 matrix of co-occurrence counts, with node counts on the
+        diagonal).
+    """
+    B, labels = as_binary_matrix(X)
+    pair_counts = _pair_counts(B, chunk_rows)
+
+    return {
+        "labels": labels,
+        "rows": B.shape[0],
+        "node_counts": np.diagonal(pair_counts).copy(),
+        "pair_counts": pair_counts,
+    }
+
+
+def cooccurrence_counts_for_rows(
+    B, labels, positions, previous=None, chunk_rows=CHUNK_ROWS
+):
+    """
+    Count co-occurrences over a subset of rows, reusing a previous result if possible.
+
+    When previous counts for another row subset of the same matrix are given, only
+    the rows added to and removed from the subset are counted, and their
+    contributions are added to and subtracted from the previous counts. If the
+    delta is larger than the subset itself, the subset is recounted from scratch.
+
+    Args:
+        B (numpy.ndarray or scipy.sparse matrix): The binary label matrix of the full
+            dataset, as returned by as_binary_matrix.
+        labels (list): The node names of the columns of B.
+        positions (numpy.ndarray): The sorted row positions to count.
+        previous (dict, optional): An earlier output of this function for B.
+        chunk_rows (int, optional): Number of rows multiplied at a time for dense
+            input.
+
+    Returns:
+        dict: The same dictionary as cooccurrence_counts, with additional
+        'positions' (the counted rows), 'source_rows' (the number of rows in B)
+        and 'incremental' (whether the previous counts were updated) entries.
+    """
+    positions = np.asarray(positions, dtype=np.int64)
+    if hasattr(B, "tocsr"):
+        B = B.tocsr()
+
+    reusable = (
+        previous is not None
+        and previous["labels"] == list(labels)
+        and previous["source_rows"] == B.shape[0]
+    )
+    if reusable:
+        added = np.setdiff1d(positions, previous["positions"], assume_unique=True)
+        removed = np.setdiff1d(previous["positions"], positions, assume_unique=True)
+        reusable = added.size + removed.size < positions.size
+
+    if reusable:
+        pair_counts = (
+            previous["pair_counts"]
+            + _pair_counts(B[added], chunk_rows)
+            - _pair_counts(B[removed], chunk_rows)
+        )
+    else:
+        pair_counts = _pair_counts(B[positions], chunk_rows)
+
+    return {
+        "labels": list(labels),
+        "rows": positions.size,
+        "node_counts": np.diagonal(pair_counts).copy(),
+        "pair_counts": pair_counts,
+        "positions": positions,
+        "source_rows": B.shape[0],
+        "incremental": reusable,
+    }
+
+
+def cooccurrence_counts_for_groups(B, labels, groups, chunk_rows=CHUNK_ROWS):
+    """
+    Count co-occurrences over several row subsets in one pass over the rows.
+
+    The union of the subsets is split by which subsets each row belongs to, and
+    every part is counted once. A subset's counts are the sum of the counts of
+    the parts it contains, so overlapping subsets cost no more than their union
+    counted once.
+
+    Args:
+        B (numpy.ndarray or scipy.sparse matrix): The binary label matrix of the full
+            dataset, as returned by as_binary_matrix.
+        labels (list): The node names of the columns of B.
+        groups (list): The sorted row positions of each subset.
+        chunk_rows (int, optional): Number of rows multiplied at a time for dense
+            input.
+
+    Returns:
+        list: One dictionary per subset, as returned by cooccurrence_counts, with
+        an additional 'positions' entry (the counted rows).
+    """
+    groups = [np.asarray(positions, dtype=np.int64) for positions in groups]
+    if hasattr(B, "tocsr"):
+        B = B.tocsr()
+    n_nodes = B.shape[1]
+
+    union = np.unique(np.concatenate(groups)) if groups else np.empty(0, np.int64)
+    membership = np.zeros((len(groups), len(union)), dtype=bool)
+    for g, positions in enumerate(groups):
+        membership[g, np.searchsorted(union, positions)] = True
+
+    # Rows with the same membership form one part, numbered one subset at a time
+    part_of_row = np.zeros(len(union), dtype=np.int64)
+    for in_group in membership:
+        _, part_of_row = np.unique(part_of_row * 2 + in_group, return_inverse=True)
+    order = np.argsort(part_of_row, kind="stable")
+    n_parts = part_of_row.max() + 1 if len(union) else 0
+    bounds = np.searchsorted(part_of_row[order], np.arange(n_parts + 1))
+
+    pair_counts = np.zeros((len(groups), n_nodes, n_nodes), dtype=np.int64)
+    for part in range(n_parts):
+        rows = union[order[bounds[part] : bounds[part + 1]]]
+        part_counts = _pair_counts(B[rows], chunk_rows)
+        for g in np.flatnonzero(membership[:, order[bounds[part]]]):
+            pair_counts[g] += part_counts
+
+    return [
+        {
+            "labels": list(labels),
+            "rows": positions.size,
+            "node_counts": np.diagonal(group_counts).copy(),
+            "pair_counts": group_counts,
+            "positions": positions,
+        }
+        for positions, group_counts in zip(groups, pair_counts)
+    ]
+
+
+def _pair_counts(B, chunk_rows):
+    if hasattr(B, "tocsc"):
+        B = B.astype(np.int64)
+        return np.asarray((B.T @ B).toarray(), dtype=np.int64)
+
+    rows, n_nodes = B.shape
+    pair_counts = np.zeros((n_nodes, n_nodes), dtype=np.int64)
+    for start in range(0, rows, chunk_rows):
+        chunk = B[start : start + chunk_rows].astype(np.float32)
+        pair_counts += np.rint(chunk.T @ chunk).astype(np.int64)
+    return pair_counts
+
+
+def min_count_for_support(min_support, rows):
+    """
+    Convert a relative support threshold into an absolute co-occurrence count.
+
+    Args:
+        min_support (float): The minimum support threshold for frequent itemsets.
+        rows (int): The number of rows the support is relative to.
+
+    Returns:
+        int: The smallest count (at least 1) whose support meets the threshold.
+    """
+    return max(1, math.ceil(min_support * rows - 1e-9))
+
+
+def pair_metrics(counts, min_count=1):
+    """
+    Derive association metrics for every co-occurring node pair.
+
+    Args:
+        counts (dict): The output of cooccurrence_counts.
+        min_count (int, optional): The minimum co-occurrence count for a pair to be
+            included.
+
+    Returns:
+        pandas.DataFrame: One row per unordered pair of nodes with 'entity_1',
+        'entity_2', exact integer counts ('entity_1_count', 'entity_2_count',
+        'co-occurrence_count'), the node supports and the pair 'support', 'lift',
+        'leverage' and 'pmi'. Rows are sorted by co-occurrence count, descending.
+    """
+    labels = np.asarray(counts["labels"], dtype=object)
+    rows = counts["rows"]
+    node_counts = counts["node_counts"]
+    pair_counts = counts["pair_counts"]
+
+    i, j = np.triu_indices(len(labels), k=1)
+    co_counts = pair_counts[i, j]
+    keep = co_counts >= max(min_count, 1)
+    i, j, co_counts = i[keep], j[keep], co_counts[keep]
+
+    rows = max(rows, 1)
+    support = co_counts / rows
+    support_1 = node_counts[i] / rows
+    support_2 = node_counts[j] / rows
+    expected = support_1 * support_2
+    lift = support / expected
+
+    df_pairs = pd.DataFrame(
+        {
+            "entity_1": labels[i],
+            "entity_2": labels[j],
+            "entity_1_count": node_counts[i],
+            "entity_2_count": node_counts[j],
+            "co-occurrence_count": co_counts,
+            "entity_1_support": support_1,
+            "entity_2_support": support_2,
+            "support": support,
+            "lift": lift,
+            "leverage": support - expected,
+            "pmi": np.log(lift),
+        }
+    )
+
+    return df_pairs.sort_values(
+        by="co-occurrence_count", ascending=False, kind="mergesort"
+    ).reset_index(drop=True)
+
+
+def build_pair_index(df_pairs):
+    """
+    Index the rows of a pair metrics table by node pair.
+
+    Args:
+        df_pairs (pandas.DataFrame): A table with 'entity_1' and 'entity_2'
+            columns, such as the output of pair_metrics.
+
+    Returns:
+        dict: The row position of every pair, keyed by both (entity_1, entity_2)
+        and (entity_2, entity_1).
+    """
+    entity_1 = df_pairs["entity_1"].tolist()
+    entity_2 = df_pairs["entity_2"].tolist()
+    index = dict(zip(zip(entity_2, entity_1), range(len(entity_1))))
+    index.update(zip(zip(entity_1, entity_2), range(len(entity_1))))
+    return index
+
+
+def compare_pair_metrics(group_counts, names, reference=0, min_count=1):
+    """
+    Compare the co-occurrence count, lift and PMI of node pairs across subsets.
+
+    Args:
+        group_counts (list): The counts of each subset over the same nodes, e.g.
+            from cooccurrence_counts_for_groups.
+        names (list): The name of each subset.
+        reference (int, optional): The index of the subset the others are
+            compared to.
+        min_count (int, optional): The minimum co-occurrence count for a pair, in
+            at least one subset, to be included.
+
+    Returns:
+        pandas.DataFrame: One row per pair with 'entity_1' and 'entity_2', the
+        'count (<name>)', 'lift (<name>)' and 'pmi (<name>)' of every subset, and
+        the '<metric> delta (<name>)' of every other subset minus the reference.
+        Lift is NaN where a node does not occur in the subset, and PMI also where
+        the pair does not. Rows are sorted by the largest absolute count delta.
+    """
+    labels = np.asarray(group_counts[0]["labels"], dtype=object)
+    i, j = np.triu_indices(len(labels), k=1)
+    co_counts = np.stack([counts["pair_counts"][i, j] for counts in group_counts])
+    keep = (co_counts >= max(min_count, 1)).any(axis=0)
+    i, j, co_counts = i[keep], j[keep], co_counts[:, keep]
+
+    metrics = []
+    for counts, group_co_counts in zip(group_counts, co_counts):
+        node_counts = counts["node_counts"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            lift = group_co_counts * max(counts["rows"], 1) / (
+                node_counts[i] * node_counts[j]
+            )
+            pmi = np.where(group_co_counts > 0, np.log(lift), np.nan)
+        metrics.append({"count": group_co_counts, "lift": lift, "pmi": pmi})
+
+    columns = {"entity_1": labels[i], "entity_2": labels[j]}
+    for name, values in zip(names, metrics):
+        for metric, value in values.items():
+            columns[f"{metric} ({name})"] = value
+    for g, (name, values) in enumerate(zip(names, metrics)):
+        if g == reference:
+            continue
+        for metric, value in values.items():
+            columns[f"{metric} delta ({name})"] = value - metrics[reference][metric]
+
+    df_compare = pd.DataFrame(columns)
+    count_deltas = co_counts - co_counts[reference]
+    order = np.argsort(-np.abs(count_deltas).max(axis=0, initial=0), kind="stable")
+    return df_compare.iloc[order].reset_index(drop=True)
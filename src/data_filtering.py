@@ -1,18 +1,201 @@
 import numpy as np
+import pandas as pd
 
+from data_processing import REFERENCE_COLUMNS, find_label_columns
 
-def apply_filters(df, selected_filters):
+MAX_CATEGORY_VALUES = 256
+
+
+def apply_filters(
+    df, selected_filters, index=None, return_positions=False, text_positions=None
+):
     """
     Apply filters to the input dataframe based on selected filters.
 
     Args:
         df (pandas.DataFrame): The input dataframe to be filtered.
         selected_filters (dict): A dictionary of filters to be applied to the dataframe.
+        index (dict, optional): A filter index built by build_filter_index for df.
+            When given, filters are evaluated as bitset operations on the index.
+        return_positions (bool, optional): If True, returns the row positions of the
+            matching rows instead of the filtered dataframe.
+        text_positions (numpy.ndarray, optional): Sorted row positions matching a
+            text search, as returned by search_text. Only these rows can pass.
+
+    Returns:
+        pandas.DataFrame or numpy.ndarray: The filtered dataframe, or the matching
+        row positions if return_positions is True.
+    """
+    return filter_all(
+        df,
+        multilabel=[selected_filters],
+        index=index,
+        return_positions=return_positions,
+        text_positions=text_positions,
+    )
+
+def mask_to_bitset(mask):
+    """
+    Pack a boolean row mask into a bitset of 64-bit words.
+
+    Args:
+        mask (array-like): A boolean mask with one entry per row.
+
+    Returns:
+        numpy.ndarray: A uint64 array where bit i of the bitset is set if row i
+        is selected (little-endian bit order within each word).
+    """
+    packed = np.packbits(np.asarray(mask, dtype=bool), bitorder="little")
+    padded = np.zeros(-(-packed.size // 8) * 8, dtype=np.uint8)
+    padded[: packed.size] = packed
+    return padded.view("<u8")
+
+def bitset_to_positions(bits):
+    """
+    Convert a bitset back into sorted row positions.
+
+    Only the non-zero words are unpacked, so sparse selections are cheap.
+
+    Args:
+        bits (numpy.ndarray): A uint64 bitset as returned by mask_to_bitset.
+
+    Returns:
+        numpy.ndarray: The sorted positions of the set bits.
+    """
+    words = np.flatnonzero(bits)
+    if words.size == 0:
+        return np.empty(0, dtype=np.int64)
+    word_bytes = bits[words].astype("<u8", copy=False).view(np.uint8).reshape(-1, 8)
+    word_idx, bit_idx = np.nonzero(np.unpackbits(word_bytes, axis=1, bitorder="little"))
+    return words[word_idx].astype(np.int64) * 64 + bit_idx
+
+def full_bitset(n_rows):
+    """
+    Create a bitset with the first n_rows bits set.
+
+    Args:
+        n_rows (int): The number of rows.
+
+    Returns:
+        numpy.ndarray: A uint64 bitset selecting every row.
+    """
+    return mask_to_bitset(np.ones(n_rows, dtype=bool))
+
+def build_filter_index(df, label_columns=None, category_columns=None):
+    """
+    Build a per-label bitset index for fast multilabel and multiclass filtering.
+
+    Args:
+        df (pandas.DataFrame): The preprocessed dataframe.
+        label_columns (list, optional): The 0/1 label columns to index. Defaults to
+            the columns found by find_label_columns.
+        category_columns (list, optional): The categorical columns to index by
+            value. Defaults to every other non-text column with at most
+            MAX_CATEGORY_VALUES distinct hashable values.
+
+    Returns:
+        dict: A dictionary with 'n_rows' (int), 'labels' (column name to bitset) and
+        'categories' (column name to a dictionary of value to bitset).
+    """
+    if label_columns is None:
+        label_columns = find_label_columns(df)
+
+    if category_columns is None:
+        category_columns = [
+            col
+            for col in df.columns
+            if col not in REFERENCE_COLUMNS and col not in label_columns
+        ]
+
+    labels = {}
+    for col in label_columns:
+        values = df[col].to_numpy()
+        labels[col] = mask_to_bitset(values == 1)
+
+    categories = {}
+    for col in category_columns:
+        try:
+            codes, uniques = pd.factorize(df[col])
+        except TypeError:
+            continue
+        if len(uniques) > MAX_CATEGORY_VALUES:
+            continue
+        categories[col] = {
+            value: mask_to_bitset(codes == code) for code, value in enumerate(uniques)
+        }
+
+    return {"n_rows": df.shape[0], "labels": labels, "categories": categories}
+
+def filter_bitset(index, multilabel=None, multiclass=None, df=None):
+    """
+    Evaluate multilabel and multiclass filters as word-level bitset operations.
+
+    Args:
+        index (dict): A filter index built by build_filter_index.
+        multilabel (list of lists, optional): A list of lists, where each inner list contains column names to be combined with OR logic.
+        multiclass (list of dicts, optional): A list of dictionaries, each containing 'name' (column name) and 'categories' (list of categories to include).
+        df (pandas.DataFrame, optional): The DataFrame the index was built from.
+            Multiclass filters on columns left out of the index, such as those
+            with more than MAX_CATEGORY_VALUES values, are evaluated on it.
 
     Returns:
-        pandas.DataFrame: The filtered dataframe.
+        numpy.ndarray: The bitset of rows passing every filter.
+    """
+    bits = full_bitset(index["n_rows"])
+    empty = np.zeros_like(bits)
+
+    for var in multiclass or []:
+        if not var["categories"]:
+            continue
+        values = index["categories"].get(var["name"])
+        if values is None:
+            if df is None:
+                raise KeyError(f"Column {var['name']!r} is not in the filter index")
+            bits &= mask_to_bitset(df[var["name"]].isin(var["categories"]).to_numpy())
+        else:
+            group = [values[value] for value in var["categories"] if value in values]
+            bits &= np.bitwise_or.reduce(group) if group else empty
+
+    for var in multilabel or []:
+        if var:
+            bits &= np.bitwise_or.reduce([index["labels"][col] for col in var])
+
+    return bits
+
+def filter_positions(index, multilabel=None, multiclass=None, df=None):
     """
-    return filter_all(df, multilabel=[selected_filters])
+    Return the row positions passing multilabel and multiclass filters.
+
+    Args:
+        index (dict): A filter index built by build_filter_index.
+        multilabel (list of lists, optional): A list of lists, where each inner list contains column names to be combined with OR logic.
+        multiclass (list of dicts, optional): A list of dictionaries, each containing 'name' (column name) and 'categories' (list of categories to include).
+        df (pandas.DataFrame, optional): The DataFrame the index was built from,
+            for multiclass filters on columns left out of the index.
+
+    Returns:
+        numpy.ndarray: The sorted positions of the matching rows.
+    """
+    return bitset_to_positions(filter_bitset(index, multilabel, multiclass, df))
+
+def pair_positions(index, node1, node2, positions=None):
+    """
+    Get the rows labelled with both nodes of a pair by intersecting their bitsets.
+
+    Args:
+        index (dict): The output of build_filter_index, indexing both nodes.
+        node1 (str): The first node (label column).
+        node2 (str): The second node (label column).
+        positions (numpy.ndarray, optional): Sorted row positions to restrict the
+            result to, e.g. the currently filtered rows.
+
+    Returns:
+        numpy.ndarray: The sorted positions of the rows labelled with both nodes.
+    """
+    pair_rows = bitset_to_positions(index["labels"][node1] & index["labels"][node2])
+    if positions is not None:
+        pair_rows = np.intersect1d(pair_rows, positions, assume_unique=True)
+    return pair_rows
 
 def filter_and_or(df, tag_filter, operator="and", return_mask=False):
     """
@@ -44,7 +227,14 @@ def filter_and_or(df, tag_filter, operator="and", return_mask=False):
         return filter_mask
     return df_filter
 
-def filter_all(df, multilabel=None, multiclass=None):
+def filter_all(
+    df,
+    multilabel=None,
+    multiclass=None,
+    index=None,
+    return_positions=False,
+    text_positions=None,
+):
     """
     Apply multiple filters to a DataFrame based on multilabel and multiclass criteria.
 
@@ -52,19 +242,44 @@ def filter_all(df, multilabel=None, multiclass=None):
         df (pandas.DataFrame): The input DataFrame to be filtered.
         multilabel (list of lists, optional): A list of lists, where each inner list contains column names to be combined with OR logic.
         multiclass (list of dicts, optional): A list of dictionaries, each containing 'name' (column name) and 'categories' (list of categories to include).
+        index (dict, optional): A filter index built by build_filter_index for df.
+            When given, filters are evaluated on the index instead of the DataFrame.
+        return_positions (bool, optional): If True, returns the row positions of the
+            matching rows instead of the filtered DataFrame.
+        text_positions (numpy.ndarray, optional): Sorted row positions matching a
+            text search, as returned by search_text. Only these rows can pass.
 
     Returns:
-        pandas.DataFrame: The filtered DataFrame.
+        pandas.DataFrame or numpy.ndarray: The filtered DataFrame, or the matching
+        row positions if return_positions is True.
     """
+    if index is not None:
+        positions = filter_positions(index, multilabel, multiclass, df)
+        if text_positions is not None:
+            positions = np.intersect1d(positions, text_positions, assume_unique=True)
+        if return_positions is True:
+            return positions
+        return df.iloc[positions]
+
+    positions = np.arange(df.shape[0])
+    if text_positions is not None:
+        positions = np.asarray(text_positions, dtype=np.int64)
+        df = df.iloc[positions]
     if multiclass:
         for var in multiclass:
             if var["categories"]:
-                df = df.loc[df[var["name"]].isin(var["categories"])]
+                keep = df[var["name"]].isin(var["categories"]).to_numpy()
+                df = df.loc[keep]
+                positions = positions[keep]
 
     if multilabel:
         filters = tuple(filter_and_or(df, list(var), "or", True) for var in multilabel)
         filter_rows = np.c_[filters]
 
         filter_mask = np.logical_and.reduce(filter_rows, axis=1)
-        return df[filter_mask]
+        df = df[filter_mask]
+        positions = positions[filter_mask]
+
+    if return_positions is True:
+        return positions
     return df
@@ -1,6 +1,15 @@
 import numpy as np
 import pandas as pd
 
+from jobs import process_pool
+
+# Bump when the output of preprocess_data changes, to invalidate stored datasets
+PREPROCESS_VERSION = 2
+
+REFERENCE_COLUMNS = ["Refid", "Title", "Abstract"]
+TEXT_COLUMNS = ["Title", "Abstract"]
+CATEGORICAL_COLUMNS = ["LifeStage", "Chemical", "Reference Type"]
+
 
 def load_data(file_path):
     """
@@ -14,128 +23,328 @@ def load_data(file_path):
     """
     return pd.read_csv(file_path)
 
-def preprocess_data(df):
+def preprocess_data(df, n_workers=1):
     """
     Preprocess the input dataframe.
 
     Args:
         df (pandas.DataFrame): The input dataframe to be preprocessed.
+        n_workers (int, optional): Number of worker processes. With more than one,
+            rows are hash-partitioned by Refid and the partitions are converted and
+            grouped in parallel; the result is identical to the serial path.
 
     Returns:
         pandas.DataFrame: The preprocessed dataframe.
     """
+    if n_workers > 1:
+        return preprocess_data_parallel(df, n_workers)
+
     dfz = convert_cols_zero_one(df)
     df_prep = prep_dataset(dfz)
     return df_prep
 
-def convert_cols_zero_one(df):
+def preprocess_data_parallel(df, n_workers):
     """
-    Converts categorical columns to binary (0/1) format for network analysis.
+    Preprocess the input dataframe in parallel over Refid partitions.
+
+    Label columns are detected on the whole dataframe first, since a column can
+    be single-valued within a partition without being a label column overall.
 
     Args:
-        df (pandas.DataFrame): The input DataFrame to be converted.
+        df (pandas.DataFrame): The input dataframe to be preprocessed.
+        n_workers (int): Number of worker processes and partitions.
 
     Returns:
-        pandas.DataFrame: The DataFrame with applicable columns converted to binary format.
+        pandas.DataFrame: The preprocessed dataframe, identical to the output of
+        the serial preprocess_data.
+    """
+    label_columns = find_single_valued_columns(df)
+    df = df[df["Refid"].notna()]
+    partition = pd.util.hash_array(df["Refid"].to_numpy()) % n_workers
+    partitions = [df[partition == n] for n in range(n_workers)]
+    partitions = [df_part for df_part in partitions if df_part.shape[0]]
+    if len(partitions) < 2:
+        return prep_dataset(convert_cols_zero_one(df, label_columns))
+
+    with process_pool(n_workers) as executor:
+        results = list(
+            executor.map(
+                _preprocess_partition, partitions, [label_columns] * len(partitions)
+            )
+        )
+
+    df_prep = pd.concat(results, ignore_index=True)
+    return df_prep.sort_values("Refid", kind="stable", ignore_index=True)
+
+def _preprocess_partition(df, label_columns):
+    return prep_dataset(convert_cols_zero_one(df, label_columns))
+
+def find_single_valued_columns(df):
     """
-    for var in df:
-        if (df[var].nunique()) == 1:
-            cell_text = df[var].dropna().unique()[0]
-            df[var] = df[var].replace(cell_text, 1)
-            df[var].fillna(0, inplace=True)
-    return df
+    Find the columns with exactly one distinct non-missing value.
 
-def prep_dataset(df, nodes=None):
+    Args:
+        df (pandas.DataFrame): The raw input DataFrame.
+
+    Returns:
+        list: The single-valued columns, other than the reference columns (Refid,
+        Title, Abstract), in column order.
     """
-    Prepare the dataset for network analysis by grouping and merging data.
+    candidates = [col for col in df.columns if col not in REFERENCE_COLUMNS]
+    n_unique = df[candidates].nunique(dropna=True)
+    return n_unique.index[n_unique == 1].tolist()
+
+def convert_cols_zero_one(df, label_columns=None):
+    """
+    Converts categorical columns to binary (0/1) format for network analysis.
+
+    Columns with exactly one distinct non-missing value are label columns: cells
+    holding the value become 1 and missing cells 0. The reference columns (Refid,
+    Title, Abstract) are never treated as labels.
 
     Args:
-        df (pandas.DataFrame): The input DataFrame to be prepared.
-        nodes (list, optional): A list of column names to include in the output.
+        df (pandas.DataFrame): The input DataFrame to be converted.
+        label_columns (list, optional): The label columns to convert. Defaults to
+            the columns found by find_single_valued_columns.
 
     Returns:
-        pandas.DataFrame: The prepared DataFrame.
+        pandas.DataFrame: The DataFrame with applicable columns converted to binary
+        format, as uint8.
     """
-    df_grouped = df.groupby(["Refid"]).max()
-    df_grouped_cat = df.groupby(["Refid"])[
-        "LifeStage", "Chemical", "Reference Type"
-    ].agg(pd.Series.mode)
-    df_grouped = df_grouped.merge(
-        df_grouped_cat, left_index=True, right_index=True
-    ).reset_index()
+    if label_columns is None:
+        label_columns = find_single_valued_columns(df)
+    if not label_columns:
+        return df
 
-    if nodes is None:
-        return df_grouped
-    df_nodes = df_grouped[nodes]
-    return df_nodes
+    converted = df[label_columns].notna().astype(np.uint8)
+    return pd.concat([df.drop(columns=label_columns), converted], axis=1)[df.columns]
 
-def apply_filters(df, selected_filters):
+def find_label_columns(df):
     """
-    Apply filters to the input dataframe based on selected filters.
+    Find the preprocessed 0/1 label columns of a DataFrame.
 
     Args:
-        df (pandas.DataFrame): The input dataframe to be filtered.
-        selected_filters (dict): A dictionary of filters to be applied to the dataframe.
+        df (pandas.DataFrame): The preprocessed DataFrame.
 
     Returns:
-        pandas.DataFrame: The filtered dataframe.
+        list: The boolean columns and the numeric columns, other than the reference
+        columns, whose values are all 0, 1 or missing.
     """
-    return filter_all(df, multilabel=[selected_filters])
+    return [
+        col
+        for col in df.columns
+        if col not in REFERENCE_COLUMNS
+        and (
+            pd.api.types.is_bool_dtype(df[col])
+            or (
+                pd.api.types.is_numeric_dtype(df[col])
+                and df[col].dropna().isin([0, 1]).all()
+            )
+        )
+    ]
 
-def filter_and_or(df, tag_filter, operator="and", return_mask=False):
+def prep_dataset(df, nodes=None):
     """
-    Filter a DataFrame based on specified tags using 'and' or 'or' logic.
+    Prepare the dataset for network analysis by grouping rows per Refid.
+
+    Label columns are reduced with a maximum, Title and Abstract take the first
+    non-missing value, the categorical columns take their most frequent value (the
+    smallest on ties) and any other column takes its maximum.
 
     Args:
-        df (pandas.DataFrame): The input DataFrame to be filtered.
-        tag_filter (list): A list of column names to use as filters.
-        operator (str, optional): The logical operator to use when combining filters.
-        return_mask (bool, optional): If True, returns the boolean mask instead of
-            the filtered DataFrame.
+        df (pandas.DataFrame): The input DataFrame to be prepared.
+        nodes (list, optional): A list of column names to include in the output.
 
     Returns:
-        pandas.DataFrame or numpy.ndarray: The filtered DataFrame if return_mask is False,
-        otherwise a boolean mask indicating which rows passed the filter.
-    """
-    if not tag_filter:
-        df_filter = df
-        filter_mask = [True] * df.shape[0]
-    else:
-        filter_rows = df[tag_filter].to_numpy()
-        if operator == "and":
-            filter_mask = np.logical_and.reduce(filter_rows, axis=1)
-        else:
-            filter_mask = np.logical_or.reduce(filter_rows, axis=1)
-        df_filter = df[filter_mask]
+        pandas.DataFrame: The prepared DataFrame, one row per Refid sorted by Refid.
+    """
+    df = df[df["Refid"].notna()]
+    codes, refids = pd.factorize(df["Refid"], sort=True)
+    order = np.argsort(codes, kind="stable")
+    starts = np.flatnonzero(np.r_[True, np.diff(codes[order]) != 0])
+
+    columns = [col for col in df.columns if col != "Refid"]
+    label_columns = [
+        col
+        for col in columns
+        if pd.api.types.is_bool_dtype(df[col]) or df[col].dtype == np.uint8
+    ]
+    text_columns = [col for col in TEXT_COLUMNS if col in columns]
+    cat_columns = [
+        col for col in CATEGORICAL_COLUMNS if col in columns and col not in label_columns
+    ]
+    other_columns = [
+        col
+        for col in columns
+        if col not in label_columns + text_columns + cat_columns
+    ]
+
+    grouped = {"Refid": np.asarray(refids)}
+    if label_columns and len(refids):
+        labels = df[label_columns].to_numpy(dtype=np.uint8)[order]
+        reduced = np.maximum.reduceat(labels, starts, axis=0)
+        grouped.update(zip(label_columns, reduced.T))
+    for col, values in df[text_columns].groupby(codes).first().items():
+        grouped[col] = values.to_numpy()
+    for col, values in df[other_columns].groupby(codes).max().items():
+        grouped[col] = values.to_numpy()
+    for col in cat_columns:
+        grouped[col] = group_mode(codes, len(refids), df[col])
+
+    df_grouped = pd.DataFrame(
+        {col: grouped[col] for col in ["Refid", *columns] if col in grouped}
+    )
 
-    if return_mask is True:
-        return filter_mask
-    return df_filter
+    if nodes is None:
+        return df_grouped
+    df_nodes = df_grouped[nodes]
+    return df_nodes
 
-def filter_all(df, multilabel=None, multiclass=None):
+def group_mode(codes, n_groups, values, weights=None):
     """
-    Apply multiple filters to a DataFrame based on multilabel and multiclass criteria.
+    Compute the most frequent value of a column per group.
 
     Args:
-        df (pandas.DataFrame): The input DataFrame to be filtered.
-        multilabel (list of lists, optional): A list of lists, where each inner list contains column names to be combined with OR logic.
-        multiclass (list of dicts, optional): A list of dictionaries, each containing 'name' (column name) and 'categories' (list of categories to include).
+        codes (numpy.ndarray): The group code (0 to n_groups - 1) of each row.
+        n_groups (int): The number of groups.
+        values (array-like): The column values.
+        weights (numpy.ndarray, optional): The number of occurrences each row
+            stands for. Defaults to one per row.
 
     Returns:
-        pandas.DataFrame: The filtered DataFrame.
+        numpy.ndarray: The most frequent non-missing value of each group, the
+        smallest one on ties, or NaN if the group has no values.
     """
-    if multiclass:
-        for var in multiclass:
-            if var["categories"]:
-                df = df.loc[df[var["name"]].isin(var["categories"])]
+    value_codes, categories = pd.factorize(values, sort=True)
+    valid = value_codes >= 0
+    if weights is None:
+        weights = np.ones(len(value_codes), dtype=np.int64)
+
+    modes = np.full(n_groups, np.nan, dtype=object)
+    if not valid.any():
+        return modes
+
+    keys, inverse = np.unique(
+        np.asarray(codes)[valid].astype(np.int64) * len(categories)
+        + value_codes[valid],
+        return_inverse=True,
+    )
+    counts = np.bincount(inverse, weights=np.asarray(weights)[valid])
+    groups, value_codes = np.divmod(keys, len(categories))
+
+    # Within each group, order by count descending, then by value ascending
+    ranked = np.lexsort((value_codes, -counts, groups))
+    first = ranked[np.r_[True, np.diff(groups[ranked]) != 0]]
+
+    modes[groups[first]] = np.asarray(categories, dtype=object)[value_codes[first]]
+    return modes
+
+def load_and_preprocess_chunked(
+    file_path, label_columns, chunksize=100_000, text_spill=None
+):
+    """
+    Load and preprocess a large CSV file in chunks, reading only the needed columns.
+
+    Only Refid, Title, Abstract, the categorical columns and the given label
+    columns are read. Each chunk's label columns are reduced per Refid before the
+    next chunk is read, so peak memory scales with the chunk size and the number
+    of labels rather than the file size. As in preprocess_data, a column with one
+    distinct non-missing value over the whole file is converted to 0/1, and any
+    other numeric column keeps the maximum of its values. Text is the bulk of
+    a large export, so with a text_spill it is written to disk chunk by chunk
+    instead of being returned.
 
-    if multilabel:
-        filters = tuple(filter_and_or(df, list(var), "or", True) for var in multilabel)
-        filter_rows = np.c_[filters]
+    Args:
+        file_path (str): Path to the CSV file.
+        label_columns (list): The label columns to keep, e.g. the network nodes
+            and filter group columns.
+        chunksize (int, optional): Number of CSV rows read at a time.
+        text_spill (dataset_store.TextSpill, optional): Where the text columns are
+            written, to be stored with save_dataset(..., text_spill=text_spill).
 
-        filter_mask = np.logical_and.reduce(filter_rows, axis=1)
-        return df[filter_mask]
-    return df
+    Returns:
+        pandas.DataFrame: The preprocessed dataframe, matching preprocess_data
+        restricted to the selected columns, without the text columns if a
+        text_spill is given.
+    """
+    header = pd.read_csv(file_path, nrows=0).columns.tolist()
+    label_columns = [
+        col
+        for col in dict.fromkeys(label_columns)
+        if col not in REFERENCE_COLUMNS and col not in CATEGORICAL_COLUMNS
+    ]
+    missing_columns = [col for col in ["Refid", *label_columns] if col not in header]
+    if missing_columns:
+        raise KeyError(f"Columns not found in {file_path}: {missing_columns}")
+
+    text_columns = [col for col in TEXT_COLUMNS if col in header]
+    cat_columns = [col for col in CATEGORICAL_COLUMNS if col in header]
+    usecols = ["Refid", *text_columns, *cat_columns, *label_columns]
+
+    partial_labels = []
+    partial_values = []
+    distinct_values = {col: set() for col in label_columns}
+    non_numeric = set()
+    partial_text = []
+    partial_cats = {col: [] for col in cat_columns}
+    for chunk in pd.read_csv(file_path, usecols=usecols, chunksize=chunksize):
+        chunk = chunk[chunk["Refid"].notna()]
+        refids = chunk["Refid"].to_numpy()
+
+        # Whether a column is single-valued is only known after the last chunk,
+        # so both its presence and its maximum are reduced per Refid
+        for col in label_columns:
+            if len(distinct_values[col]) < 2:
+                distinct_values[col].update(chunk[col].dropna().unique()[:2])
+        labels = chunk[label_columns].notna().astype(np.uint8)
+        partial_labels.append(labels.groupby(refids).max())
+        numeric = [
+            col for col in label_columns if pd.api.types.is_numeric_dtype(chunk[col])
+        ]
+        non_numeric.update(col for col in label_columns if col not in numeric)
+        partial_values.append(chunk[numeric].groupby(refids).max())
+        if text_spill is None:
+            partial_text.append(chunk[text_columns].groupby(refids).first())
+        else:
+            text_spill.add(refids, chunk[text_columns])
+        for col in cat_columns:
+            partial_cats[col].append(chunk.groupby(["Refid", col]).size())
+
+    if text_spill is not None:
+        usecols = [col for col in usecols if col not in text_columns]
+    if not partial_labels:
+        return pd.DataFrame(columns=[col for col in header if col in usecols])
+
+    # Other columns without a maximum are dropped, as prep_dataset drops them
+    single_valued = [col for col in label_columns if len(distinct_values[col]) == 1]
+    multi_valued = [
+        col
+        for col in label_columns
+        if col not in single_valued and col not in non_numeric
+    ]
+    labels = pd.concat(partial_labels)[single_valued].groupby(level=0).max()
+    refids = labels.index
+    grouped = {"Refid": refids.to_numpy()}
+    grouped.update(labels.astype(np.uint8).to_dict("series"))
+    if multi_valued:
+        values = pd.concat(partial_values)[multi_valued].groupby(level=0).max()
+        grouped.update(values.reindex(refids).to_dict("series"))
+
+    if partial_text:
+        text = pd.concat(partial_text).groupby(level=0).first().reindex(refids)
+        grouped.update(text.to_dict("series"))
+
+    for col in cat_columns:
+        counts = pd.concat(partial_cats[col]).groupby(level=[0, 1]).sum()
+        grouped[col] = group_mode(
+            refids.get_indexer(counts.index.get_level_values(0)),
+            len(refids),
+            counts.index.get_level_values(1),
+            weights=counts.to_numpy(),
+        )
+
+    columns = ["Refid", *(col for col in header if col != "Refid")]
+    return pd.DataFrame({col: np.asarray(grouped[col]) for col in columns if col in grouped})
 
 def create_edge_color_map(color_file_path):
     """
@@ -0,0 +1,416 @@
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import tempfile
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from data_processing import PREPROCESS_VERSION, TEXT_COLUMNS, find_label_columns
+
+META_FILE = "meta.json"
+LABELS_FILE = "labels.npy"
+OTHER_FILE = "other.pkl"
+
+# Text is encoded and written this many rows at a time, and copied in blocks of
+# this many bytes
+TEXT_WRITE_ROWS = 10_000
+TEXT_WRITE_BYTES = 2**24
+
+
+def dataset_key(content_hash, version=PREPROCESS_VERSION, columns=None):
+    """
+    Compute the store key of a preprocessed dataset.
+
+    Args:
+        content_hash (str): The content hash of the raw input CSV file, from
+            hash_file.
+        version (int, optional): The preprocessing version the dataset was built with.
+        columns (list, optional): The label columns, if the dataset was preprocessed
+            from a subset of the file's columns.
+
+    Returns:
+        str: The SHA-256 hex digest of the preprocessing version, the column subset
+        and the file's content hash.
+    """
+    digest = hashlib.sha256(f"preprocess-v{version}\n".encode("utf-8"))
+    if columns is not None:
+        digest.update(repr(sorted(columns)).encode("utf-8"))
+    digest.update(content_hash.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def dataset_exists(directory):
+    """
+    Check whether a complete stored dataset exists in a directory.
+
+    Args:
+        directory (str): The dataset directory.
+
+    Returns:
+        bool: True if the dataset metadata file is present.
+    """
+    return os.path.isfile(os.path.join(directory, META_FILE))
+
+
+def save_dataset(df, directory, label_columns=None, text_spill=None):
+    """
+    Write a preprocessed dataset to a columnar binary store.
+
+    Label columns are stored together as one boolean matrix in column-major order,
+    text columns as UTF-8 byte blobs with row offsets, and any remaining columns
+    as a pickled DataFrame. The dataset is written to a temporary directory and
+    moved into place, so readers never see a partial dataset.
+
+    Args:
+        df (pandas.DataFrame): The preprocessed dataset.
+        directory (str): The dataset directory to create.
+        label_columns (list, optional): The 0/1 label columns. Defaults to the
+            columns found by find_label_columns.
+        text_spill (TextSpill, optional): The text columns of the dataset, spilled
+            to disk while it was loaded in chunks. df must then be sorted by
+            Refid and have no text columns.
+    """
+    if label_columns is None:
+        label_columns = find_label_columns(df)
+    if text_spill is None:
+        text_columns = [col for col in TEXT_COLUMNS if col in df.columns]
+        columns = list(df.columns)
+    else:
+        text_columns = list(text_spill.columns)
+        other = [col for col in df.columns if col != "Refid"]
+        columns = ["Refid", *text_columns, *other]
+    other_columns = [
+        col for col in df.columns if col not in label_columns and col not in text_columns
+    ]
+
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = os.path.join(parent, f".tmp-{uuid.uuid4().hex}")
+    os.makedirs(tmp_dir)
+
+    try:
+        labels = np.zeros((df.shape[0], len(label_columns)), dtype=bool, order="F")
+        for n, col in enumerate(label_columns):
+            labels[:, n] = df[col].to_numpy() == 1
+        np.save(os.path.join(tmp_dir, LABELS_FILE), labels)
+
+        if text_spill is None:
+            for n, col in enumerate(text_columns):
+                _save_text_column(df[col], tmp_dir, f"text_{n}")
+        else:
+            text_spill.save(df["Refid"].to_numpy(), tmp_dir)
+
+        df[other_columns].to_pickle(os.path.join(tmp_dir, OTHER_FILE))
+
+        meta = {
+            "version": PREPROCESS_VERSION,
+            "rows": df.shape[0],
+            "columns": [str(col) for col in columns],
+            "label_columns": [str(col) for col in label_columns],
+            "text_columns": [str(col) for col in text_columns],
+        }
+        with open(os.path.join(tmp_dir, META_FILE), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+        try:
+            os.replace(tmp_dir, directory)
+        except OSError:
+            # Another process stored the same dataset first
+            if not dataset_exists(directory):
+                raise
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def dataset_columns(directory):
+    """
+    List the columns of a stored dataset.
+
+    Args:
+        directory (str): The dataset directory.
+
+    Returns:
+        tuple: All column names and the text column names.
+    """
+    meta = _read_meta(directory)
+    return meta["columns"], meta["text_columns"]
+
+
+def load_dataset(directory, columns=None):
+    """
+    Load a preprocessed dataset from the columnar binary store.
+
+    The label matrix is memory-mapped, so only the requested label columns are
+    read from disk.
+
+    Args:
+        directory (str): The dataset directory.
+        columns (list, optional): The columns to load. Defaults to all columns.
+
+    Returns:
+        pandas.DataFrame: The preprocessed dataset, with label columns as booleans.
+    """
+    meta = _read_meta(directory)
+    if columns is None:
+        columns = meta["columns"]
+
+    data = {}
+    labels = np.load(os.path.join(directory, LABELS_FILE), mmap_mode="r")
+    for n, col in enumerate(meta["label_columns"]):
+        if col in columns:
+            data[col] = np.array(labels[:, n])
+
+    text_columns = [col for col in meta["text_columns"] if col in columns]
+    if text_columns:
+        text_store = TextStore(directory)
+        for col in text_columns:
+            data[col] = text_store.get(col)
+
+    other = pd.read_pickle(os.path.join(directory, OTHER_FILE))
+    for col in other.columns:
+        if col in columns:
+            data[col] = other[col].to_numpy()
+
+    return pd.DataFrame(data, columns=[col for col in columns if col in data])
+
+
+def _save_text_column(series, directory, name):
+    def chunks():
+        for start in range(0, len(series), TEXT_WRITE_ROWS):
+            values = series.iloc[start : start + TEXT_WRITE_ROWS]
+            valid = values.notna().to_numpy()
+            encoded = [
+                str(value).encode("utf-8") if ok else b""
+                for value, ok in zip(values, valid)
+            ]
+            yield valid, np.array([len(value) for value in encoded]), b"".join(encoded)
+
+    _write_text_column(chunks(), directory, name)
+
+
+def _write_text_column(chunks, directory, name):
+    # Chunks of (valid, lengths, data) are written to the blob as they come, so
+    # only the per-row valid flags and offsets are held in memory
+    blob_path = os.path.join(directory, f"{name}.blob.npy")
+    raw_path = f"{blob_path}.raw"
+    valid_parts = []
+    length_parts = []
+    with open(raw_path, "wb") as f:
+        for valid, lengths, data in chunks:
+            valid_parts.append(np.asarray(valid, dtype=bool))
+            length_parts.append(np.asarray(lengths, dtype=np.int64))
+            f.write(data)
+
+    valid = np.concatenate(valid_parts) if valid_parts else np.empty(0, dtype=bool)
+    offsets = np.zeros(len(valid) + 1, dtype=np.int64)
+    if length_parts:
+        np.cumsum(np.concatenate(length_parts), out=offsets[1:])
+    np.save(os.path.join(directory, f"{name}.valid.npy"), valid)
+    np.save(os.path.join(directory, f"{name}.offsets.npy"), offsets)
+
+    # The blob is copied behind an .npy header once its length is known
+    header = {"descr": "|u1", "fortran_order": False, "shape": (int(offsets[-1]),)}
+    with open(raw_path, "rb") as src, open(blob_path, "wb") as dst:
+        np.lib.format.write_array_header_1_0(dst, header)
+        shutil.copyfileobj(src, dst, TEXT_WRITE_BYTES)
+    os.remove(raw_path)
+
+
+def _read_meta(directory):
+    with open(os.path.join(directory, META_FILE), encoding="utf-8") as f:
+        return json.load(f)
+
+
+class TextSpill:
+    """
+    Spill the text columns of a dataset loaded in chunks to disk.
+
+    Each chunk's text is appended to one file per column as it is read, so text
+    never has to be held in memory for the whole file. Once every chunk has been
+    added, save writes the text in the stored dataset's row order, keeping the
+    first non-missing value of every Refid. Use it as a context manager, or call
+    close, to remove the spill files.
+
+    Args:
+        directory (str): The directory the spill files are created in.
+    """
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = tempfile.mkdtemp(prefix=".spill-", dir=directory)
+        self.columns = []
+        self._parts = {}
+        self._sizes = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add(self, refids, frame):
+        """
+        Append the text of one chunk of rows.
+
+        Args:
+            refids (numpy.ndarray): The Refid of each row.
+            frame (pandas.DataFrame): The text columns of the rows.
+        """
+        for col in frame.columns:
+            if col not in self._parts:
+                self.columns.append(col)
+                self._parts[col] = []
+                self._sizes[col] = 0
+            n = self.columns.index(col)
+            values = frame[col].groupby(refids).first().dropna()
+            encoded = [str(value).encode("utf-8") for value in values]
+            lengths = np.array([len(value) for value in encoded], dtype=np.int64)
+            with open(os.path.join(self.directory, f"text_{n}.spill"), "ab") as f:
+                f.write(b"".join(encoded))
+            starts = self._sizes[col] + np.cumsum(lengths) - lengths
+            self._parts[col].append((values.index.to_numpy(), starts, lengths))
+            self._sizes[col] += int(lengths.sum())
+
+    def save(self, refids, directory):
+        """
+        Write the spilled text as the text columns of a stored dataset.
+
+        Args:
+            refids (numpy.ndarray): The sorted, unique Refids of the dataset rows.
+            directory (str): The dataset directory being written.
+        """
+        row_index = pd.Index(refids)
+        for n, col in enumerate(self.columns):
+            valid = np.zeros(len(refids), dtype=bool)
+            starts = np.zeros(len(refids), dtype=np.int64)
+            lengths = np.zeros(len(refids), dtype=np.int64)
+            parts = self._parts[col]
+            if parts:
+                keys, part_starts, part_lengths = (
+                    np.concatenate(arrays) for arrays in zip(*parts)
+                )
+                rows = row_index.get_indexer(keys)
+                matched = np.flatnonzero(rows >= 0)
+                # Parts are in file order, so a row's first entry is its first value
+                rows, first = np.unique(rows[matched], return_index=True)
+                valid[rows] = True
+                starts[rows] = part_starts[matched[first]]
+                lengths[rows] = part_lengths[matched[first]]
+
+            spill_path = os.path.join(self.directory, f"text_{n}.spill")
+            _write_text_column(
+                _gather_text(spill_path, valid, starts, lengths), directory, f"text_{n}"
+            )
+
+    def close(self):
+        """Remove the spill files."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def _gather_text(spill_path, valid, starts, lengths):
+    # Copy rows out of the memory-mapped spill file, TEXT_WRITE_ROWS rows at a time
+    with open(spill_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        spill = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        try:
+            ends = starts + lengths
+            for start in range(0, len(lengths), TEXT_WRITE_ROWS):
+                stop = start + TEXT_WRITE_ROWS
+                data = b"".join(
+                    spill[row_start:row_end]
+                    for row_start, row_end in zip(
+                        starts[start:stop].tolist(), ends[start:stop].tolist()
+                    )
+                )
+                yield valid[start:stop], lengths[start:stop], data
+        finally:
+            if size:
+                spill.close()
+
+
+class TextStore:
+    """
+    Read-only, memory-mapped access to the text columns of a stored dataset.
+
+    Text stays on disk and is only decoded for the rows asked for, so the text
+    of a large dataset does not need to be held in memory. Rows are in the
+    same order as the stored dataset, which is sorted by Refid.
+
+    Args:
+        directory (str): The dataset directory.
+    """
+
+    def __init__(self, directory):
+        meta = _read_meta(directory)
+        self.n_rows = meta["rows"]
+        self.columns = meta["text_columns"]
+        self._arrays = {}
+        for n, col in enumerate(self.columns):
+            name = os.path.join(directory, f"text_{n}")
+            self._arrays[col] = tuple(
+                np.load(f"{name}.{part}.npy", mmap_mode="r")
+                for part in ("valid", "offsets", "blob")
+            )
+
+    def get(self, column, positions=None):
+        """
+        Decode the text of a column for some rows.
+
+        Args:
+            column (str): The text column.
+            positions (numpy.ndarray, optional): The row positions to decode.
+                Defaults to all rows.
+
+        Returns:
+            numpy.ndarray: The text of each row as an object array, with NaN for
+            missing values.
+        """
+        valid, offsets, blob = self._arrays[column]
+        if positions is None:
+            positions = np.arange(self.n_rows)
+        positions = np.asarray(positions, dtype=np.int64)
+
+        starts = np.asarray(offsets[positions])
+        ends = np.asarray(offsets[positions + 1])
+        row_valid = valid[positions].tolist()
+        values = np.empty(len(positions), dtype=object)
+        if not len(positions):
+            return values
+
+        # Read the covered span in one go unless the rows are spread thinly over it
+        first, last = int(starts.min()), int(ends.max())
+        if last - first <= 64 * max(int((ends - starts).sum()), 1):
+            buffer, base = bytes(blob[first:last]), first
+        else:
+            buffer, base = None, 0
+
+        for n, (start, end, ok) in enumerate(
+            zip((starts - base).tolist(), (ends - base).tolist(), row_valid)
+        ):
+            if not ok:
+                values[n] = np.nan
+            elif buffer is not None:
+                values[n] = buffer[start:end].decode("utf-8")
+            else:
+                values[n] = bytes(blob[start:end]).decode("utf-8")
+        return values
+
+    def frame(self, positions, columns=None):
+        """
+        Decode the text columns of some rows into a DataFrame.
+
+        Args:
+            positions (numpy.ndarray): The row positions to decode.
+            columns (list, optional): The text columns. Defaults to all of them.
+
+        Returns:
+            pandas.DataFrame: One row per position and one column per text column.
+        """
+        columns = self.columns if columns is None else columns
+        return pd.DataFrame(
+            {col: self.get(col, positions) for col in columns}, columns=columns
+        )
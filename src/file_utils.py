@@ -1,24 +1,138 @@
+import contextlib
+import hashlib
+import io
 import os
+import time
+import uuid
 
-import rispy
+import numpy as np
+import pandas as pd
 
+EXPORT_CHUNK_ROWS = 5000
+EXPORT_COLUMNS = ["Refid", "Title", "Abstract"]
 
-def write_temp_file(file, file_type):
+
+def store_upload(file, upload_directory, session_id):
+    """
+    Store the bytes of an uploaded file under its content hash.
+
+    Each session has its own directory of uploads. The bytes are written
+    straight from the upload buffer, and a file that is already stored is not
+    written again.
+
+    Args:
+        file (UploadedFile): The uploaded file object from Streamlit.
+        upload_directory (str): The root directory of the upload store.
+        session_id (str): The session the file was uploaded in.
+
+    Returns:
+        tuple: The path of the stored file and the SHA-256 hex digest of its
+        contents.
     """
-    Write the contents of an uploaded file to a temporary CSV file.
+    data = file.getbuffer()
+    digest = hashlib.sha256(data).hexdigest()
+
+    session_directory = os.path.join(upload_directory, session_id)
+    os.makedirs(session_directory, exist_ok=True)
+    file_path = os.path.join(session_directory, f"{digest}.csv")
+
+    if os.path.isfile(file_path):
+        os.utime(file_path)
+    else:
+        tmp_path = f"{file_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, file_path)
+    return file_path, digest
+
+def read_csv_columns(file):
+    """
+    Read the column names from the header row of an uploaded CSV file.
+
+    Only the start of the file is parsed, and the file position is restored
+    afterwards.
 
     Args:
         file (UploadedFile): The uploaded file object from Streamlit.
-        file_type (str): The type of the file, used to name the temporary file.
 
     Returns:
-        str: The name of the temporary file created.
+        list: The column names.
+    """
+    position = file.tell()
+    file.seek(0)
+    try:
+        return pd.read_csv(file, nrows=0).columns.tolist()
+    finally:
+        file.seek(position)
+
+def evict_uploads(upload_directory, max_bytes, max_age_seconds, keep=None):
+    """
+    Remove stored uploads that are too old or exceed the store's size budget.
+
+    Uploads older than max_age_seconds are removed first, then the least
+    recently stored uploads until the store fits in max_bytes. Empty session
+    directories are removed as well.
+
+    Args:
+        upload_directory (str): The root directory of the upload store.
+        max_bytes (int): The size budget of the store.
+        max_age_seconds (float): The age after which uploads are removed.
+        keep (str, optional): A session directory whose uploads are never
+            removed, usually the current session's.
+    """
+    if not os.path.isdir(upload_directory):
+        return
+
+    keep = os.path.abspath(keep) if keep is not None else None
+    now = time.time()
+    entries = []
+    for session in os.listdir(upload_directory):
+        session_directory = os.path.join(upload_directory, session)
+        if not os.path.isdir(session_directory):
+            continue
+        for name in os.listdir(session_directory):
+            file_path = os.path.join(session_directory, name)
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, file_path))
+
+    total = sum(size for _, size, _ in entries)
+    for mtime, size, file_path in sorted(entries):
+        expired = now - mtime > max_age_seconds
+        if not expired and total <= max_bytes:
+            break
+        if keep is not None and os.path.dirname(os.path.abspath(file_path)) == keep:
+            continue
+        try:
+            os.remove(file_path)
+        except OSError:
+            continue
+        total -= size
+
+    for session in os.listdir(upload_directory):
+        session_directory = os.path.join(upload_directory, session)
+        if os.path.isdir(session_directory) and not os.listdir(session_directory):
+            with contextlib.suppress(OSError):
+                os.rmdir(session_directory)
+
+def hash_file(file_path, block_size=2**20):
+    """
+    Compute a content hash of a file.
+
+    Args:
+        file_path (str): Path to the file to hash.
+        block_size (int, optional): Number of bytes read at a time.
+
+    Returns:
+        str: The SHA-256 hex digest of the file contents.
     """
-    tmp_file_name = "tmp_" + file_type + ".csv"
-    with open(tmp_file_name, "w", newline="", encoding="utf-8") as f:
-        content = file.getvalue().decode("utf-8")
-        f.write(content)
-    return tmp_file_name
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
 
 def load_default_files(sample_file_directory):
     """
@@ -48,7 +162,7 @@ def to_csv_data(df):
     Returns:
         bytes: The CSV data encoded as UTF-8 bytes.
     """
-    return df.to_csv(index=False).encode("utf-8")
+    return b"".join(iter_csv_chunks(df))
 
 def to_ris_data(df):
     """
@@ -60,14 +174,109 @@ def to_ris_data(df):
     Returns:
         str: A string containing the RIS formatted data.
     """
-    entries = []
-    for _, row in df.iterrows():
-        entry = {
-            "type_of_reference": "JOUR",
-            "id": str(row["Refid"]),
-            "primary_title": row["Title"],
-            "abstract": row["Abstract"],
-        }
-        entries.append(entry)
-
-    return rispy.dumps(entries)
+    return b"".join(iter_ris_chunks(df)).decode("utf-8")
+
+def iter_csv_chunks(df, positions=None, chunk_rows=EXPORT_CHUNK_ROWS, text_store=None):
+    """
+    Generate CSV data in chunks of rows.
+
+    Args:
+        df (pandas.DataFrame): The DataFrame to be converted to CSV.
+        positions (numpy.ndarray, optional): The row positions to export. Defaults
+            to all rows.
+        chunk_rows (int, optional): Number of rows formatted at a time.
+        text_store (TextStore, optional): The text store of df's rows. When given,
+            its Title and Abstract are appended to each chunk as it is formatted,
+            so only one chunk of text is decoded at a time.
+
+    Yields:
+        bytes: Consecutive pieces of the CSV data, encoded as UTF-8, starting with
+        the header row.
+    """
+    columns = list(df.columns)
+    if text_store is not None:
+        columns += EXPORT_COLUMNS[1:]
+    yield pd.DataFrame(columns=columns).to_csv(index=False).encode("utf-8")
+    for df_chunk in _iter_row_chunks(df, positions, chunk_rows, text_store):
+        yield df_chunk.to_csv(index=False, header=False).encode("utf-8")
+
+def iter_ris_chunks(df, positions=None, chunk_rows=EXPORT_CHUNK_ROWS, text_store=None):
+    """
+    Generate RIS-formatted data in chunks of references.
+
+    Records are formatted with vectorized string operations and numbered like
+    rispy's output.
+
+    Args:
+        df (pandas.DataFrame): A DataFrame with 'Refid', 'Title' and 'Abstract'
+            columns.
+        positions (numpy.ndarray, optional): The row positions to export. Defaults
+            to all rows.
+        chunk_rows (int, optional): Number of references formatted at a time.
+        text_store (TextStore, optional): The text store of df's rows, from which
+            Title and Abstract are decoded one chunk at a time. df then only
+            needs a 'Refid' column.
+
+    Yields:
+        bytes: Consecutive pieces of the RIS data, encoded as UTF-8.
+    """
+    start = 1
+    for df_chunk in _iter_row_chunks(df, positions, chunk_rows, text_store):
+        numbers = pd.Series(range(start, start + df_chunk.shape[0]), dtype=str)
+        records = (
+            numbers.to_numpy(dtype=object)
+            + ".\nTY  - JOUR\nID  - "
+            + df_chunk["Refid"].astype(str).to_numpy(dtype=object)
+            + "\nT1  - "
+            + df_chunk["Title"].astype(str).to_numpy(dtype=object)
+            + "\nAB  - "
+            + df_chunk["Abstract"].astype(str).to_numpy(dtype=object)
+            + "\nER  - \n"
+        )
+        separator = "" if start == 1 else "\n"
+        yield (separator + "\n".join(records)).encode("utf-8")
+        start += df_chunk.shape[0]
+
+def build_export(df, export_format, positions=None, text_store=None):
+    """
+    Build a complete CSV or RIS export of the selected rows.
+
+    Args:
+        df (pandas.DataFrame): A DataFrame with 'Refid', 'Title' and 'Abstract'
+            columns, or only 'Refid' if a text_store is given.
+        export_format (str): Either 'csv' or 'ris'.
+        positions (numpy.ndarray, optional): The row positions to export. Defaults
+            to all rows.
+        text_store (TextStore, optional): The text store of df's rows. Title and
+            Abstract are then decoded one chunk of rows at a time.
+
+    Returns:
+        bytes: The exported data, encoded as UTF-8.
+    """
+    columns = ["Refid"] if text_store is not None else EXPORT_COLUMNS
+    if export_format == "csv":
+        chunks = iter_csv_chunks(df[columns], positions, text_store=text_store)
+    elif export_format == "ris":
+        chunks = iter_ris_chunks(df, positions, text_store=text_store)
+    else:
+        raise ValueError(f"Unknown export format: {export_format}")
+
+    buffer = io.BytesIO()
+    for chunk in chunks:
+        buffer.write(chunk)
+    return buffer.getvalue()
+
+def _iter_row_chunks(df, positions, chunk_rows, text_store=None):
+    if positions is None:
+        positions = np.arange(df.shape[0])
+    for start in range(0, len(positions), chunk_rows):
+        chunk_positions = positions[start : start + chunk_rows]
+        df_chunk = df.iloc[chunk_positions]
+        if text_store is not None:
+            df_chunk = df_chunk.assign(
+                **{
+                    col: text_store.get(col, chunk_positions)
+                    for col in EXPORT_COLUMNS[1:]
+                }
+            )
+        yield df_chunk
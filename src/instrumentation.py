@@ -0,0 +1,222 @@
+import contextvars
+import json
+import logging
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+logger = logging.getLogger("litconnector.instrumentation")
+if not logger.handlers:
+    _handler = logging.StreamHandler(sys.stderr)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+# The run that stages are currently recorded into, and the innermost stage, per
+# context. Background jobs run in a copy of the context that submitted them.
+_current_run = contextvars.ContextVar("litconnector_run", default=None)
+_current_frame = contextvars.ContextVar("litconnector_stage", default=None)
+
+# tracemalloc and its peak are process-wide, so at most one run traces at a time
+_tracing_lock = threading.Lock()
+_tracing_run = None
+
+
+def _start_tracing(run):
+    global _tracing_run
+    with _tracing_lock:
+        if _tracing_run is not None or tracemalloc.is_tracing():
+            return False
+        _tracing_run = run
+        tracemalloc.start()
+        return True
+
+
+def _stop_tracing(run):
+    global _tracing_run
+    with _tracing_lock:
+        if _tracing_run is run:
+            tracemalloc.stop()
+            _tracing_run = None
+
+
+def memory_traced(run):
+    """
+    Check whether the stages of a run record their peak memory.
+
+    Args:
+        run (dict): The run record returned by start_run.
+
+    Returns:
+        bool: True if the run is tracing memory allocations.
+    """
+    return _tracing_run is run
+
+
+def start_run(name, trace_memory=False, **info):
+    """
+    Start recording the stages of a run, such as one script rerun.
+
+    Args:
+        name (str): The name of the run.
+        trace_memory (bool, optional): If True, trace memory allocations until
+            finish_run, so stages record their peak memory. Tracing slows the run
+            down and is skipped while another run is traced.
+        **info: Additional JSON-serializable fields logged with the run.
+
+    Returns:
+        dict: The run record. Stages entered in the same context, including
+        background jobs submitted from it, are appended to its 'stages' list until
+        finish_run is called.
+    """
+    run = {
+        "event": name,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        **info,
+        "stages": [],
+        "_start": time.perf_counter(),
+        "_thread": threading.get_ident(),
+        "_lock": threading.Lock(),
+        "_finished": False,
+        "_late_stages": [],
+        "_token": None,
+    }
+    run["_token"] = _current_run.set(run)
+    if trace_memory:
+        _start_tracing(run)
+    return run
+
+
+def finish_run(run):
+    """
+    Stop recording a run and emit it as one JSON log line.
+
+    Stages that end later, such as those of background jobs still running, are
+    logged as lines of their own with the run's fields.
+
+    Args:
+        run (dict): The run record returned by start_run.
+
+    Returns:
+        dict: The run record, with the total 'seconds' of the run.
+    """
+    run["seconds"] = time.perf_counter() - run["_start"]
+    _stop_tracing(run)
+    if run["_token"] is not None:
+        try:
+            _current_run.reset(run["_token"])
+        except ValueError:
+            # Finished from another context than it was started in
+            _current_run.set(None)
+        run["_token"] = None
+
+    with run["_lock"]:
+        run["_finished"] = True
+        _log_run(run)
+    return run
+
+
+def late_stages(run):
+    """
+    Get the stages of a run that ended after the run finished.
+
+    Args:
+        run (dict): The run record returned by start_run.
+
+    Returns:
+        list: The stage records, in the order they ended.
+    """
+    with run["_lock"]:
+        return list(run["_late_stages"])
+
+
+def _log_run(run, **fields):
+    logger.info(
+        json.dumps(
+            {
+                **{key: value for key, value in run.items() if not key.startswith("_")},
+                **fields,
+            },
+            default=str,
+        )
+    )
+
+
+@contextmanager
+def stage(name, **info):
+    """
+    Record the wall time and peak memory of a stage.
+
+    The stage is added to the current run. Outside of a run, it is logged as a
+    run of its own. Peak memory is only recorded in runs that trace memory, for
+    stages in the run's own thread, and is the peak of traced allocations above
+    those live when the stage started.
+
+    Args:
+        name (str): The name of the stage.
+        **info: Additional fields recorded with the stage, such as 'rows' and
+            'columns'.
+
+    Yields:
+        dict: The stage record, which can be updated inside the block, e.g. with
+        record_shape.
+    """
+    run = _current_run.get()
+    standalone = run is None
+    if standalone:
+        run = start_run(name)
+
+    # tracemalloc's peak is process-wide, so stages of background jobs running
+    # alongside the run's own stages cannot measure theirs
+    tracing = memory_traced(run) and threading.get_ident() == run["_thread"]
+    record = {"stage": name, **info, "seconds": None, "peak_bytes": None}
+    parent = _current_frame.get()
+    frame = {"start_bytes": 0, "max_bytes": 0}
+    if tracing:
+        current_bytes, peak_bytes = tracemalloc.get_traced_memory()
+        if parent is not None:
+            parent["max_bytes"] = max(parent["max_bytes"], peak_bytes)
+        tracemalloc.reset_peak()
+        frame = {"start_bytes": current_bytes, "max_bytes": current_bytes}
+
+    frame_token = _current_frame.set(frame)
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record["seconds"] = time.perf_counter() - start
+        _current_frame.reset(frame_token)
+        if tracing and memory_traced(run):
+            peak_bytes = max(frame["max_bytes"], tracemalloc.get_traced_memory()[1])
+            record["peak_bytes"] = peak_bytes - frame["start_bytes"]
+            if parent is not None:
+                parent["max_bytes"] = max(parent["max_bytes"], peak_bytes)
+        with run["_lock"]:
+            if run["_finished"]:
+                run["_late_stages"].append(record)
+                _log_run(run, stages=[record], late=True)
+            else:
+                run["stages"].append(record)
+
+        if standalone:
+            finish_run(run)
+
+
+def record_shape(record, data):
+    """
+    Record the number of rows and columns of a stage's data.
+
+    Args:
+        record (dict): The stage record yielded by stage.
+        data: A DataFrame, array or other object with a shape or a length.
+    """
+    shape = getattr(data, "shape", None)
+    if shape is None:
+        shape = (len(data),)
+    record["rows"] = int(shape[0])
+    if len(shape) > 1:
+        record["columns"] = int(shape[1])
@@ -0,0 +1,209 @@
+import heapq
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from cooccurrence import as_binary_matrix, cooccurrence_counts, min_count_for_support
+from data_filtering import mask_to_bitset
+
+POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def popcount(bits):
+    """
+    Count the set bits of a bitset.
+
+    Args:
+        bits (numpy.ndarray): A uint64 bitset as returned by mask_to_bitset.
+
+    Returns:
+        int: The number of set bits.
+    """
+    if hasattr(np, "bitwise_count"):
+        return int(np.bitwise_count(bits).sum(dtype=np.int64))
+    return int(POPCOUNT_TABLE[bits.view(np.uint8)].sum(dtype=np.int64))
+
+
+def mine_itemsets(df, min_support, max_len=None, top_k=None):
+    """
+    Mine frequent itemsets with exact counts by intersecting per-label row bitsets.
+
+    Single-label and pair counts come from one co-occurrence count pass. Larger
+    itemsets are grown depth-first (ECLAT style): each itemset keeps the bitset of
+    the rows containing it, and is extended with later labels by intersecting
+    bitsets. A label is only tried as an extension if it forms a frequent pair
+    with every label already in the itemset, and extensions below the support
+    threshold are pruned along with all their supersets.
+
+    Args:
+        df (pandas.DataFrame): The 0/1 label matrix, one row per reference.
+        min_support (float): The minimum support threshold for frequent itemsets.
+        max_len (int, optional): The maximum length of itemsets to consider.
+        top_k (int, optional): If given, only the top_k most frequent itemsets of
+            two or more labels are kept, and the threshold is raised as they are
+            found.
+
+    Returns:
+        pandas.DataFrame: A DataFrame with 'support', 'itemsets' (frozensets of
+        column names) and exact integer 'count' columns.
+    """
+    counts = cooccurrence_counts(df)
+    labels = counts["labels"]
+    rows = counts["rows"]
+    pair_counts = counts["pair_counts"]
+    min_count = min_count_for_support(min_support, rows)
+    max_len = max_len or len(labels)
+
+    found = []
+    top = []
+
+    def threshold():
+        if top_k is not None and len(top) >= top_k:
+            return max(min_count, top[0])
+        return min_count
+
+    def record(itemset, count):
+        found.append((itemset, count))
+        if top_k is not None:
+            if len(top) < top_k:
+                heapq.heappush(top, count)
+            elif count > top[0]:
+                heapq.heapreplace(top, count)
+
+    bitsets = {}
+
+    def bitset(n):
+        if n not in bitsets:
+            B = label_matrix[:, n]
+            if hasattr(B, "toarray"):
+                B = B.toarray().ravel()
+            bitsets[n] = mask_to_bitset(B != 0)
+        return bitsets[n]
+
+    def extend(itemset, itemset_bits, candidates):
+        for n, item in enumerate(candidates):
+            extended_bits = itemset_bits & bitset(item)
+            count = popcount(extended_bits)
+            if count < threshold():
+                continue
+
+            extended = (*itemset, item)
+            record(extended, count)
+            if len(extended) < max_len:
+                later = candidates[n + 1 :]
+                later = later[pair_counts[item, later] >= threshold()]
+                extend(extended, extended_bits, later)
+
+    frequent = np.flatnonzero(counts["node_counts"] >= min_count)
+    for n in frequent:
+        found.append(((n,), counts["node_counts"][n]))
+
+    if max_len > 1:
+        label_matrix, _ = as_binary_matrix(df)
+        if hasattr(label_matrix, "tocsc"):
+            label_matrix = label_matrix.tocsc()
+
+        for n, first in enumerate(frequent):
+            partners = frequent[n + 1 :]
+            partners = partners[pair_counts[first, partners] >= threshold()]
+            for m, second in enumerate(partners):
+                count = pair_counts[first, second]
+                if count < threshold():
+                    continue
+                record((first, second), count)
+                if max_len > 2:
+                    later = partners[m + 1 :]
+                    later = later[pair_counts[second, later] >= threshold()]
+                    if later.size:
+                        extend(
+                            (first, second), bitset(first) & bitset(second), later
+                        )
+
+    min_kept = threshold()
+    itemsets = [
+        (frozenset(labels[n] for n in itemset), count)
+        for itemset, count in found
+        if len(itemset) == 1 or count >= min_kept
+    ]
+    item_counts = np.array([count for _, count in itemsets], dtype=np.int64)
+
+    return pd.DataFrame(
+        {
+            "support": item_counts / max(rows, 1),
+            "itemsets": [itemset for itemset, _ in itemsets],
+            "count": item_counts,
+        }
+    )
+
+
+def rules_from_itemsets(frequent_itemsets, rows):
+    """
+    Generate association rules from frequent itemsets with exact counts.
+
+    Every split of an itemset of two or more labels into a non-empty antecedent and
+    consequent becomes a rule. All subsets of a frequent itemset are frequent, so
+    their counts are looked up rather than recounted.
+
+    Args:
+        frequent_itemsets (pandas.DataFrame): The output of mine_itemsets.
+        rows (int): The number of rows the itemsets were mined from.
+
+    Returns:
+        pandas.DataFrame: One row per rule with 'antecedents', 'consequents',
+        their supports and counts, and 'support', 'confidence', 'lift',
+        'leverage', 'conviction' and 'zhangs_metric'.
+    """
+    counts = dict(zip(frequent_itemsets["itemsets"], frequent_itemsets["count"]))
+
+    antecedents = []
+    consequents = []
+    for itemset in frequent_itemsets["itemsets"]:
+        if len(itemset) < 2:
+            continue
+        items = sorted(itemset, key=str)
+        for size in range(1, len(items)):
+            for antecedent in itertools.combinations(items, size):
+                antecedent = frozenset(antecedent)
+                antecedents.append(antecedent)
+                consequents.append(itemset - antecedent)
+
+    count_a = np.array([counts[a] for a in antecedents], dtype=np.int64)
+    count_c = np.array([counts[c] for c in consequents], dtype=np.int64)
+    count_ac = np.array(
+        [counts[a | c] for a, c in zip(antecedents, consequents)], dtype=np.int64
+    )
+
+    rows = max(rows, 1)
+    support_a = count_a / rows
+    support_c = count_c / rows
+    support = count_ac / rows
+    expected = support_a * support_c
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        confidence = support / support_a
+        conviction = np.where(
+            confidence < 1, (1 - support_c) / (1 - confidence), np.inf
+        )
+        zhang_denominator = np.maximum(
+            support * (1 - support_a), support_a * (support_c - support)
+        )
+        zhangs_metric = (support - expected) / zhang_denominator
+
+    return pd.DataFrame(
+        {
+            "antecedents": antecedents,
+            "consequents": consequents,
+            "antecedent support": support_a,
+            "consequent support": support_c,
+            "support": support,
+            "confidence": confidence,
+            "lift": support / expected,
+            "leverage": support - expected,
+            "conviction": conviction,
+            "zhangs_metric": zhangs_metric,
+            "antecedent count": count_a,
+            "consequent count": count_c,
+            "support count": count_ac,
+        }
+    )
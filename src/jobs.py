@@ -0,0 +1,172 @@
+import contextvars
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+
+# Worker processes start from a clean server process instead of being forked
+# from the app's multithreaded server, which can deadlock on held locks
+PROCESS_START_METHOD = (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+
+class JobGroup:
+    """
+    Background jobs of one session, tied to a generation counter.
+
+    Every script run starts with begin, and each change of the session's
+    selection starts a new generation. Jobs are identified by a name and a key
+    describing their inputs; asking again for the same name and key returns the
+    running job, while a new key supersedes the old job. Jobs not asked for
+    since the run began, such as those of an earlier selection, are stale: they
+    are cancelled if they have not started yet, and their results are discarded
+    otherwise.
+
+    Args:
+        executor (concurrent.futures.Executor, optional): The executor jobs run
+            on, usually shared by every session. Without one, jobs run
+            synchronously when submitted.
+    """
+
+    def __init__(self, executor=None):
+        self.executor = executor
+        self.generation = 0
+        self.selection = None
+        self._jobs = {}
+
+    def begin(self, selection):
+        """
+        Begin a script run, starting a new generation if the selection changed.
+
+        Args:
+            selection: A hashable description of everything the jobs depend on,
+                e.g. a tuple of cache keys.
+
+        Returns:
+            int: The current generation.
+        """
+        if selection != self.selection:
+            self.selection = selection
+            self.generation += 1
+        for job in self._jobs.values():
+            job["requested"] = False
+        return self.generation
+
+    def submit(self, name, key, fn, *args, **kwargs):
+        """
+        Get the job computing fn(*args, **kwargs) for key, starting it if needed.
+
+        The job runs in a copy of the caller's context, so context variables
+        such as the current instrumentation run carry over to it.
+
+        Args:
+            name (str): The name of the job, e.g. 'network'.
+            key (str): The cache key of the job's inputs.
+            fn (callable): The function to run.
+            *args: Positional arguments of fn.
+            **kwargs: Keyword arguments of fn.
+
+        Returns:
+            concurrent.futures.Future: The job's future.
+        """
+        job = self._jobs.get(name)
+        if job is not None and job["key"] == key and not job["future"].cancelled():
+            job["requested"] = True
+            return job["future"]
+        if job is not None:
+            job["future"].cancel()
+
+        if self.executor is None:
+            future = Future()
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except Exception as error:
+                future.set_exception(error)
+        else:
+            context = contextvars.copy_context()
+            future = self.executor.submit(context.run, fn, *args, **kwargs)
+        self._jobs[name] = {
+            "key": key,
+            "generation": self.generation,
+            "future": future,
+            "requested": True,
+            "delivered": False,
+        }
+        return future
+
+    def result(self, name, key, fn, *args, **kwargs):
+        """
+        Get the result of a job if it has finished, submitting it otherwise.
+
+        Args:
+            name (str): The name of the job.
+            key (str): The cache key of the job's inputs.
+            fn (callable): The function to run.
+            *args: Positional arguments of fn.
+            **kwargs: Keyword arguments of fn.
+
+        Returns:
+            The result of fn, or None while the job is running. Exceptions raised
+            by fn are raised again here.
+        """
+        future = self.submit(name, key, fn, *args, **kwargs)
+        if not future.done():
+            return None
+        self._jobs[name]["delivered"] = True
+        return future.result()
+
+    def pending(self):
+        """
+        Check whether results of current jobs have yet to be delivered.
+
+        Returns:
+            bool: True if a job asked for in this run is running, or has
+            finished since its result was last asked for.
+        """
+        return any(not job["delivered"] for job in self._current())
+
+    def ready(self):
+        """
+        Check whether a current job has finished since its result was asked for.
+
+        Returns:
+            bool: True if a new result can be delivered.
+        """
+        return any(
+            job["future"].done() and not job["delivered"] for job in self._current()
+        )
+
+    def discard_stale(self):
+        """
+        Cancel and forget the jobs not asked for since the run began.
+
+        Returns:
+            int: The number of stale jobs discarded.
+        """
+        stale = [name for name, job in self._jobs.items() if not job["requested"]]
+        for name in stale:
+            self._jobs.pop(name)["future"].cancel()
+        return len(stale)
+
+    def _current(self):
+        return [job for job in self._jobs.values() if job["requested"]]
+
+
+def process_pool(n_workers, initializer=None, initargs=()):
+    """
+    Create a process pool whose workers are not forked from this process.
+
+    Args:
+        n_workers (int): Number of worker processes.
+        initializer (callable, optional): Called in each worker when it starts,
+            e.g. to receive read-only data once instead of with every task.
+        initargs (tuple, optional): Arguments passed to the initializer.
+
+    Returns:
+        concurrent.futures.ProcessPoolExecutor: The process pool.
+    """
+    return ProcessPoolExecutor(
+        max_workers=n_workers,
+        mp_context=multiprocessing.get_context(PROCESS_START_METHOD),
+        initializer=initializer,
+        initargs=initargs,
+    )
@@ -0,0 +1,144 @@
+import numpy as np
+
+# Half-width of the square the layout is scaled to, in canvas units
+LAYOUT_SCALE = 500
+LAYOUT_ITERATIONS = 150
+WARM_START_ITERATIONS = 40
+
+
+def force_layout(
+    n_nodes, source, target, initial=None, iterations=LAYOUT_ITERATIONS, seed=0
+):
+    """
+    Compute node positions with a vectorized Fruchterman-Reingold layout.
+
+    Nodes repel each other and edges pull their endpoints together, with the
+    step size cooling down linearly over the iterations. Given initial positions,
+    the layout is warm-started: unplaced nodes start at the mean position of
+    their placed neighbours, and the simulation starts cooler so placed nodes
+    stay close to where they were.
+
+    Args:
+        n_nodes (int): The number of nodes.
+        source (numpy.ndarray): The first node index of each edge.
+        target (numpy.ndarray): The second node index of each edge.
+        initial (numpy.ndarray, optional): An (n_nodes, 2) array of starting
+            positions, with NaN rows for nodes without one.
+        iterations (int, optional): Number of simulation steps.
+        seed (int, optional): Seed for the random starting positions.
+
+    Returns:
+        numpy.ndarray: An (n_nodes, 2) array of positions centred on the origin
+        and scaled to LAYOUT_SCALE.
+    """
+    rng = np.random.default_rng(seed)
+    source = np.asarray(source, dtype=np.int64)
+    target = np.asarray(target, dtype=np.int64)
+    if n_nodes == 0:
+        return np.zeros((0, 2))
+
+    pos = rng.uniform(-1, 1, (n_nodes, 2))
+    temperature = 0.2
+    if initial is not None:
+        initial = np.asarray(initial, dtype=np.float64)
+        placed = ~np.isnan(initial).any(axis=1)
+        if placed.any():
+            pos[placed] = _normalise(initial[placed])
+            pos[~placed] = _neighbour_mean(pos, placed, source, target, rng)
+            temperature = 0.2 * min(max(1 - placed.mean(), 0.1), 1)
+
+    # Ideal edge length for nodes spread over the [-1, 1] square
+    k = 2 / np.sqrt(n_nodes)
+    for step in range(iterations):
+        # Repulsion k^2 / d along each pair's direction, summed per node as
+        # sum_j w_ij (p_i - p_j) with w_ij = k^2 / d_ij^2
+        squared = (pos**2).sum(axis=1)
+        squared_distance = squared[:, None] + squared[None, :] - 2 * (pos @ pos.T)
+        weight = k**2 / np.maximum(squared_distance, 1e-4)
+        np.fill_diagonal(weight, 0)
+        displacement = pos * weight.sum(axis=1)[:, None] - weight @ pos
+
+        edge_delta = pos[source] - pos[target]
+        edge_distance = np.maximum(np.sqrt((edge_delta**2).sum(axis=-1)), 0.01)
+        pull = edge_delta * (edge_distance / k)[:, None]
+        for axis in range(2):
+            displacement[:, axis] -= np.bincount(
+                source, pull[:, axis], minlength=n_nodes
+            )
+            displacement[:, axis] += np.bincount(
+                target, pull[:, axis], minlength=n_nodes
+            )
+
+        length = np.maximum(np.sqrt((displacement**2).sum(axis=-1)), 1e-9)
+        step_size = temperature * (1 - step / iterations)
+        pos += displacement * (np.minimum(length, step_size) / length)[:, None]
+        # Keep nodes in the frame, so isolated nodes pushed away by every other
+        # node do not shrink the rest of the layout when it is scaled
+        np.clip(pos, -1, 1, out=pos)
+
+    return _normalise(pos) * LAYOUT_SCALE
+
+
+def network_layout(counts, edges, previous=None, seed=0):
+    """
+    Lay out the drawn nodes of a network.
+
+    Args:
+        counts (dict): The output of cooccurrence_counts the network was built from.
+        edges (dict): The drawn edges, as returned by select_edges.
+        previous (dict, optional): Earlier positions by node label, used to
+            warm-start the layout.
+        seed (int, optional): Seed for the random starting positions.
+
+    Returns:
+        dict: The (x, y) position of every drawn node, by node label.
+    """
+    labels = counts["labels"]
+    drawn = np.flatnonzero(counts["node_counts"] > 0)
+    node_index = np.full(len(labels), -1)
+    node_index[drawn] = np.arange(len(drawn))
+
+    initial = None
+    if previous:
+        initial = np.array(
+            [previous.get(labels[n], (np.nan, np.nan)) for n in drawn], dtype=np.float64
+        ).reshape(-1, 2)
+        iterations = WARM_START_ITERATIONS
+    else:
+        iterations = LAYOUT_ITERATIONS
+
+    pos = force_layout(
+        len(drawn),
+        node_index[edges["source"]],
+        node_index[edges["target"]],
+        initial=initial,
+        iterations=iterations,
+        seed=seed,
+    )
+    return {
+        labels[n]: (float(x), float(y)) for n, (x, y) in zip(drawn, pos.tolist())
+    }
+
+
+def _normalise(pos):
+    pos = pos - pos.mean(axis=0)
+    extent = np.abs(pos).max()
+    return pos / extent if extent > 0 else pos
+
+
+def _neighbour_mean(pos, placed, source, target, rng):
+    unplaced = np.flatnonzero(~placed)
+    sums = np.zeros((len(pos), 2))
+    counts = np.zeros(len(pos))
+    for a, b in ((source, target), (target, source)):
+        known = placed[b]
+        np.add.at(sums, a[known], pos[b[known]])
+        np.add.at(counts, a[known], 1)
+
+    start = rng.uniform(-1, 1, (len(unplaced), 2))
+    has_neighbours = counts[unplaced] > 0
+    start[has_neighbours] = (
+        sums[unplaced[has_neighbours]] / counts[unplaced[has_neighbours], None]
+        + rng.normal(0, 0.05, (has_neighbours.sum(), 2))
+    )
+    return start
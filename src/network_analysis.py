@@ -1,68 +1,118 @@
-import math
-
-from mlxtend.frequent_patterns import apriori, association_rules
-from streamlit_agraph import Config, Edge, Node, agraph
+import numpy as np
 
+from backbone import select_edges
+from cooccurrence import cooccurrence_counts, pair_metrics
 from data_processing import get_edge_color
+from itemsets import mine_itemsets, rules_from_itemsets
 
 
-def create_network(df_net, edge_color_map):
+def create_network(df_net, edge_color_map, counts=None):
     """
     Create a network visualization based on the input DataFrame.
 
     Args:
         df_net (pandas.DataFrame): The input DataFrame containing the network data.
         edge_color_map (dict): A dictionary mapping edge pairs to their respective colors.
+        counts (dict, optional): Precomputed output of cooccurrence_counts for df_net.
 
     Returns:
         agraph: A network graph object that can be rendered in a Streamlit app.
     """
-    rows = df_net.shape[0]
-    frequent_itemsets = apriori(
-        df_net, min_support=0.00001, max_len=2, use_colnames=True
-    )
+    nodes, edges = build_network(df_net, edge_color_map, counts=counts)
+    return render_network(nodes, edges)
+
+def build_network(df_net, edge_color_map, counts=None, edges=None, positions=None):
+    """
+    Build the nodes and edges of the network graph.
 
-    node_list = [
-        {"node": next(iter(i["itemsets"])), "support": i["support"]}
-        for i in frequent_itemsets.to_dict("records")
-        if len(i["itemsets"]) == 1
-    ]
-    node_dict = {node["node"]: n for n, node in enumerate(node_list)}
+    Args:
+        df_net (pandas.DataFrame): The input DataFrame containing the network data.
+            Only used when counts are not given.
+        edge_color_map (dict): A dictionary mapping edge pairs to their respective colors.
+        counts (dict, optional): Precomputed output of cooccurrence_counts for df_net.
+        edges (dict, optional): The edges to draw, as returned by select_edges.
+            Defaults to every pair co-occurring more than once.
+        positions (dict, optional): Fixed (x, y) node positions by node label, as
+            returned by network_layout.
 
+    Returns:
+        tuple: A list of Node objects and a list of Edge objects.
+    """
+    # streamlit_agraph is only imported once a network is drawn, keeping it out
+    # of the app's startup
+    from streamlit_agraph import Edge, Node  # noqa: PLC0415
+
+    if counts is None:
+        counts = cooccurrence_counts(df_net)
+    if edges is None:
+        edges = select_edges(counts)
+
+    labels = counts["labels"]
+    rows = max(counts["rows"], 1)
+    node_counts = counts["node_counts"]
+    pair_counts = counts["pair_counts"]
+
+    node_dict = {}
     nodes = []
-    for node in node_list:
+    for n in np.flatnonzero(node_counts > 0):
+        node_dict[n] = len(node_dict)
+        support = node_counts[n] / rows
+        node_position = {}
+        if positions is not None and labels[n] in positions:
+            node_position = dict(zip(("x", "y"), positions[labels[n]]))
         nodes.append(
             Node(
-                id=node_dict[node["node"]],
-                size=node["support"] * 50,
-                label=node["node"],
-                title=f'{node["node"]}: {int(node["support"]*rows)!s}',
+                id=node_dict[n],
+                size=support * 50,
+                label=labels[n],
+                title=f"{labels[n]}: {node_counts[n]!s}",
                 labelHighlightBold=True,
+                **node_position,
             )
         )
 
-    edges = []
-    for edge in frequent_itemsets.to_dict("records"):
-        if len(edge["itemsets"]) == 2 and (edge["support"] * rows > 1):
-            v1 = next(iter(edge["itemsets"]))
-            v2 = list(edge["itemsets"])[1]
-            edges.append(
-                Edge(
-                    source=node_dict[v1],
-                    target=node_dict[v2],
-                    value=edge["support"],
-                    weight=edge["support"],
-                    title=f'{v1} <--> {v2}: {int(edge["support"] * rows)}',
-                    color=get_edge_color(edge_color_map, v1, v2),
-                    type="CURVE_SMOOTH",
-                )
+    edge_list = []
+    for n1, n2 in zip(edges["source"], edges["target"]):
+        v1, v2 = labels[n1], labels[n2]
+        support = pair_counts[n1, n2] / rows
+        edge_list.append(
+            Edge(
+                source=node_dict[n1],
+                target=node_dict[n2],
+                value=support,
+                weight=support,
+                title=f"{v1} <--> {v2}: {pair_counts[n1, n2]}",
+                color=get_edge_color(edge_color_map, v1, v2),
+                type="CURVE_SMOOTH",
             )
+        )
+
+    return nodes, edge_list
+
+def render_network(nodes, edges, physics=True, width=1200, height=550):
+    """
+    Render network nodes and edges with the app's graph configuration.
+
+    Args:
+        nodes (list): A list of Node objects.
+        edges (list): A list of Edge objects.
+        physics (bool, optional): Whether the browser runs a force-directed
+            simulation. Turn it off for nodes with precomputed positions.
+        width (int, optional): The width of the graph, in pixels.
+        height (int, optional): The height of the graph, in pixels.
+
+    Returns:
+        agraph: A network graph object that can be rendered in a Streamlit app.
+    """
+    # Deferred like in build_network, to keep streamlit_agraph out of startup
+    from streamlit_agraph import Config, agraph  # noqa: PLC0415
 
     # Create the network graph configuration
     config = Config(
-        width=1200,
-        height=550,
+        width=width,
+        height=height,
         directed=True,
+        physics=physics,
         graphviz_layout="fdg",
         edges={"arrows": "none"},
         parentCentralization=False,
@@ -75,39 +125,33 @@ def create_network(df_net, edge_color_map):
 
     return agraph(nodes=nodes, edges=edges, config=config)
 
-def return_assoc_rules(df, min_support, sort_by, max_len):
+def return_assoc_rules(df, min_support, sort_by, max_len, top_k=None):
     """
-    Generate association rules from a DataFrame using the Apriori algorithm.
+    Generate association rules from a DataFrame of frequent itemsets.
+
+    Itemsets are mined with exact integer counts by intersecting per-label row
+    bitsets, so itemsets of three or more labels stay tractable.
 
     Args:
         df (pandas.DataFrame): The input DataFrame to analyze.
         min_support (float): The minimum support threshold for frequent itemsets.
         sort_by (str): The column name to sort the resulting rules by.
         max_len (int): The maximum length of itemsets to consider.
+        top_k (int, optional): If given, only the top_k rules by sort_by are
+            returned. When sorting by support or co-occurrence count, the support
+            threshold is raised during mining.
 
     Returns:
         pandas.DataFrame: A DataFrame containing the association rules with
         additional metrics, sorted by the specified column.
     """
-    frequent_itemsets = apriori(
-        df, min_support=min_support, use_colnames=True, max_len=max_len
+    mine_top_k = top_k if sort_by in ("support", "co-occurrence_count") else None
+    frequent_itemsets = mine_itemsets(
+        df, min_support=min_support, max_len=max_len, top_k=mine_top_k
     )
-    assoc_rules = association_rules(frequent_itemsets, min_threshold=0)
+    assoc_rules = rules_from_itemsets(frequent_itemsets, df.shape[0])
 
-    pmi = assoc_rules["support"] / (
-        assoc_rules["antecedent support"] * assoc_rules["consequent support"]
-    )
-    pmi = pmi.apply(lambda x: math.log(x))
-    assoc_rules["pmi"] = pmi
-
-    rows = df.shape[0]
-    assoc_rules["antecedent count"] = (assoc_rules["antecedent support"] * rows).astype(
-        int
-    )
-    assoc_rules["consequent count"] = (assoc_rules["consequent support"] * rows).astype(
-        int
-    )
-    assoc_rules["support count"] = (assoc_rules["support"] * rows).astype(int)
+    assoc_rules["pmi"] = np.log(assoc_rules["lift"])
 
     assoc_rules = assoc_rules.rename(
         columns={
@@ -119,28 +163,28 @@ def return_assoc_rules(df, min_support, sort_by, max_len):
         }
     )
 
-    return assoc_rules.sort_values(by=sort_by, ascending=False)
+    assoc_rules = assoc_rules.sort_values(by=sort_by, ascending=False, kind="mergesort")
+    if top_k is not None:
+        assoc_rules = assoc_rules.head(top_k)
+    return assoc_rules
 
-def network_tabular(df, cols_ar):
+def network_tabular(df, cols_ar, counts=None):
     """
     Create a tabular representation of network associations.
 
     Args:
-        df (pandas.DataFrame): The input DataFrame containing entity data.
+        df (pandas.DataFrame): The input DataFrame containing entity data. Only
+            used when counts are not given.
         cols_ar (list): A list of column names to include in the output.
+        counts (dict, optional): Precomputed output of cooccurrence_counts for df.
 
     Returns:
-        pandas.DataFrame: A DataFrame containing association rules between entities,
-        including only the columns specified in cols_ar.
+        pandas.DataFrame: A DataFrame containing association metrics between pairs of
+        entities, including only the columns specified in cols_ar.
     """
-    df_ar = return_assoc_rules(
-        df, min_support=0.00001, sort_by="co-occurrence_count", max_len=2
-    )
-    df_ar = df_ar.iloc[::2, :].reset_index(drop=True)
-
-    df_ar["entity_1"] = [next(iter(row)) for row in df_ar["entity_1"]]
-    df_ar["entity_2"] = [next(iter(row)) for row in df_ar["entity_2"]]
+    if counts is None:
+        counts = cooccurrence_counts(df)
 
-    df_ar = df_ar[cols_ar]
+    df_ar = pair_metrics(counts)
 
-    return df_ar
+    return df_ar[cols_ar]
@@ -0,0 +1,173 @@
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+
+def make_cache_key(*parts):
+    """
+    Build a stable cache key from a sequence of hashable parts.
+
+    Args:
+        *parts: Strings, numbers and (nested) tuples identifying a computation.
+
+    Returns:
+        str: A hex digest that is stable across processes and server restarts.
+    """
+    return hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    A thread-safe LRU cache with a byte-size budget and an optional disk tier.
+
+    Values are stored pickled, so their size is known exactly and every hit
+    returns a fresh copy that callers are free to modify. When a disk directory
+    is given, entries are also written there and looked up on a memory miss,
+    so results survive a server restart.
+
+    Args:
+        max_bytes (int): The memory budget for pickled values.
+        disk_dir (str, optional): Directory for the on-disk tier.
+        disk_max_bytes (int, optional): The size budget for the on-disk tier.
+    """
+
+    def __init__(self, max_bytes, disk_dir=None, disk_max_bytes=None):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        if self.disk_dir is not None:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    def get(self, key, default=None):
+        """
+        Look up a cached value, refreshing its LRU position.
+
+        Args:
+            key (str): The cache key, usually from make_cache_key.
+            default (optional): Returned if the key is not cached.
+
+        Returns:
+            The cached value, or default.
+        """
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+
+        if data is None:
+            data = self._read_disk(key)
+            if data is not None:
+                self._store_memory(key, data)
+
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+        return pickle.loads(data)
+
+    def put(self, key, value):
+        """
+        Store a value in memory, evicting least recently used entries as needed,
+        and in the disk tier if one is configured.
+
+        Args:
+            key (str): The cache key, usually from make_cache_key.
+            value: Any picklable object.
+        """
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self._store_memory(key, data)
+        self._write_disk(key, data)
+
+    def get_or_compute(self, key, compute):
+        """
+        Return the cached value for key, computing and storing it on a miss.
+
+        Args:
+            key (str): The cache key, usually from make_cache_key.
+            compute (callable): Called with no arguments to produce the value.
+
+        Returns:
+            The cached or freshly computed value.
+        """
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        """Remove all in-memory entries. The disk tier is left untouched."""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def _store_memory(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= len(self._entries.pop(key))
+            self._entries[key] = data
+            self.current_bytes += len(data)
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= len(evicted)
+
+    def _disk_path(self, key):
+        if self.disk_dir is None:
+            return None
+        return os.path.join(self.disk_dir, f"{key}.pkl")
+
+    def _read_disk(self, key):
+        path = self._disk_path(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            return None
+        return data
+
+    def _write_disk(self, key, data):
+        path = self._disk_path(key)
+        if path is None:
+            return
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        if self.disk_max_bytes is not None:
+            self._evict_disk()
+
+    def _evict_disk(self):
+        entries = []
+        for name in os.listdir(self.disk_dir):
+            if not name.endswith(".pkl"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.disk_dir, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.disk_dir, name))
+            except OSError:
+                continue
+            total -= size
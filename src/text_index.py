@@ -0,0 +1,234 @@
+import bisect
+import os
+import re
+import uuid
+
+import numpy as np
+import pandas as pd
+
+TOKEN_PATTERN = r"\w+"
+INDEX_CHUNK_ROWS = 10_000
+
+TERMS_FILE = "text_index.terms.txt"
+OFFSETS_FILE = "text_index.offsets.npy"
+POSTINGS_FILE = "text_index.postings.npy"
+
+
+def tokenize(text):
+    """
+    Split text into lowercase word tokens.
+
+    Args:
+        text (str): The text to tokenize.
+
+    Returns:
+        list: The tokens, in order of appearance.
+    """
+    return re.findall(TOKEN_PATTERN, text.lower())
+
+
+def build_text_index(text_store, columns=None, chunk_rows=INDEX_CHUNK_ROWS):
+    """
+    Build an inverted index from word tokens to the rows containing them.
+
+    Args:
+        text_store (TextStore): The text store of a dataset.
+        columns (list, optional): The text columns to index. Defaults to all of
+            them.
+        chunk_rows (int, optional): Number of rows tokenized at a time.
+
+    Returns:
+        dict: A dictionary with 'n_rows', 'terms' (the sorted vocabulary),
+        'offsets' and 'postings'. The sorted row positions containing terms[n]
+        are postings[offsets[n]:offsets[n + 1]].
+    """
+    columns = text_store.columns if columns is None else columns
+    n_rows = text_store.n_rows
+
+    vocabulary = {}
+    term_ids = []
+    row_lengths = []
+    for start in range(0, n_rows, chunk_rows):
+        positions = np.arange(start, min(start + chunk_rows, n_rows))
+        chunk_tokens = []
+        for texts in zip(*(text_store.get(col, positions) for col in columns)):
+            text = " ".join(value for value in texts if isinstance(value, str))
+            tokens = set(tokenize(text))
+            chunk_tokens.extend(tokens)
+            row_lengths.append(len(tokens))
+
+        codes, uniques = pd.factorize(np.array(chunk_tokens, dtype=object))
+        chunk_ids = np.array(
+            [vocabulary.setdefault(token, len(vocabulary)) for token in uniques],
+            dtype=np.int64,
+        )
+        term_ids.append(chunk_ids[codes])
+
+    terms = sorted(vocabulary)
+    rank = np.empty(len(terms), dtype=np.int64)
+    rank[[vocabulary[term] for term in terms]] = np.arange(len(terms))
+
+    # Rows are already in order, so a stable sort by term gives sorted postings
+    term_ids = rank[np.concatenate(term_ids)] if term_ids else np.empty(0, np.int64)
+    term_rows = np.repeat(np.arange(n_rows, dtype=np.int32), row_lengths)
+    order = np.argsort(term_ids, kind="stable")
+
+    offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(term_ids, minlength=len(terms)), out=offsets[1:])
+    return {
+        "n_rows": n_rows,
+        "terms": terms,
+        "offsets": offsets,
+        "postings": term_rows[order],
+    }
+
+
+def text_index_exists(directory):
+    """
+    Check whether a text index is stored in a dataset directory.
+
+    Args:
+        directory (str): The dataset directory.
+
+    Returns:
+        bool: True if the text index is present.
+    """
+    return os.path.isfile(os.path.join(directory, TERMS_FILE))
+
+
+def save_text_index(index, directory):
+    """
+    Store a text index alongside a preprocessed dataset.
+
+    The vocabulary is written last, so a partially written index is never
+    picked up by text_index_exists.
+
+    Args:
+        index (dict): The output of build_text_index.
+        directory (str): The dataset directory.
+    """
+    for name, array in ((OFFSETS_FILE, index["offsets"]), (POSTINGS_FILE, index["postings"])):
+        _replace_file(directory, name, lambda f, array=array: np.save(f, array))
+    _replace_file(
+        directory,
+        TERMS_FILE,
+        lambda f: f.write("\n".join(index["terms"]).encode("utf-8")),
+    )
+
+
+def load_text_index(directory, n_rows):
+    """
+    Load a stored text index, memory-mapping its postings.
+
+    Args:
+        directory (str): The dataset directory.
+        n_rows (int): The number of rows in the dataset.
+
+    Returns:
+        dict: The text index, as returned by build_text_index.
+    """
+    with open(os.path.join(directory, TERMS_FILE), encoding="utf-8") as f:
+        content = f.read()
+    return {
+        "n_rows": n_rows,
+        "terms": content.split("\n") if content else [],
+        "offsets": np.load(os.path.join(directory, OFFSETS_FILE), mmap_mode="r"),
+        "postings": np.load(os.path.join(directory, POSTINGS_FILE), mmap_mode="r"),
+    }
+
+
+def parse_query(query):
+    """
+    Split a search query into its clauses.
+
+    Quoted text is a phrase; other words are single terms, and a trailing '*'
+    makes a term match every word starting with it. Words joined by punctuation,
+    such as 'thyroid-stimulating', are treated as phrases.
+
+    Args:
+        query (str): The search query.
+
+    Returns:
+        list: A list of (tokens, prefix) tuples, one per clause.
+    """
+    clauses = []
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', query):
+        prefix = bool(word) and word.endswith("*")
+        tokens = tokenize(phrase or word)
+        if tokens:
+            clauses.append((tokens, prefix and len(tokens) == 1))
+    return clauses
+
+
+def search_text(index, query, text_store=None):
+    """
+    Find the rows matching every clause of a search query.
+
+    Terms are looked up in the inverted index. For phrases, the rows containing
+    all of the phrase's words are found in the index, and only those rows are
+    checked for the exact phrase in the text store.
+
+    Args:
+        index (dict): A text index from build_text_index or load_text_index.
+        query (str): The search query, as described in parse_query.
+        text_store (TextStore, optional): The text store of the dataset. Without
+            it, phrases match rows containing all of their words in any order.
+
+    Returns:
+        numpy.ndarray or None: The sorted positions of the matching rows, or None
+        if the query has no terms.
+    """
+    clauses = parse_query(query)
+    if not clauses:
+        return None
+
+    positions = None
+    for tokens, prefix in clauses:
+        if prefix:
+            rows = _prefix_postings(index, tokens[0])
+        else:
+            rows = _term_postings(index, tokens[0])
+            for token in tokens[1:]:
+                rows = np.intersect1d(rows, _term_postings(index, token), assume_unique=True)
+            if len(tokens) > 1 and text_store is not None:
+                rows = _match_phrase(text_store, rows, tokens)
+
+        positions = rows if positions is None else np.intersect1d(
+            positions, rows, assume_unique=True
+        )
+        if not positions.size:
+            break
+    return positions.astype(np.int64)
+
+
+def _term_postings(index, term):
+    terms = index["terms"]
+    n = bisect.bisect_left(terms, term)
+    if n < len(terms) and terms[n] == term:
+        return np.asarray(index["postings"][index["offsets"][n] : index["offsets"][n + 1]])
+    return np.empty(0, dtype=np.int32)
+
+
+def _prefix_postings(index, prefix):
+    terms = index["terms"]
+    first = bisect.bisect_left(terms, prefix)
+    last = bisect.bisect_left(terms, prefix + "\U0010ffff")
+    rows = np.asarray(index["postings"][index["offsets"][first] : index["offsets"][last]])
+    return np.unique(rows)
+
+
+def _match_phrase(text_store, rows, tokens):
+    pattern = re.compile(r"\b" + r"\W+".join(map(re.escape, tokens)) + r"\b")
+    match = np.zeros(len(rows), dtype=bool)
+    for col in text_store.columns:
+        text = pd.Series(text_store.get(col, rows)).fillna("").str.lower()
+        match |= text.str.contains(pattern).to_numpy(dtype=bool)
+    return rows[match]
+
+
+def _replace_file(directory, name, write):
+    path = os.path.join(directory, name)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "wb") as f:
+        write(f)
+    os.replace(tmp_path, path)
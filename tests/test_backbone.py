@@ -0,0 +1,72 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backbone import disparity_significance, select_edges, top_k_per_node
+from cooccurrence import cooccurrence_counts
+
+
+def test_disparity_significance_hand_computed():
+    # A weighted triangle, and a separate edge between two degree-one nodes
+    source = np.array([0, 0, 1, 3])
+    target = np.array([1, 2, 2, 4])
+    weights = np.array([3, 1, 2, 1])
+
+    # Strengths are 4, 5 and 3 for the triangle nodes, all of degree 2
+    expected = [
+        min(1 - 3 / 4, 1 - 3 / 5),
+        min(1 - 1 / 4, 1 - 1 / 3),
+        min(1 - 2 / 5, 1 - 2 / 3),
+        0.0,
+    ]
+    np.testing.assert_allclose(
+        disparity_significance(source, target, weights, n_nodes=5), expected
+    )
+
+
+@pytest.mark.parametrize("k", [1, 2, 3])
+def test_top_k_per_node_matches_brute_force(k):
+    rng = np.random.default_rng(k)
+    n_nodes = 8
+    pairs = np.array(list(itertools.combinations(range(n_nodes), 2)))
+    pairs = pairs[rng.random(len(pairs)) < 0.6]
+    source, target = pairs.T
+    # Rounded scores, so some edges of a node tie
+    scores = rng.integers(0, 5, len(pairs)).astype(float)
+
+    expected = np.zeros(len(pairs), dtype=bool)
+    for node in range(n_nodes):
+        edges = np.flatnonzero((source == node) | (target == node))
+        ranked = sorted(edges, key=lambda edge: (-scores[edge], edge))
+        expected[ranked[:k]] = True
+
+    np.testing.assert_array_equal(
+        top_k_per_node(source, target, scores, n_nodes, k), expected
+    )
+
+
+def test_select_edges_respects_min_count_and_max_edges():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        (rng.random((300, 10)) < np.linspace(0.05, 0.5, 10)).astype(int),
+        columns=[f"L{n}" for n in range(10)],
+    )
+    counts = cooccurrence_counts(df)
+    pair_counts = counts["pair_counts"]
+    upper = np.triu(np.ones_like(pair_counts, dtype=bool), k=1)
+
+    edges = select_edges(counts, min_count=5)
+    assert edges["candidates"] == int((pair_counts[upper] >= 5).sum())
+    assert edges["dropped"] == 0
+    assert (pair_counts[edges["source"], edges["target"]] >= 5).all()
+
+    capped = select_edges(counts, min_count=5, max_edges=10)
+    assert len(capped["source"]) == 10
+    assert capped["dropped"] == capped["candidates"] - 10
+    kept = pair_counts[capped["source"], capped["target"]]
+    dropped = set(zip(edges["source"], edges["target"])) - set(
+        zip(capped["source"], capped["target"])
+    )
+    assert kept.min() >= max(pair_counts[pair] for pair in dropped)
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from batch import enumerate_selections, run_batch
+
+
+@pytest.fixture
+def input_files(tmp_path):
+    rng = np.random.default_rng(0)
+    n_rows = 400
+    labels = ["TPO", "TSH", "DIO", "Human", "Rodent", "In Vivo", "In Vitro"]
+    df = pd.DataFrame(
+        np.where(rng.random((n_rows, len(labels))) < 0.3, "x", None), columns=labels
+    )
+    df.insert(0, "Refid", np.arange(n_rows))
+    df.insert(1, "Title", [f"Title {n}" for n in range(n_rows)])
+    df.insert(2, "Abstract", [f"Abstract {n}" for n in range(n_rows)])
+
+    paths = {
+        "distiller_input_file": tmp_path / "input.csv",
+        "network_config_file": tmp_path / "network.csv",
+        "filter_group_file": tmp_path / "filters.csv",
+    }
+    df.to_csv(paths["distiller_input_file"], index=False)
+    pd.DataFrame({"columns_in_network": ["TPO", "TSH", "DIO"]}).to_csv(
+        paths["network_config_file"], index=False
+    )
+    pd.DataFrame(
+        {
+            "filter_group_name": ["Species", "Species", "Design", "Design"],
+            "columns_in_group": ["Human", "Rodent", "In Vivo", "In Vitro"],
+        }
+    ).to_csv(paths["filter_group_file"], index=False)
+    return df.notna(), paths
+
+
+@pytest.mark.parametrize("n_workers", [1, 2])
+def test_run_batch_pairs_match_manual_mask(input_files, n_workers):
+    df_present, paths = input_files
+    filter_groups = pd.read_csv(paths["filter_group_file"])
+    selections = enumerate_selections(filter_groups, "pairs")
+    assert len(selections) == 4
+
+    df_batch = run_batch(selections=selections, n_workers=n_workers, **paths)
+    for selection, df_edges in df_batch.groupby("selection"):
+        level_1, level_2 = selection.split(" + ")
+        mask = df_present[level_1] & df_present[level_2]
+        assert (df_edges["n_papers"] == mask.sum()).all()
+        for row in df_edges.to_dict("records"):
+            both = mask & df_present[row["entity_1"]] & df_present[row["entity_2"]]
+            assert row["co-occurrence_count"] == both.sum()
+
+
+def test_run_batch_list_selection_matches_any_level(input_files, tmp_path):
+    df_present, paths = input_files
+    selection_file = tmp_path / "selections.csv"
+    pd.DataFrame(
+        {
+            "selection_name": ["Animal", "Animal"],
+            "columns_in_selection": ["Human", "Rodent"],
+        }
+    ).to_csv(selection_file, index=False)
+    selections = enumerate_selections(
+        pd.read_csv(paths["filter_group_file"]), "list", selection_file
+    )
+
+    df_batch = run_batch(selections=selections, **paths)
+    mask = df_present["Human"] | df_present["Rodent"]
+    assert (df_batch["n_papers"] == mask.sum()).all()
@@ -0,0 +1,19 @@
+import numpy as np
+import pandas as pd
+
+from bootstrap import bootstrap_pair_counts
+
+
+def test_bootstrap_counts_do_not_depend_on_workers():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame((rng.random((500, 5)) < 0.3).astype(int), columns=list("ABCDE"))
+    pairs = (np.array([0, 0, 2]), np.array([1, 3, 4]))
+
+    node_counts, pair_counts = bootstrap_pair_counts(X, pairs, n_resamples=120)
+    parallel = bootstrap_pair_counts(X, pairs, n_resamples=120, n_workers=2)
+
+    np.testing.assert_array_equal(parallel[0], node_counts)
+    np.testing.assert_array_equal(parallel[1], pair_counts)
+    assert node_counts.shape == (120, 5)
+    assert pair_counts.shape == (120, 3)
+    assert (pair_counts <= node_counts[:, pairs[0]]).all()
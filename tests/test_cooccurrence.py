@@ -0,0 +1,152 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cooccurrence import (
+    build_pair_index,
+    compare_pair_metrics,
+    cooccurrence_counts,
+    cooccurrence_counts_for_groups,
+    cooccurrence_counts_for_rows,
+    pair_metrics,
+)
+
+
+@pytest.fixture
+def df_labels():
+    rng = np.random.default_rng(0)
+    values = (rng.random((300, 6)) < [0.5, 0.3, 0.2, 0.1, 0.05, 0.0]).astype(int)
+    return pd.DataFrame(values, columns=list("ABCDEF"))
+
+
+def test_cooccurrence_counts_match_dense_product(df_labels):
+    counts = cooccurrence_counts(df_labels, chunk_rows=64)
+    B = df_labels.to_numpy()
+
+    assert counts["labels"] == list("ABCDEF")
+    assert counts["rows"] == 300
+    np.testing.assert_array_equal(counts["pair_counts"], B.T @ B)
+    np.testing.assert_array_equal(counts["node_counts"], B.sum(axis=0))
+
+
+def test_cooccurrence_counts_sparse_and_missing_values(df_labels):
+    sparse = pytest.importorskip("scipy.sparse")
+    counts = cooccurrence_counts(df_labels)
+
+    sparse_counts = cooccurrence_counts(sparse.csr_matrix(df_labels.to_numpy()))
+    np.testing.assert_array_equal(sparse_counts["pair_counts"], counts["pair_counts"])
+
+    # Missing values count as absence, any other non-zero value as presence
+    df_missing = df_labels.astype(float).replace(0, np.nan) * 2
+    missing_counts = cooccurrence_counts(df_missing)
+    np.testing.assert_array_equal(missing_counts["pair_counts"], counts["pair_counts"])
+
+
+def test_pair_metrics_hand_computed():
+    df = pd.DataFrame({"A": [1, 1, 1, 0], "B": [1, 1, 0, 0], "C": [0, 0, 0, 1]})
+    df_pairs = pair_metrics(cooccurrence_counts(df))
+
+    # Only A and B co-occur: in 2 of 4 rows, with A in 3 rows and B in 2
+    assert df_pairs[["entity_1", "entity_2"]].values.tolist() == [["A", "B"]]
+    row = df_pairs.iloc[0]
+    assert row["co-occurrence_count"] == 2
+    assert row["entity_1_count"] == 3
+    assert row["entity_2_count"] == 2
+    assert row["support"] == pytest.approx(0.5)
+    assert row["lift"] == pytest.approx(0.5 / (0.75 * 0.5))
+    assert row["leverage"] == pytest.approx(0.5 - 0.75 * 0.5)
+    assert row["pmi"] == pytest.approx(np.log(0.5 / (0.75 * 0.5)))
+
+
+def test_pair_metrics_match_pairwise_masks(df_labels):
+    df_pairs = pair_metrics(cooccurrence_counts(df_labels), min_count=5)
+
+    rows = len(df_labels)
+    for row in df_pairs.to_dict("records"):
+        first = df_labels[row["entity_1"]] == 1
+        second = df_labels[row["entity_2"]] == 1
+        both = int((first & second).sum())
+        assert row["co-occurrence_count"] == both
+        assert row["lift"] == pytest.approx(both * rows / (first.sum() * second.sum()))
+    assert (df_pairs["co-occurrence_count"] >= 5).all()
+    assert df_pairs["co-occurrence_count"].is_monotonic_decreasing
+
+
+def test_counts_for_rows_incremental_matches_recount(df_labels):
+    B = df_labels.to_numpy().astype(bool)
+    labels = list(df_labels.columns)
+    rng = np.random.default_rng(1)
+
+    first = np.sort(rng.choice(300, 200, replace=False))
+    second = np.union1d(first[10:], [int(np.setdiff1d(np.arange(300), first)[0])])
+
+    previous = cooccurrence_counts_for_rows(B, labels, first)
+    counts = cooccurrence_counts_for_rows(B, labels, second, previous=previous)
+
+    assert counts["incremental"]
+    np.testing.assert_array_equal(
+        counts["pair_counts"], cooccurrence_counts(B[second])["pair_counts"]
+    )
+
+
+def test_pair_index_looks_up_both_orders(df_labels):
+    df_pairs = pair_metrics(cooccurrence_counts(df_labels))
+    index = build_pair_index(df_pairs)
+
+    assert len(index) == 2 * len(df_pairs)
+    for position, (entity_1, entity_2) in enumerate(
+        zip(df_pairs["entity_1"], df_pairs["entity_2"])
+    ):
+        assert index[(entity_1, entity_2)] == index[(entity_2, entity_1)] == position
+
+    # F never occurs, so it has no pairs, and a node is not paired with itself
+    assert index.get(("A", "F")) is None
+    assert index.get(("A", "A")) is None
+
+
+def test_counts_for_groups_match_separate_counts(df_labels):
+    B = df_labels.to_numpy().astype(bool)
+    labels = list(df_labels.columns)
+    groups = [
+        np.flatnonzero(B[:, 0]),
+        np.flatnonzero(B[:, 1]),
+        np.arange(0, 300, 7),
+        np.empty(0, dtype=np.int64),
+    ]
+
+    for counts, positions in zip(
+        cooccurrence_counts_for_groups(B, labels, groups), groups
+    ):
+        assert counts["rows"] == len(positions)
+        np.testing.assert_array_equal(
+            counts["pair_counts"], cooccurrence_counts(B[positions])["pair_counts"]
+        )
+
+
+def test_compare_pair_metrics_hand_computed():
+    first = pd.DataFrame({"A": [1, 1, 1, 0], "B": [1, 1, 0, 0], "C": [0, 0, 0, 1]})
+    second = pd.DataFrame({"A": [1, 0], "B": [0, 0], "C": [1, 1]})
+    df_compare = compare_pair_metrics(
+        [cooccurrence_counts(first), cooccurrence_counts(second)], ["G1", "G2"]
+    )
+
+    # A-B only co-occurs in G1 and A-C only in G2; B-C never does
+    assert df_compare[["entity_1", "entity_2"]].values.tolist() == [
+        ["A", "B"],
+        ["A", "C"],
+    ]
+    ab, ac = df_compare.to_dict("records")
+
+    assert (ab["count (G1)"], ab["count (G2)"], ab["count delta (G2)"]) == (2, 0, -2)
+    assert ab["lift (G1)"] == pytest.approx(2 * 4 / (3 * 2))
+    assert ab["pmi (G1)"] == pytest.approx(np.log(4 / 3))
+    # B does not occur in G2, so its lift, PMI and their deltas are undefined
+    assert np.isnan([ab["lift (G2)"], ab["pmi (G2)"], ab["lift delta (G2)"]]).all()
+
+    assert (ac["count (G1)"], ac["count (G2)"], ac["count delta (G2)"]) == (0, 1, 1)
+    assert ac["lift (G1)"] == 0
+    assert ac["lift (G2)"] == pytest.approx(1 * 2 / (1 * 2))
+    assert ac["lift delta (G2)"] == pytest.approx(1)
+    assert ac["pmi (G2)"] == pytest.approx(0)
+    assert np.isnan([ac["pmi (G1)"], ac["pmi delta (G2)"]]).all()
+    assert "count delta (G1)" not in df_compare.columns
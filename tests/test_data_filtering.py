@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_filtering import (
+    MAX_CATEGORY_VALUES,
+    bitset_to_positions,
+    build_filter_index,
+    filter_all,
+    filter_positions,
+    mask_to_bitset,
+    pair_positions,
+)
+
+
+@pytest.fixture
+def df_prep():
+    rng = np.random.default_rng(0)
+    n_rows = 1000
+    df = pd.DataFrame(
+        (rng.random((n_rows, 4)) < [0.5, 0.3, 0.2, 0.05]).astype(int),
+        columns=["Human", "Rodent", "In Vivo", "In Vitro"],
+    )
+    df.insert(0, "Refid", np.arange(n_rows))
+    df["Design"] = rng.choice(["Cohort", "Case-control", "Trial"], n_rows)
+    return df
+
+
+@pytest.mark.parametrize("n_rows", [0, 1, 63, 64, 65, 1000])
+def test_bitset_round_trip(n_rows):
+    mask = np.random.default_rng(n_rows).random(n_rows) < 0.3
+    np.testing.assert_array_equal(
+        bitset_to_positions(mask_to_bitset(mask)), np.flatnonzero(mask)
+    )
+
+
+@pytest.mark.parametrize(
+    ("multilabel", "multiclass"),
+    [
+        (None, None),
+        ([["Human"]], None),
+        ([["Human", "Rodent"]], None),
+        ([["Human", "Rodent"], ["In Vivo"]], None),
+        ([["In Vitro"], ["In Vivo"]], [{"name": "Design", "categories": ["Trial"]}]),
+        (None, [{"name": "Design", "categories": ["Cohort", "Missing"]}]),
+        ([[]], [{"name": "Design", "categories": []}]),
+    ],
+)
+def test_filter_all_matches_manual_mask(df_prep, multilabel, multiclass):
+    mask = np.ones(len(df_prep), dtype=bool)
+    for group in multilabel or []:
+        if group:
+            mask &= (df_prep[group] == 1).any(axis=1).to_numpy()
+    for var in multiclass or []:
+        if var["categories"]:
+            mask &= df_prep[var["name"]].isin(var["categories"]).to_numpy()
+    expected = np.flatnonzero(mask)
+
+    index = build_filter_index(
+        df_prep, label_columns=["Human", "Rodent", "In Vivo", "In Vitro"]
+    )
+    for filter_index in (None, index):
+        positions = filter_all(
+            df_prep, multilabel, multiclass, index=filter_index, return_positions=True
+        )
+        np.testing.assert_array_equal(positions, expected)
+
+        df_filter = filter_all(df_prep, multilabel, multiclass, index=filter_index)
+        np.testing.assert_array_equal(df_filter["Refid"], expected)
+
+
+def test_filter_all_on_category_left_out_of_index(df_prep):
+    chemicals = [f"Chemical {n}" for n in range(MAX_CATEGORY_VALUES + 50)]
+    df_prep["Chemical"] = np.random.default_rng(1).choice(chemicals, len(df_prep))
+    index = build_filter_index(
+        df_prep, label_columns=["Human", "Rodent", "In Vivo", "In Vitro"]
+    )
+    assert "Chemical" not in index["categories"]
+
+    multiclass = [
+        {"name": "Chemical", "categories": ["Chemical 3", "Chemical 300"]},
+        {"name": "Design", "categories": ["Cohort", "Trial"]},
+    ]
+    expected = np.flatnonzero(
+        df_prep["Chemical"].isin(["Chemical 3", "Chemical 300"])
+        & df_prep["Design"].isin(["Cohort", "Trial"])
+        & (df_prep["Human"] == 1)
+    )
+    for filter_index in (None, index):
+        positions = filter_all(
+            df_prep, [["Human"]], multiclass, index=filter_index, return_positions=True
+        )
+        np.testing.assert_array_equal(positions, expected)
+
+    with pytest.raises(KeyError, match="Chemical"):
+        filter_positions(index, multiclass=multiclass)
+
+
+def test_filter_all_text_positions(df_prep):
+    index = build_filter_index(
+        df_prep, label_columns=["Human", "Rodent", "In Vivo", "In Vitro"]
+    )
+    text_positions = np.arange(0, len(df_prep), 3)
+    expected = np.intersect1d(np.flatnonzero(df_prep["Human"] == 1), text_positions)
+
+    for filter_index in (None, index):
+        positions = filter_all(
+            df_prep,
+            [["Human"]],
+            index=filter_index,
+            return_positions=True,
+            text_positions=text_positions,
+        )
+        np.testing.assert_array_equal(positions, expected)
+
+
+def test_pair_positions(df_prep):
+    index = build_filter_index(
+        df_prep, label_columns=["Human", "Rodent", "In Vivo", "In Vitro"]
+    )
+    both = np.flatnonzero((df_prep["Human"] == 1) & (df_prep["In Vivo"] == 1))
+    subset = np.arange(0, len(df_prep), 2)
+
+    np.testing.assert_array_equal(pair_positions(index, "Human", "In Vivo"), both)
+    np.testing.assert_array_equal(
+        pair_positions(index, "Human", "In Vivo", subset), np.intersect1d(both, subset)
+    )
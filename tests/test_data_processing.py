@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_processing import load_and_preprocess_chunked, preprocess_data
+
+
+def test_parallel_preprocessing_matches_serial():
+    rng = np.random.default_rng(0)
+    n_rows = 600
+    refids = rng.integers(0, 200, n_rows)
+    df = pd.DataFrame(
+        {
+            "Refid": refids,
+            "Title": [f"Title {refid}" for refid in refids],
+            "Abstract": [f"Abstract {refid}" for refid in refids],
+            "Human": np.where(rng.random(n_rows) < 0.3, "x", None),
+            "Rodent": np.where(rng.random(n_rows) < 0.2, "x", None),
+        }
+    )
+
+    pd.testing.assert_frame_equal(
+        preprocess_data(df, n_workers=3), preprocess_data(df)
+    )
+
+
+@pytest.fixture
+def df_raw():
+    return pd.DataFrame(
+        {
+            "Refid": [3, 1, 1, 2, 3, 1, 2, 3, np.nan],
+            "Title": [None, "First", "Second", "Only", "Third", None, None, "Last", "X"],
+            "Abstract": [None, None, "A1", None, None, "A2", None, "A3", "X"],
+            "LifeStage": [
+                "Juvenile",
+                "Adult",
+                "Fetal",
+                None,
+                "Adult",
+                "Fetal",
+                None,
+                None,
+                "Adult",
+            ],
+            "Year": [2001, 1999, 2003, 2010, 2000, 2002, 2011, 2004, 1990],
+            "Human": ["x", None, None, None, None, "x", None, "x", "x"],
+            "Rodent": [None, None, None, "x", None, None, "x", None, None],
+        }
+    )
+
+
+def reference_prep(df):
+    # The groupby formulation that the vectorized prep_dataset replaces
+    df = df[df["Refid"].notna()].copy()
+    for col in ["Human", "Rodent"]:
+        df[col] = df[col].notna().astype(np.uint8)
+    grouped = df.groupby("Refid")
+    df_ref = grouped[["Title", "Abstract", "Year", "Human", "Rodent"]].agg(
+        {
+            "Title": "first",
+            "Abstract": "first",
+            "Year": "max",
+            "Human": "max",
+            "Rodent": "max",
+        }
+    )
+    df_ref["LifeStage"] = grouped["LifeStage"].agg(
+        lambda values: values.mode().min() if values.notna().any() else np.nan
+    )
+    return df_ref.reset_index()[df.columns]
+
+
+def test_preprocess_data_matches_groupby_reference(df_raw):
+    df_prep = preprocess_data(df_raw)
+    expected = reference_prep(df_raw)
+
+    pd.testing.assert_frame_equal(df_prep, expected, check_dtype=False)
+    # Mode ties take the smallest value, text the first non-missing value
+    assert df_prep["Refid"].tolist() == [1, 2, 3]
+    assert df_prep["Title"].tolist() == ["First", "Only", "Third"]
+    assert df_prep["Abstract"].tolist()[::2] == ["A1", "A3"]
+    assert df_prep["LifeStage"].tolist()[::2] == ["Fetal", "Adult"]
+    assert df_prep["Human"].tolist() == [1, 0, 1]
+    assert df_prep["Rodent"].tolist() == [0, 1, 0]
+    assert df_prep["Year"].tolist() == [2003, 2011, 2004]
+
+
+def test_chunked_preprocessing_matches_preprocess_data(tmp_path):
+    rng = np.random.default_rng(0)
+    n_rows = 400
+    refids = rng.integers(0, 120, n_rows)
+    df = pd.DataFrame(
+        {
+            "Refid": refids,
+            "Title": [f"Title {refid}" for refid in refids],
+            "Abstract": [f"Abstract {refid}" for refid in refids],
+            "Human": np.where(rng.random(n_rows) < 0.3, "x", None),
+            # Coded 0/1: only single-valued columns become presence labels, and
+            # the first chunks hold nothing but zeros
+            "Coded": np.where(np.arange(n_rows) < 100, 0, rng.integers(0, 2, n_rows)),
+            "Score": np.where(rng.random(n_rows) < 0.5, rng.random(n_rows), np.nan),
+        }
+    )
+    path = tmp_path / "input.csv"
+    df.to_csv(path, index=False)
+
+    label_columns = ["Human", "Coded", "Score"]
+    df_chunked = load_and_preprocess_chunked(path, label_columns, chunksize=32)
+    expected = preprocess_data(pd.read_csv(path))
+
+    pd.testing.assert_frame_equal(df_chunked, expected)
+    assert expected["Coded"].isin([0, 1]).all()
+    assert expected["Coded"].sum() < len(expected)
@@ -0,0 +1,77 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_processing import load_and_preprocess_chunked
+from dataset_store import TextSpill, TextStore, load_dataset, save_dataset
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    rng = np.random.default_rng(0)
+    n_rows = 500
+    refids = rng.integers(0, 150, n_rows)
+    df = pd.DataFrame(
+        {
+            "Refid": refids,
+            "Title": [f"Title {refid} · ü" for refid in refids],
+            "Abstract": [f"Abstract {n}" for n in range(n_rows)],
+            "Human": np.where(rng.random(n_rows) < 0.3, "x", None),
+            "Rodent": np.where(rng.random(n_rows) < 0.2, "x", None),
+        }
+    )
+    # Missing text is filled from a later row of the same Refid
+    df.loc[rng.random(n_rows) < 0.3, "Abstract"] = None
+    df.loc[df["Refid"] == 7, "Title"] = None
+    path = tmp_path / "input.csv"
+    df.to_csv(path, index=False)
+    return path
+
+
+def test_save_dataset_round_trip(tmp_path):
+    df = pd.DataFrame(
+        {
+            "Refid": [1, 2, 3, 4],
+            "Title": ["a", None, "ü · ☃", ""],
+            "Abstract": [None, "b", "c", "d"],
+            "Human": [1, 0, 1, 0],
+            "Design": ["Trial", None, "Cohort", "Trial"],
+        }
+    )
+    save_dataset(df, tmp_path / "dataset")
+
+    df_loaded = load_dataset(tmp_path / "dataset")
+    assert list(df_loaded.columns) == list(df.columns)
+    pd.testing.assert_series_equal(df_loaded["Title"], df["Title"], check_dtype=False)
+    pd.testing.assert_series_equal(
+        df_loaded["Abstract"], df["Abstract"], check_dtype=False
+    )
+    assert df_loaded["Human"].tolist() == [True, False, True, False]
+
+
+def test_chunked_text_spill_matches_in_memory(tmp_path, csv_path):
+    label_columns = ["Human", "Rodent"]
+    df_expected = load_and_preprocess_chunked(csv_path, label_columns, chunksize=64)
+    save_dataset(df_expected, tmp_path / "in_memory")
+
+    with TextSpill(tmp_path / "store") as text_spill:
+        df_prep = load_and_preprocess_chunked(
+            csv_path, label_columns, chunksize=64, text_spill=text_spill
+        )
+        assert "Title" not in df_prep.columns
+        save_dataset(df_prep, tmp_path / "spilled", text_spill=text_spill)
+        spill_directory = text_spill.directory
+    assert not os.path.exists(spill_directory)
+
+    expected = TextStore(tmp_path / "in_memory")
+    spilled = TextStore(tmp_path / "spilled")
+    assert spilled.columns == expected.columns == ["Title", "Abstract"]
+    for col in expected.columns:
+        pd.testing.assert_series_equal(
+            pd.Series(spilled.get(col)), pd.Series(expected.get(col))
+        )
+    pd.testing.assert_frame_equal(
+        load_dataset(tmp_path / "spilled"), load_dataset(tmp_path / "in_memory")
+    )
@@ -0,0 +1,130 @@
+import hashlib
+import io
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataset_store import TextStore, save_dataset
+from file_utils import (
+    build_export,
+    evict_uploads,
+    iter_csv_chunks,
+    iter_ris_chunks,
+    store_upload,
+    to_ris_data,
+)
+
+
+def test_to_ris_data_matches_rispy_format():
+    df = pd.DataFrame(
+        {
+            "Refid": [11, 12, 13],
+            "Title": ["First", "Second", "Third"],
+            "Abstract": ["A", "B", "C"],
+        }
+    )
+
+    expected = "\n".join(
+        f"{n}.\nTY  - JOUR\nID  - {refid}\nT1  - {title}\nAB  - {abstract}\nER  - \n"
+        for n, (refid, title, abstract) in enumerate(df.itertuples(index=False), 1)
+    )
+    assert to_ris_data(df) == expected
+
+
+def test_build_export_of_selected_rows():
+    df = pd.DataFrame(
+        {
+            "Refid": np.arange(10),
+            "Title": [f"Title {n}" for n in range(10)],
+            "Abstract": [f"Abstract, {n}" for n in range(10)],
+        }
+    )
+    positions = np.array([1, 4, 5, 8])
+
+    ris = build_export(df, "ris", positions).decode("utf-8")
+    assert ris == to_ris_data(df.iloc[positions])
+
+    csv = build_export(df, "csv", positions).decode("utf-8")
+    assert csv == df.iloc[positions].to_csv(index=False)
+
+
+@pytest.mark.parametrize("export_format", ["csv", "ris"])
+def test_build_export_decodes_text_from_store(tmp_path, export_format):
+    df = pd.DataFrame(
+        {
+            "Refid": np.arange(10),
+            "Title": [f"Title {n} · ü" for n in range(10)],
+            "Abstract": [f"Abstract, {n}" if n % 3 else np.nan for n in range(10)],
+        }
+    )
+    save_dataset(df, tmp_path / "dataset")
+    text_store = TextStore(tmp_path / "dataset")
+    positions = np.array([0, 2, 3, 7, 9])
+
+    export = build_export(
+        df[["Refid"]], export_format, positions, text_store=text_store
+    )
+    assert export == build_export(df, export_format, positions)
+
+    iter_chunks = {"csv": iter_csv_chunks, "ris": iter_ris_chunks}[export_format]
+    chunks = list(
+        iter_chunks(df[["Refid"]], positions, chunk_rows=2, text_store=text_store)
+    )
+    assert b"".join(chunks) == export
+
+
+def stored_upload(upload_directory, session_id, data, age_seconds):
+    file_path, _ = store_upload(io.BytesIO(data), upload_directory, session_id)
+    mtime = time.time() - age_seconds
+    os.utime(file_path, (mtime, mtime))
+    return file_path
+
+
+def test_store_upload_dedupes_by_content_hash(tmp_path):
+    data = b"Refid,Title\n1,A\n"
+    first_path = stored_upload(tmp_path, "session", data, age_seconds=3600)
+
+    file_path, digest = store_upload(io.BytesIO(data), tmp_path, "session")
+    assert file_path == first_path
+    assert digest == hashlib.sha256(data).hexdigest()
+    assert os.listdir(tmp_path / "session") == [f"{digest}.csv"]
+    # Storing it again marks it as recently used
+    assert time.time() - os.path.getmtime(file_path) < 60
+
+    other_path, _ = store_upload(io.BytesIO(data), tmp_path, "other")
+    assert other_path != file_path
+
+
+def test_evict_uploads_by_age(tmp_path):
+    old = stored_upload(tmp_path, "old", b"old", age_seconds=2 * 86400)
+    recent = stored_upload(tmp_path, "recent", b"recent", age_seconds=60)
+
+    evict_uploads(tmp_path, max_bytes=2**20, max_age_seconds=86400)
+    assert not os.path.exists(old)
+    assert os.path.exists(recent)
+    # Emptied session directories are removed too
+    assert sorted(os.listdir(tmp_path)) == ["recent"]
+
+
+def test_evict_uploads_by_size_oldest_first(tmp_path):
+    paths = [
+        stored_upload(tmp_path, f"session_{n}", bytes(100) + bytes([n]), age_seconds=age)
+        for n, age in enumerate([300, 200, 100])
+    ]
+
+    evict_uploads(tmp_path, max_bytes=250, max_age_seconds=86400)
+    assert [os.path.exists(path) for path in paths] == [False, True, True]
+
+
+def test_evict_uploads_keeps_current_session(tmp_path):
+    kept = stored_upload(tmp_path, "current", b"kept", age_seconds=2 * 86400)
+    other = stored_upload(tmp_path, "other", b"other", age_seconds=2 * 86400)
+
+    evict_uploads(
+        tmp_path, max_bytes=0, max_age_seconds=86400, keep=tmp_path / "current"
+    )
+    assert os.path.exists(kept)
+    assert not os.path.exists(other)
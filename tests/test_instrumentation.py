@@ -0,0 +1,35 @@
+import tracemalloc
+
+import numpy as np
+
+from instrumentation import finish_run, memory_traced, stage, start_run
+
+
+def test_memory_is_traced_only_during_the_requesting_run():
+    assert not tracemalloc.is_tracing()
+    run = start_run("run", trace_memory=True)
+    other = start_run("other", trace_memory=True)
+    # Only one run traces at a time, so peaks are not reset under another run
+    assert memory_traced(run)
+    assert not memory_traced(other)
+    finish_run(other)
+
+    with stage("allocate") as record:
+        data = np.ones(2**20)
+        del data
+    assert tracemalloc.is_tracing()
+    finish_run(run)
+
+    assert not tracemalloc.is_tracing()
+    assert record["peak_bytes"] >= 8 * 2**20
+
+
+def test_stages_of_untraced_run_have_no_peak_memory():
+    run = start_run("run")
+    with stage("allocate") as record:
+        np.ones(1000)
+    finish_run(run)
+
+    assert not tracemalloc.is_tracing()
+    assert record["peak_bytes"] is None
+    assert run["stages"] == [record]
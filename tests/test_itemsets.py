@@ -0,0 +1,119 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from itemsets import mine_itemsets, rules_from_itemsets
+
+
+@pytest.fixture
+def df_labels():
+    rng = np.random.default_rng(0)
+    values = rng.random((200, 7)) < [0.6, 0.5, 0.4, 0.3, 0.3, 0.1, 0.02]
+    # Correlated labels, so itemsets of three or more labels are frequent
+    values[:, 1] |= values[:, 0] & (rng.random(200) < 0.5)
+    values[:, 2] |= values[:, 1] & (rng.random(200) < 0.5)
+    return pd.DataFrame(values.astype(int), columns=list("ABCDEFG"))
+
+
+def brute_force_itemsets(df, min_count, max_len):
+    found = {}
+    for size in range(1, max_len + 1):
+        for itemset in itertools.combinations(df.columns, size):
+            count = int(df[list(itemset)].all(axis=1).sum())
+            if count >= min_count:
+                found[frozenset(itemset)] = count
+    return found
+
+
+def as_dict(frequent_itemsets):
+    return dict(zip(frequent_itemsets["itemsets"], frequent_itemsets["count"]))
+
+
+@pytest.mark.parametrize("max_len", [1, 2, 3, None])
+def test_mine_itemsets_matches_brute_force(df_labels, max_len):
+    frequent_itemsets = mine_itemsets(df_labels, min_support=0.1, max_len=max_len)
+
+    expected = brute_force_itemsets(df_labels, 20, max_len or df_labels.shape[1])
+    assert as_dict(frequent_itemsets) == expected
+    np.testing.assert_allclose(
+        frequent_itemsets["support"], frequent_itemsets["count"] / len(df_labels)
+    )
+
+
+def test_mine_itemsets_top_k_keeps_most_frequent(df_labels):
+    frequent_itemsets = mine_itemsets(df_labels, min_support=0.05, top_k=5)
+
+    expected = brute_force_itemsets(df_labels, 10, df_labels.shape[1])
+    larger = sorted(
+        (count for itemset, count in expected.items() if len(itemset) > 1),
+        reverse=True,
+    )
+    found = as_dict(frequent_itemsets)
+    found_larger = sorted(
+        (count for itemset, count in found.items() if len(itemset) > 1),
+        reverse=True,
+    )
+    assert found_larger[:5] == larger[:5]
+    assert min(found_larger) >= larger[4]
+    assert all(expected[itemset] == count for itemset, count in found.items())
+
+
+def test_mine_itemsets_matches_mlxtend(df_labels):
+    frequent_patterns = pytest.importorskip("mlxtend.frequent_patterns")
+    expected = frequent_patterns.apriori(
+        df_labels.astype(bool), min_support=0.1, use_colnames=True
+    )
+
+    frequent_itemsets = mine_itemsets(df_labels, min_support=0.1)
+    support = dict(zip(frequent_itemsets["itemsets"], frequent_itemsets["support"]))
+    assert set(support) == set(expected["itemsets"])
+    for itemset, expected_support in zip(expected["itemsets"], expected["support"]):
+        assert support[itemset] == pytest.approx(expected_support)
+
+
+def test_rules_from_itemsets_matches_mlxtend(df_labels):
+    frequent_patterns = pytest.importorskip("mlxtend.frequent_patterns")
+    frequent_itemsets = mine_itemsets(df_labels, min_support=0.1)
+    rules = rules_from_itemsets(frequent_itemsets, len(df_labels))
+
+    expected = frequent_patterns.association_rules(
+        frequent_itemsets[["support", "itemsets"]],
+        num_itemsets=len(df_labels),
+        metric="support",
+        min_threshold=0,
+    )
+    assert len(rules) == len(expected)
+
+    metrics = [
+        "support",
+        "confidence",
+        "lift",
+        "leverage",
+        "conviction",
+        "zhangs_metric",
+    ]
+    key = ["antecedents", "consequents"]
+    merged = rules.merge(expected, on=key, suffixes=("", "_expected"))
+    assert len(merged) == len(rules)
+    for metric in metrics:
+        np.testing.assert_allclose(
+            merged[metric], merged[f"{metric}_expected"], rtol=1e-9
+        )
+
+
+def test_rules_from_itemsets_hand_computed():
+    df = pd.DataFrame({"A": [1, 1, 1, 0], "B": [1, 1, 0, 0]})
+    rules = rules_from_itemsets(mine_itemsets(df, min_support=0.25), rows=4)
+
+    rule = rules[rules["antecedents"] == frozenset("A")].iloc[0]
+    assert rule["consequents"] == frozenset("B")
+    assert rule["support count"] == 2
+    assert rule["confidence"] == pytest.approx(2 / 3)
+    assert rule["lift"] == pytest.approx(0.5 / (0.75 * 0.5))
+    assert rule["conviction"] == pytest.approx((1 - 0.5) / (1 - 2 / 3))
+
+    rule = rules[rules["antecedents"] == frozenset("B")].iloc[0]
+    assert rule["confidence"] == pytest.approx(1)
+    assert rule["conviction"] == np.inf
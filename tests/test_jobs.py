@@ -0,0 +1,125 @@
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import pytest
+
+from instrumentation import finish_run, late_stages, logger, stage, start_run
+from jobs import JobGroup
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        yield executor
+
+
+def blocked(event, value):
+    event.wait(5)
+    return value
+
+
+def test_inline_jobs_run_when_submitted():
+    jobs = JobGroup()
+    jobs.begin(("a",))
+    assert jobs.result("network", "a", lambda: "network a") == "network a"
+    assert not jobs.pending()
+
+    # A new key supersedes the job, and jobs not asked for again are stale
+    jobs.begin(("b",))
+    assert jobs.result("network", "b", lambda: "network b") == "network b"
+    assert jobs.discard_stale() == 0
+    jobs.begin(("c",))
+    assert jobs.discard_stale() == 1
+    assert not jobs.pending()
+
+
+def test_result_of_older_generation_is_discarded(executor):
+    jobs = JobGroup(executor)
+    release = threading.Event()
+
+    assert jobs.begin(("a",)) == 1
+    assert jobs.result("network", "a", blocked, release, "network a") is None
+    assert jobs.pending()
+    assert not jobs.ready()
+    old_future = jobs.submit("network", "a", blocked, release, "network a")
+
+    # The selection changes while the old job is still running
+    assert jobs.begin(("b",)) == 2
+    new_future = jobs.submit("network", "b", blocked, release, "network b")
+    release.set()
+    wait([old_future, new_future])
+
+    assert jobs.ready()
+    assert jobs.result("network", "b", blocked, release, "network b") == "network b"
+    assert not jobs.pending()
+    assert not jobs.ready()
+
+
+def test_pending_clears_when_job_finishes(executor):
+    jobs = JobGroup(executor)
+    release = threading.Event()
+    jobs.begin(("a",))
+    future = jobs.submit("counts", "a", blocked, release, 1)
+    assert jobs.pending()
+
+    release.set()
+    future.result()
+    assert jobs.ready()
+    assert jobs.pending()
+    assert jobs.result("counts", "a", blocked, release, 1) == 1
+    assert not jobs.pending()
+
+    # Jobs not asked for in the next run are cancelled and forgotten
+    stale_release = threading.Event()
+    stale = jobs.submit("layout", "a", blocked, stale_release, 2)
+    jobs.begin(("b",))
+    assert jobs.discard_stale() == 2
+    assert not jobs.pending()
+    assert not jobs.ready()
+    stale_release.set()
+    wait([stale])
+    assert not jobs.ready()
+
+
+def recorded_stage(event=None):
+    if event is not None:
+        event.wait(5)
+    with stage("job_stage", rows=3):
+        pass
+    return threading.get_ident()
+
+
+def test_job_stages_land_in_callers_run(executor):
+    jobs = JobGroup(executor)
+    run = start_run("rerun", session="session-1")
+    thread = jobs.submit("counts", "a", recorded_stage).result()
+    finish_run(run)
+
+    assert thread != threading.get_ident()
+    assert [record["stage"] for record in run["stages"]] == ["job_stage"]
+    assert run["stages"][0]["rows"] == 3
+
+
+def test_job_stages_after_run_finished_keep_its_session(executor):
+    lines = []
+    handler = logging.Handler()
+    handler.emit = lambda record: lines.append(json.loads(record.getMessage()))
+    logger.addHandler(handler)
+    try:
+        jobs = JobGroup(executor)
+        release = threading.Event()
+        run = start_run("rerun", session="session-1")
+        future = jobs.submit("counts", "a", recorded_stage, release)
+        finish_run(run)
+        release.set()
+        future.result()
+    finally:
+        logger.removeHandler(handler)
+
+    assert run["stages"] == []
+    assert [record["stage"] for record in late_stages(run)] == ["job_stage"]
+    assert lines[-1]["session"] == "session-1"
+    assert lines[-1]["late"] is True
+    assert [record["stage"] for record in lines[-1]["stages"]] == ["job_stage"]
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backbone import select_edges
+from cooccurrence import cooccurrence_counts
+from layout import LAYOUT_SCALE, force_layout, network_layout
+
+
+@pytest.fixture
+def network():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        (rng.random((300, 12)) < 0.3).astype(int),
+        columns=[f"L{n}" for n in range(12)],
+    )
+    # One node without edges, and one that is never drawn
+    df["Isolated"] = 0
+    df.loc[0, "Isolated"] = 1
+    df["Absent"] = 0
+    counts = cooccurrence_counts(df)
+    return counts, select_edges(counts, min_count=25)
+
+
+def mean_distance(positions, other):
+    return np.mean(
+        [np.hypot(*np.subtract(positions[label], other[label])) for label in other]
+    )
+
+
+def test_layout_is_deterministic_for_a_seed(network):
+    counts, edges = network
+    layout = network_layout(counts, edges, seed=3)
+
+    assert layout == network_layout(counts, edges, seed=3)
+    assert layout != network_layout(counts, edges, seed=4)
+
+
+def test_isolated_nodes_get_finite_positions(network):
+    counts, edges = network
+    layout = network_layout(counts, edges)
+
+    assert "Absent" not in layout
+    assert set(layout) == {f"L{n}" for n in range(12)} | {"Isolated"}
+    positions = np.array(list(layout.values()))
+    assert np.isfinite(positions).all()
+    assert np.abs(positions).max() == pytest.approx(LAYOUT_SCALE)
+
+    pos = force_layout(5, np.array([0, 1]), np.array([1, 2]))
+    assert np.isfinite(pos).all()
+
+
+def test_warm_start_keeps_previous_positions(network):
+    counts, edges = network
+    layout = network_layout(counts, edges)
+    previous = {label: xy for label, xy in layout.items() if label != "L3"}
+
+    warm = network_layout(counts, edges, previous=previous)
+    assert set(warm) == set(layout)
+    assert np.isfinite(warm["L3"]).all()
+    # Unchanged nodes stay close, where a fresh layout moves them across the canvas
+    assert mean_distance(warm, previous) < 0.25 * LAYOUT_SCALE
+    cold = network_layout(counts, edges, seed=1)
+    assert mean_distance(cold, previous) > 2 * mean_distance(warm, previous)
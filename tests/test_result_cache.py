@@ -0,0 +1,92 @@
+import os
+import pickle
+
+import numpy as np
+
+from result_cache import ResultCache, make_cache_key
+
+
+def pickled_size(value):
+    return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def test_lru_eviction_under_byte_budget():
+    value = np.zeros(1000)
+    size = pickled_size(value)
+    cache = ResultCache(max_bytes=3 * size)
+    for key in "abc":
+        cache.put(key, value)
+    # Using "a" makes "b" the least recently used entry
+    assert cache.get("a") is not None
+
+    cache.put("d", value)
+    assert cache.current_bytes == 3 * size
+    assert cache.get("b") is None
+    for key in "acd":
+        np.testing.assert_array_equal(cache.get(key), value)
+
+
+def test_values_larger_than_budget_are_not_kept_in_memory(tmp_path):
+    value = np.zeros(1000)
+    cache = ResultCache(max_bytes=pickled_size(value) - 1)
+    cache.put("small", 1)
+    cache.put("large", value)
+
+    assert cache.get("large") is None
+    assert cache.get("small") == 1
+    assert cache.current_bytes == pickled_size(1)
+
+    disk_cache = ResultCache(max_bytes=pickled_size(value) - 1, disk_dir=tmp_path)
+    disk_cache.put("large", value)
+    np.testing.assert_array_equal(disk_cache.get("large"), value)
+    assert disk_cache.current_bytes == 0
+
+
+def test_disk_tier_round_trip(tmp_path):
+    value = {"edges": [("A", "B", 3)], "rows": 10}
+    ResultCache(max_bytes=2**20, disk_dir=tmp_path).put("key", value)
+
+    # A fresh cache, as after a restart, reads the entry back from disk
+    cache = ResultCache(max_bytes=2**20, disk_dir=tmp_path)
+    assert cache.get("key") == value
+    assert cache.hits == 1
+    assert cache.current_bytes == pickled_size(value)
+
+    hit = cache.get("key")
+    hit["rows"] = 0
+    assert cache.get("key") == value
+
+
+def test_disk_tier_evicts_oldest_entries(tmp_path):
+    value = np.zeros(1000)
+    cache = ResultCache(
+        max_bytes=2**20, disk_dir=tmp_path, disk_max_bytes=2 * pickled_size(value)
+    )
+    for n, key in enumerate("ab"):
+        cache.put(key, value)
+        os.utime(tmp_path / f"{key}.pkl", (1_000_000 + n, 1_000_000 + n))
+    cache.put("c", value)
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["b.pkl", "c.pkl"]
+
+
+def test_get_or_compute_counts_hits_and_misses():
+    cache = ResultCache(max_bytes=2**20)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return 42
+
+    assert cache.get_or_compute("key", compute) == 42
+    assert cache.get_or_compute("key", compute) == 42
+    assert len(calls) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_make_cache_key_is_stable_for_equal_arguments():
+    key = make_cache_key("network", "abc123", ("In Vivo", "Human"), 0.5)
+    assert key == make_cache_key("network", "abc123", ("In Vivo", "Human"), 0.5)
+    assert key != make_cache_key("network", "abc123", ("Human", "In Vivo"), 0.5)
+    assert key != make_cache_key("network", "abc123", ("In Vivo", "Human"), 0.25)
+    assert len(key) == 64
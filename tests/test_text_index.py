@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataset_store import TextStore, save_dataset
+from text_index import (
+    build_text_index,
+    load_text_index,
+    save_text_index,
+    search_text,
+    tokenize,
+)
+
+
+@pytest.fixture
+def text_store(tmp_path):
+    rng = np.random.default_rng(0)
+    words = np.array(["thyroid", "thyroxine", "serum", "Rat", "rats", "liver", "ü"])
+    n_rows = 300
+    df = pd.DataFrame(
+        {
+            "Refid": np.arange(n_rows),
+            "Title": [" ".join(rng.choice(words, 3)) for _ in range(n_rows)],
+            "Abstract": [" ".join(rng.choice(words, 6)) for _ in range(n_rows)],
+        }
+    )
+    df.loc[::7, "Abstract"] = None
+    save_dataset(df, tmp_path / "dataset")
+    return TextStore(tmp_path / "dataset")
+
+
+def row_tokens(text_store):
+    rows = zip(*(text_store.get(col) for col in text_store.columns))
+    return [
+        set(tokenize(" ".join(value for value in texts if isinstance(value, str))))
+        for texts in rows
+    ]
+
+
+@pytest.mark.parametrize("query", ["thyroid", "RAT", "thyro*", "ra*", "ü", "zebra"])
+def test_search_text_matches_tokens(tmp_path, text_store, query):
+    term = query.lower().rstrip("*")
+    expected = np.array(
+        [
+            n
+            for n, tokens in enumerate(row_tokens(text_store))
+            if any(
+                token == term or (query.endswith("*") and token.startswith(term))
+                for token in tokens
+            )
+        ],
+        dtype=np.int64,
+    )
+
+    index = build_text_index(text_store)
+    save_text_index(index, tmp_path / "dataset")
+    loaded = load_text_index(tmp_path / "dataset", text_store.n_rows)
+    for text_index in (index, loaded):
+        np.testing.assert_array_equal(search_text(text_index, query), expected)